@@ -0,0 +1,7 @@
+"""
+Decision Curve Analysis
+
+Benchmarks for dcapy, run as modules, e.g. `python -m benchmark.import_time`
+
+Author: Matthew Black
+"""
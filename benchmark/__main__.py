@@ -0,0 +1,64 @@
+"""
+Decision Curve Analysis
+
+Runs the benchmark suite, or compares two of its results files
+
+Usage:
+    python -m benchmark run [--preset quick|full] [--cases dca ...] [--output results.json]
+    python -m benchmark compare baseline.json candidate.json [--time-tolerance 0.1]
+        exits with status 1 if any point regressed
+
+Author: Matthew Black
+"""
+import argparse
+import json
+import sys
+from benchmark import compare, suite
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmark',
+                                     description="benchmark dcapy")
+    commands = parser.add_subparsers(dest='command')
+
+    run_parser = commands.add_parser('run', help="run the benchmark sweeps")
+    run_parser.add_argument('--preset', default='quick', choices=sorted(suite.PRESETS))
+    run_parser.add_argument('--cases', nargs='+', choices=sorted(suite.CASES))
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--no-memory', action='store_true',
+                            help="don't measure peak memory")
+    run_parser.add_argument('--output', default='benchmark.json')
+
+    compare_parser = commands.add_parser('compare', help="compare two results files")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--time-tolerance', type=float, default=0.10)
+    compare_parser.add_argument('--memory-tolerance', type=float, default=0.10)
+
+    args = parser.parse_args(args)
+    if args.command == 'run':
+        def log(record):
+            peak = '-' if record['peak_bytes'] is None else \
+                '{0:.1f}MB'.format(record['peak_bytes']/2**20)
+            print('{case:<10}n={n:<10}p={p:<5}T={T:<8}{best:>10.4f}s'.format(**record),
+                  peak)
+        results = suite.run(args.preset, args.cases, args.repeat,
+                            not args.no_memory, log)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+        return 0
+    elif args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.candidate) as f:
+            candidate = json.load(f)
+        comparisons = compare.compare(baseline, candidate, args.time_tolerance,
+                                      args.memory_tolerance)
+        print(compare.format_comparison(comparisons))
+        return 1 if any(c['regressions'] for c in comparisons) else 0
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
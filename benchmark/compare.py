@@ -0,0 +1,75 @@
+"""
+Decision Curve Analysis
+
+Compares two benchmark results files, flagging the points that got slower or
+used more memory
+
+Author: Matthew Black
+"""
+
+
+def compare(baseline, candidate, time_tolerance=0.10, memory_tolerance=0.10):
+    """Compares the records of two benchmark runs
+
+    Parameters
+    ----------
+    baseline : dict
+        the results of the reference run, as returned by `benchmark.suite.run`
+    candidate : dict
+        the results of the run to check
+    time_tolerance : float
+        the fraction the best time may grow by before it is a regression
+    memory_tolerance : float
+        the fraction the peak memory may grow by before it is a regression
+
+    Returns
+    -------
+    list(dict)
+        for each point in both runs, its 'case', 'n', 'p', 'T', the 'time_ratio'
+        and 'memory_ratio' (candidate/baseline, `None` if not measured) and
+        'regressions', a list of the metrics ('time', 'memory') that regressed
+    """
+    reference = {_key(record) : record for record in baseline['records']}
+    comparisons = []
+    for record in candidate['records']:
+        base = reference.get(_key(record))
+        if base is None:
+            continue
+        comparison = {'case' : record['case'], 'n' : record['n'], 'p' : record['p'],
+                      'T' : record['T'], 'time_ratio' : _ratio(record['best'], base['best']),
+                      'memory_ratio' : _ratio(record['peak_bytes'], base['peak_bytes']),
+                      'regressions' : []}
+        if comparison['time_ratio'] is not None \
+                and comparison['time_ratio'] > 1 + time_tolerance:
+            comparison['regressions'].append('time')
+        if comparison['memory_ratio'] is not None \
+                and comparison['memory_ratio'] > 1 + memory_tolerance:
+            comparison['regressions'].append('memory')
+        comparisons.append(comparison)
+    return comparisons
+
+
+def format_comparison(comparisons):
+    """Formats the result of `compare` as a table
+    """
+    lines = ['{0:<10}{1:>10}{2:>6}{3:>8}{4:>8}{5:>8}  {6}'.format(
+        'case', 'n', 'p', 'T', 'time', 'memory', 'regressions')]
+    for c in comparisons:
+        lines.append('{0:<10}{1:>10}{2:>6}{3:>8}{4:>8}{5:>8}  {6}'.format(
+            c['case'], c['n'], c['p'], c['T'], _format_ratio(c['time_ratio']),
+            _format_ratio(c['memory_ratio']), ', '.join(c['regressions'])))
+    return '\n'.join(lines)
+
+
+def _key(record):
+    return record['case'], record['n'], record['p'], record['T']
+
+
+def _ratio(value, reference):
+    if value is None or not reference:
+        return None
+    return value/reference
+
+
+def _format_ratio(ratio):
+    return '-' if ratio is None else '{0:.2f}x'.format(ratio)
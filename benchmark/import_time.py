@@ -0,0 +1,82 @@
+"""
+Decision Curve Analysis
+
+Measures how long it takes to import dcapy, and which heavy dependencies the
+import pulls in. Each measurement is made in a fresh interpreter.
+
+Usage: python -m benchmark.import_time [--repeat N] [--max-seconds S]
+    exits with status 1 if a heavy dependency is imported or the median import
+    time exceeds the limit
+
+Author: Matthew Black
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+#dependencies that should only be imported when the features using them are
+HEAVY_MODULES = ['statsmodels', 'scipy', 'patsy', 'matplotlib']
+
+#the imports to measure, by name
+STATEMENTS = {'core' : 'import dcapy.core',
+              'class' : 'from dcapy import DecisionCurveAnalysis'}
+
+_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds' : elapsed,
+                   'modules' : sorted(set(name.split('.')[0] for name in sys.modules))}}))
+"""
+
+
+def measure(statement, repeat=5):
+    """Times an import statement in fresh interpreters
+
+    Parameters
+    ----------
+    statement : str
+        the statement to run, e.g. 'import dcapy'
+    repeat : int
+        the number of interpreters to time it in
+
+    Returns
+    -------
+    dict
+        'seconds', the time of each run, 'median', and 'heavy', the heavy
+        dependencies the statement imported
+    """
+    seconds, modules = [], set()
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c',
+                                          _SCRIPT.format(statement=statement)])
+        run = json.loads(output.decode('utf-8'))
+        seconds.append(run['seconds'])
+        modules.update(run['modules'])
+    return {'seconds' : seconds,
+            'median' : sorted(seconds)[len(seconds)//2],
+            'heavy' : [name for name in HEAVY_MODULES if name in modules]}
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="time importing dcapy")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help="fail if the median time of an import exceeds this")
+    args = parser.parse_args(args)
+
+    failed = False
+    for name, statement in STATEMENTS.items():
+        timing = measure(statement, args.repeat)
+        print("{0:<8}{1:>10.4f}s  heavy imports: {2}".format(
+            name, timing['median'], ', '.join(timing['heavy']) or 'none'))
+        if timing['heavy'] or (args.max_seconds is not None
+                               and timing['median'] > args.max_seconds):
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
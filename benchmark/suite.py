@@ -0,0 +1,236 @@
+"""
+Decision Curve Analysis
+
+The benchmark cases, and the sweeps over data size (n), predictor count (p)
+and threshold grid density (T) they are run at
+
+Each case is a function that takes `(n, p, T)`, builds its inputs from a
+synthetic cohort, and returns the function to time. Wall time is the best of
+`repeat` calls; peak memory is the peak of NumPy and Python allocations
+(`tracemalloc`) during one more call.
+
+Author: Matthew Black
+"""
+import platform
+import time
+import tracemalloc
+import numpy as np
+
+#the preset sweeps: for each case, a base (n, p, T) and the values to vary
+#each dimension over, one dimension at a time
+PRESETS = {
+    'quick' : {
+        'dca' : {'base' : (1000, 2, 99),
+                 'n' : [1000, 10000], 'p' : [1, 10], 'T' : [99, 999]},
+        'run' : {'base' : (1000, 2, 99), 'n' : [1000, 10000]},
+        'smooth' : {'base' : (1000, 2, 99), 'p' : [1, 10], 'T' : [99, 999]},
+        'stdca' : {'base' : (1000, 1, 99), 'n' : [1000, 10000]},
+        'bootstrap' : {'base' : (1000, 1, 99), 'n' : [1000, 10000]}},
+    'full' : {
+        'dca' : {'base' : (10000, 1, 99),
+                 'n' : [1000, 10000, 100000, 1000000, 10000000],
+                 'p' : [1, 10, 100, 500],
+                 'T' : [99, 999, 10000, 100000]},
+        'run' : {'base' : (10000, 1, 99),
+                 'n' : [1000, 10000, 100000, 1000000, 10000000],
+                 'p' : [1, 10, 100, 500]},
+        #LOWESS weighs lowess_frac*T neighbors of each point, so T stops at 1e4
+        'smooth' : {'base' : (10000, 1, 99),
+                    'p' : [1, 10, 100, 500], 'T' : [99, 999, 10000]},
+        #the Kaplan-Meier estimates make one pass over the data per threshold
+        'stdca' : {'base' : (10000, 1, 99),
+                   'n' : [1000, 10000, 100000, 1000000], 'p' : [1, 10],
+                   'T' : [99, 999]},
+        'bootstrap' : {'base' : (10000, 1, 99),
+                       'n' : [1000, 10000, 100000], 'p' : [1, 10, 100]}}}
+
+#replicates drawn by the bootstrap case
+BOOTSTRAP_REPLICATES = 100
+
+
+def cohort(n, p, seed=0):
+    """A synthetic cohort with a (censored) outcome, a time to the outcome,
+    and `p` predictors, 'x0', ..., 'x<p-1>', of varying calibration
+
+    Returns
+    -------
+    dict(str, np.ndarray)
+        the columns, see `dcapy.synthetic.SyntheticCohort`
+    """
+    from dcapy.synthetic import SyntheticCohort
+    predictors = {'x{0}'.format(i) : {'slope' : 0.5 + i/p} for i in range(p)}
+    return next(SyntheticCohort(predictors, survival=True, censoring_rate=0.1,
+                                seed=seed).chunks(n, n))
+
+
+def _frame(data):
+    """The cohort as a DataFrame
+    """
+    import pandas as pd
+    return pd.DataFrame(data)
+
+
+def _grid(T):
+    """Threshold bounds giving (about) T thresholds between 0.01 and 0.99
+    """
+    return {'thresh_lo' : 0.01, 'thresh_hi' : 0.99, 'thresh_step' : 0.98/(T-1)}
+
+
+def case_dca(n, p, T):
+    """`dcapy.algo.dca` on a DataFrame
+    """
+    from dcapy.algo import dca
+    frame = _frame(cohort(n, p))
+    predictors = ['x{0}'.format(i) for i in range(p)]
+    return lambda: dca(frame, 'outcome', predictors, **_grid(T))
+
+
+def case_run(n, p, T):
+    """Creating and running a `DecisionCurveAnalysis`, including validation
+    """
+    from dcapy import DecisionCurveAnalysis
+    frame = _frame(cohort(n, p))
+    predictors = ['x{0}'.format(i) for i in range(p)]
+
+    def run():
+        analysis = DecisionCurveAnalysis('dca', data=frame, outcome='outcome',
+                                         predictors=predictors, **_grid(T))
+        analysis.run()
+    return run
+
+
+def case_smooth(n, p, T):
+    """LOWESS smoothing of every curve of a result
+    """
+    from dcapy.algo import dca_result
+    from dcapy.calc import _grid_matrix_cache
+    frame = _frame(cohort(n, p))
+    result = dca_result(frame, 'outcome', ['x{0}'.format(i) for i in range(p)], **_grid(T))
+
+    def smooth():
+        _grid_matrix_cache.clear()  # time building the weights, too
+        result.smooth('lowess', 0.10)
+    return smooth
+
+
+def case_stdca(n, p, T):
+    """`dcapy.algo.stdca` on a DataFrame, at the median time
+    """
+    from dcapy.algo import stdca
+    data = cohort(n, p)
+    frame = _frame(data)
+    predictors = ['x{0}'.format(i) for i in range(p)]
+    time_point = float(np.median(data['time']))
+    return lambda: stdca(frame, 'outcome', 'time', time_point, predictors, **_grid(T))
+
+
+def case_bootstrap(n, p, T):
+    """Bootstrap replicates of the decision curves
+    """
+    import dcapy.core as core
+    from dcapy.resample import bootstrap
+    data = cohort(n, p)
+    P = [data['x{0}'.format(i)] for i in range(p)]
+    thresholds = core.threshold_grid(**_grid(T))
+    return lambda: bootstrap(data['outcome'], P, thresholds, BOOTSTRAP_REPLICATES, seed=1)
+
+
+CASES = {'dca' : case_dca,
+         'run' : case_run,
+         'smooth' : case_smooth,
+         'stdca' : case_stdca,
+         'bootstrap' : case_bootstrap}
+
+
+def sweep_points(sweep):
+    """The (n, p, T) points of a sweep, without duplicates
+
+    Parameters
+    ----------
+    sweep : dict
+        'base', an (n, p, T) tuple, and optionally lists of values for 'n', 'p', 'T'
+
+    Returns
+    -------
+    list(tuple(int, int, int))
+    """
+    points = [tuple(sweep['base'])]
+    for i, dimension in enumerate(['n', 'p', 'T']):
+        for value in sweep.get(dimension, []):
+            point = list(sweep['base'])
+            point[i] = value
+            if tuple(point) not in points:
+                points.append(tuple(point))
+    return points
+
+
+def measure(func, repeat=3, memory=True):
+    """Times a function, and measures its peak memory
+
+    Returns
+    -------
+    dict
+        'seconds', the time of each call, 'best', and 'peak_bytes' (`None` if
+        `memory=False`)
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    peak_bytes = None
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {'seconds' : seconds, 'best' : min(seconds), 'peak_bytes' : peak_bytes}
+
+
+def run(preset='quick', cases=None, repeat=3, memory=True, log=None):
+    """Runs the benchmark sweeps
+
+    Parameters
+    ----------
+    preset : str or dict
+        the name of a preset in `PRESETS`, or sweeps keyed by case name
+    cases : list(str), optional
+        the cases to run, defaults to all of the preset's cases
+    repeat : int
+        the number of timed calls at each point
+    memory : bool
+        whether to measure peak memory
+    log : callable, optional
+        called with each record as it is measured
+
+    Returns
+    -------
+    dict
+        'environment', describing the machine and library versions, and
+        'records', one per case and point
+    """
+    sweeps = PRESETS[preset] if isinstance(preset, str) else preset
+    records = []
+    for case in (cases or list(sweeps)):
+        for n, p, T in sweep_points(sweeps[case]):
+            record = {'case' : case, 'n' : n, 'p' : p, 'T' : T}
+            record.update(measure(CASES[case](n, p, T), repeat, memory))
+            records.append(record)
+            if log is not None:
+                log(record)
+    return {'environment' : environment(), 'preset' : preset if isinstance(preset, str)
+            else None, 'records' : records}
+
+
+def environment():
+    """The machine and library versions a benchmark ran with
+    """
+    import pandas as pd
+    return {'python' : platform.python_version(),
+            'platform' : platform.platform(),
+            'processor' : platform.processor(),
+            'numpy' : np.__version__,
+            'pandas' : pd.__version__,
+            'time' : time.strftime('%Y-%m-%dT%H:%M:%S')}
@@ -0,0 +1,44 @@
+import argparse
+import json
+import sys
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m dcapy',
+                                     description="decision curve analysis")
+    commands = parser.add_subparsers(dest='command')
+
+    batch_parser = commands.add_parser(
+        'batch', help="run the dca/stdca jobs of a YAML or JSON job file",
+        description="run the dca/stdca jobs of a job file, see dcapy.batch.load_jobs")
+    batch_parser.add_argument('jobs', help="the job file (.yaml, .yml or .json)")
+    batch_parser.add_argument('--output',
+                              help="the results file of jobs without their own output")
+    batch_parser.add_argument('--workers', type=int,
+                              help="worker processes (defaults to the job file's, or 1)")
+    batch_parser.add_argument('--report', help="write the per-job report as JSON")
+    batch_parser.add_argument('--quiet', action='store_true',
+                              help="don't print the timing report")
+
+    args = parser.parse_args(args)
+    if args.command == 'batch':
+        from dcapy.batch import format_report, load_jobs, run_jobs
+        try:
+            spec = load_jobs(args.jobs)
+        except (OSError, ValueError, ImportError) as e:
+            print("error: {0}".format(e), file=sys.stderr)
+            return 2
+        workers = args.workers or spec['workers'] or 1
+        records = run_jobs(spec['jobs'], args.output or spec['output'], workers)
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump(records, f, indent=1)
+        if not args.quiet:
+            print(format_report(records))
+        return 1 if any(record['status'] != 'ok' for record in records) else 0
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import os
+from functools import partial
+import numpy as np
+
+_default_runner = None
+
+
+class AnalysisRunner:
+    """AnalysisRunner(executor=None, max_concurrency=None)
+
+    Runs analyses from asyncio code, off the event loop
+
+    Each analysis runs in `executor`, and at most `max_concurrency` of them
+    run (or wait in the executor) at once; the rest wait their turn without
+    holding a slot. Requests for the same analysis (the same algorithm and
+    arguments, of the same data object) made while one is in flight share its
+    computation and its result object; a data set changed in place while an
+    analysis of it is in flight isn't noticed
+
+    A request that is cancelled or times out stops waiting at once; its
+    analysis is dropped if no other request is waiting for it and it hasn't
+    started, but analyses already running in the executor run to completion
+
+    With a `concurrent.futures.ProcessPoolExecutor` the analyses are pickled
+    to the workers; analyses of `dcapy.shared.SharedColumns` data send only a
+    handle to the shared columns rather than the data
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor, optional
+        the executor to run analyses in, defaults to the event loop's default
+    max_concurrency : int, optional
+        the most analyses in flight at once, defaults to the number of cores
+    """
+
+    def __init__(self, executor=None, max_concurrency=None):
+        self.executor = executor
+        self.max_concurrency = max(int(max_concurrency or os.cpu_count() or 1), 1)
+        self._semaphores = {}
+        self._in_flight = {}
+
+    async def run(self, analysis, timeout=None, **run_args):
+        """Runs an analysis
+
+        Parameters
+        ----------
+        analysis : dcapy.DecisionCurveAnalysis
+            the analysis to run
+        timeout : float, optional
+            the most seconds to wait for the result
+        **run_args :
+            the arguments of `DecisionCurveAnalysis.run` (except `return_results`)
+
+        Returns
+        -------
+        dcapy.result.DCAResult or dcapy.result.MultiOutcomeResult
+            the result, which is not stored in `analysis`
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            if the result isn't ready within `timeout`
+        """
+        loop = asyncio.get_running_loop()
+        key = request_key(analysis, run_args)
+        if key is None:
+            key = object()  #not shared with any other request
+        if key not in self._in_flight:
+            task = loop.create_task(self._compute(analysis, run_args))
+            self._in_flight[key] = [task, 0]
+            task.add_done_callback(lambda done: self._forget(key, done))
+        entry = self._in_flight[key]
+        entry[1] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(entry[0]), timeout)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                entry[0].cancel()  #no one is waiting for it any more
+
+    async def run_many(self, analyses, timeout=None, return_exceptions=False, **run_args):
+        """Runs several analyses concurrently
+
+        Parameters
+        ----------
+        analyses : list(dcapy.DecisionCurveAnalysis)
+            the analyses to run
+        timeout : float, optional
+            the most seconds to wait for each result
+        return_exceptions : bool
+            whether to return the exception of an analysis that fails (or
+            times out) in place of its result, rather than raising it
+        **run_args :
+            the arguments of `DecisionCurveAnalysis.run`, for every analysis
+
+        Returns
+        -------
+        list
+            the result of each analysis, in order
+        """
+        return await asyncio.gather(*[self.run(analysis, timeout, **run_args)
+                                      for analysis in analyses],
+                                    return_exceptions=return_exceptions)
+
+    @property
+    def in_flight(self):
+        """The number of distinct analyses running or waiting to run
+        """
+        return len(self._in_flight)
+
+    async def _compute(self, analysis, run_args):
+        """Runs the analysis in the executor once a slot is free
+        """
+        async with self._semaphore():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, partial(analysis._run_result, **run_args))
+
+    def _semaphore(self):
+        """The semaphore capping analyses in flight, one per event loop
+        """
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores = {loop : asyncio.Semaphore(self.max_concurrency)}
+        return self._semaphores[loop]
+
+    def _forget(self, key, task):
+        if key in self._in_flight and self._in_flight[key][0] is task:
+            del self._in_flight[key]
+
+
+def default_runner():
+    """The runner shared by `DecisionCurveAnalysis.arun` calls without one
+
+    Returns
+    -------
+    AnalysisRunner
+    """
+    global _default_runner
+    if _default_runner is None:
+        _default_runner = AnalysisRunner()
+    return _default_runner
+
+
+def request_key(analysis, run_args):
+    """Identifies an analysis request by its algorithm, arguments, composite
+    predictors, smoothing and data
+
+    The key is built from the arguments as given, without validating them or
+    reading the data; the data is identified by the object (or path) passed
+    in, which the request in flight keeps alive
+
+    Parameters
+    ----------
+    analysis : dcapy.DecisionCurveAnalysis
+        the analysis
+    run_args : dict
+        the arguments it is run with
+
+    Returns
+    -------
+    str or None
+        equal for requests that give the same result, `None` for requests that
+        are profiled (each profile records its own run) or have arguments that
+        can't be compared
+    """
+    if run_args.get('profile') not in (None, False) or analysis._profile is not None:
+        return None
+    args = dict(analysis._args_dict())
+    data = args.pop('data')
+    data = data if isinstance(data, str) else id(data)
+    try:
+        return json.dumps([analysis.algorithm, args, analysis._composite_args,
+                           analysis._smoothing, dict(run_args), data],
+                          sort_keys=True, default=_json_value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _json_value(value):
+    """Converts the NumPy values of an argument to JSON, in full
+    """
+    if isinstance(value, np.ndarray):
+        return {'dtype' : str(value.dtype), 'values' : value.tolist()}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.dtype) or (isinstance(value, type) and
+                                       issubclass(value, np.generic)):
+        return str(np.dtype(value))
+    raise TypeError("{0} can't be part of a request key".format(type(value).__name__))
@@ -1,20 +1,26 @@
-from dcapy.calc import *
-from dcapy.validate import DCAError
+import numpy as np
+import dcapy.core as core
+from dcapy.planner import plan_analysis
+from dcapy.profiling import as_profile, phase
+from dcapy.result import DCAResult, MultiOutcomeResult
 
 
 def dca(data, outcome, predictors,
         thresh_lo=0.01, thresh_hi=0.99, thresh_step=0.01,
         probabilities=None, harms=None, intervention_per=100,
-        smooth_results=False, lowess_frac=0.10):
+        smooth_results=False, lowess_frac=0.10, composites=None, profile=None,
+        memory_limit=None, engine=None, workers=None, weights=None):
     """Performs decision curve analysis on the input data set
 
     Parameters
     ----------
-    data : pd.DataFrame
+    data : pd.DataFrame or dcapy.columnar.ColumnStore
         the data set to analyze
-    outcome : str
+    outcome : str or list(str)
         the column of the data frame to use as the outcome
         this must be coded as a boolean (T/F) or (0/1)
+        several outcome columns may be given, in which case each predictor is
+        counted once for all of them and the results have an 'outcome' column
     predictors : str OR list(str)
         the column(s) that will be used to predict the outcome
     thresh_lo : float
@@ -35,6 +41,26 @@ def dca(data, outcome, predictors,
         use lowess smoothing to smooth the result data series
     lowess_frac : float
         the fraction of the data used when estimating each endogenous value
+    composites : dict(str, list(str) or str)
+        multivariable predictors to fit and analyze alongside `predictors`,
+        keyed by name, each a list of columns or an additive formula
+        a column of predicted probabilities is added to `data` for each one, and
+        composites not listed in `predictors` are appended to them with harm 0
+    profile : bool, callable or dcapy.profiling.Profile, optional
+        record the time, rows, bytes and engine of each phase of the analysis;
+        a callable is called with each phase's record, see `dcapy.profiling.Profile`
+    memory_limit : int or str, optional
+        the most memory to use while counting (e.g. '512MB'); the rows are binned
+        in chunks to stay within it, see `dcapy.planner.plan_analysis`
+    engine : str, optional
+        the counting engine to use instead of the planner's choice, one of
+        `dcapy.core.ENGINES`
+    workers : int, optional
+        the number of threads to count predictors on instead of the planner's choice
+    weights : str, optional
+        a column of frequency or survey/sampling weights; each row counts as
+        its weight, so e.g. an aggregated (predictor value, outcome, count)
+        table gives the same curves as one row per patient
 
     Returns
     -------
@@ -42,55 +68,194 @@ def dca(data, outcome, predictors,
         A tuple of length 2 with net_benefit, interventions_avoided
         net_benefit : TODO
         interventions_avoided : TODO
+        for several outcomes, each has an 'outcome' column and the rows of
+        each outcome in turn
+
+    See Also
+    --------
+    dca_result : the same analysis, returning a `DCAResult` without building dataframes
+    dcapy.core.decision_curves : the analysis on plain arrays
+    """
+    result = dca_result(data, outcome, predictors, thresh_lo, thresh_hi, thresh_step,
+                        probabilities, harms, intervention_per, smooth_results,
+                        lowess_frac, composites, profile=profile,
+                        memory_limit=memory_limit, engine=engine, workers=workers,
+                        weights=weights)
+    return result.net_benefit_frame(), result.interventions_avoided_frame()
+
+
+def dca_result(data, outcome, predictors,
+               thresh_lo=0.01, thresh_hi=0.99, thresh_step=0.01,
+               probabilities=None, harms=None, intervention_per=100,
+               smooth_results=False, lowess_frac=0.10, composites=None,
+               dtype=np.float64, profile=None, memory_limit=None, engine=None,
+               workers=None, metrics=None, weights=None):
+    """Performs decision curve analysis on the input data set, see `dca`
+
+    The columns are passed to `dcapy.core` as arrays, so pandas is only needed
+    if `data` is a DataFrame
+
+    Parameters
+    ----------
+    dtype : np.dtype
+        the type to store the results as, `np.float64` (default) or `np.float32`
+    metrics : bool or list(str), optional
+        confusion matrix metrics to derive from the same counts and store in
+        the result's `metrics`, `True` for all of `dcapy.core.METRICS`
+    weights : str, optional
+        a column of frequency or survey/sampling weights, see `dca`
+    
+    Returns
+    -------
+    dcapy.result.DCAResult or dcapy.result.MultiOutcomeResult
+        the result (a `MultiOutcomeResult` if `outcome` is a list), with the
+        phases of the analysis in its `profile` if profiled, and the execution
+        plan it was counted with in its `plan`
+    """
+    profile = as_profile(profile)
+    outcomes = None if isinstance(outcome, str) else list(outcome)
+    if composites and outcomes is not None:
+        raise ValueError("composite predictors are fit to a single outcome")
+    if composites:
+        from dcapy.validate import composites_validate, materialize_composites
+        composites = composites_validate(composites, data, outcome)
+        with phase(profile, 'composites', len(data[outcome]), 'irls'):
+            data = materialize_composites(data, outcome, composites, weights=weights)
+        predictors = list(predictors) + [name for name in composites
+                                         if name not in predictors]
+        if harms is not None and len(harms) < len(predictors):
+            harms = list(harms) + [0]*(len(predictors) - len(harms))
+    predictors = [predictors] if isinstance(predictors, str) else list(predictors)
+
+    thresholds = core.threshold_grid(thresh_lo, thresh_hi, thresh_step)
+    if outcomes is None:
+        y = np.asarray(data[outcome])
+    else:
+        #one (n x k) matrix, so every outcome is counted in the same pass
+        y = np.column_stack([np.asarray(data[column]) for column in outcomes])
+    w = None if weights is None else np.asarray(data[weights])
+    plan = plan_analysis(len(y), len(predictors), thresholds, memory_limit, engine,
+                         workers, num_outcomes=1 if outcomes is None else len(outcomes),
+                         weighted=w is not None)
+    with phase(profile, 'count', len(y), plan.engine):
+        true_positives, false_positives = core.count_positives(
+            y, [np.asarray(data[predictor]) for predictor in predictors], thresholds,
+            plan.row_chunk, plan.engine, plan.workers, w)
+    with phase(profile, 'net_benefit', len(thresholds), 'numpy'):
+        if outcomes is None:
+            curves = _curves(true_positives, false_positives, y, thresholds, harms,
+                             intervention_per, w)
+        else:
+            curves = [np.stack(metric) for metric in zip(*[
+                _curves(true_positives[:, :, k], false_positives[:, :, k], y[:, k],
+                        thresholds, harms, intervention_per, w)
+                for k in range(len(outcomes))])]
+    result = _make_result(thresholds, predictors, *curves, smooth_results, lowess_frac,
+                          dtype, profile, outcomes)
+    result.plan = plan
+    if metrics:
+        with phase(profile, 'metrics', len(thresholds), 'numpy'):
+            names = None if metrics is True else list(metrics)
+            if outcomes is None:
+                _add_metrics(result, true_positives, false_positives, y, names, harms, w)
+            else:
+                for k, outcome in enumerate(outcomes):
+                    _add_metrics(result[outcome], true_positives[:, :, k],
+                                 false_positives[:, :, k], y[:, k], names, harms, w)
+    return result
+
+
+def _add_metrics(result, true_positives, false_positives, y, metrics, harms, weights=None):
+    """Stores confusion matrix metrics of one outcome in its result
+    """
+    num_events = np.sum(y) if weights is None else np.dot(weights, y)
+    computed = core.confusion_metrics(true_positives, false_positives, num_events,
+                                      core.total_weight(y, weights), result.thresholds,
+                                      metrics, harms)
+    result.metrics = {name : np.ascontiguousarray(values, dtype=result.dtype)
+                      for name, values in computed.items()}
+
+
+def _curves(true_positives, false_positives, y, thresholds, harms, intervention_per,
+            weights=None):
+    """The net benefit, interventions avoided and treat-all curves of one outcome
+    """
+    net_benefit = core.net_benefit_from_counts(true_positives, false_positives,
+                                               core.total_weight(y, weights), thresholds,
+                                               harms)
+    net_benefit_all = core.net_benefit_all(core.weighted_event_rate(y, weights), thresholds)
+    interventions_avoided = core.interventions_avoided(
+        net_benefit, net_benefit_all, thresholds, intervention_per)
+    return net_benefit, interventions_avoided, net_benefit_all
+
+
+def harm_sensitivity(data, outcome, predictors, harms,
+                     thresh_lo=0.01, thresh_hi=0.99, thresh_step=0.01,
+                     memory_limit=None, engine=None, workers=None, weights=None):
+    """The net benefit of each predictor over a range of harms, from one count
+
+    Parameters
+    ----------
+    data : pd.DataFrame or dcapy.columnar.ColumnStore
+        the data set to analyze
+    outcome : str
+        the column of the data frame to use as the outcome
+    predictors : str OR list(str)
+        the column(s) of predicted probabilities
+    harms : list(float) or np.ndarray
+        the harms to evaluate, length H, applied to every predictor, or of
+        shape (H, p), a harm for each predictor
+    thresh_lo, thresh_hi, thresh_step : float
+        the threshold grid, see `dca`
+    memory_limit, engine, workers : optional
+        how to count, see `dca`
+    weights : str, optional
+        a column of frequency or survey/sampling weights, see `dca`
+
+    Returns
+    -------
+    dict
+        the 'harms', 'thresholds' and 'predictors'; the 'net_benefit' surface
+        (H, T, p); the 'net_benefit_all' curve (T,); the harms at which each
+        predictor stops beating treating all ('break_even_all') and treating
+        none ('break_even_none'), each (T, p), see `dcapy.core.break_even_harms`;
+        and the 'plan' that was counted with
     """
-    #calculate useful constants for the net benefit calculation
-    num_observations = len(data[outcome])  # number of observations in data set
-    event_rate = mean(data[outcome])  # the rate at which the outcome happens
-
-    #create DataFrames for holding results
-    net_benefit, interventions_avoided = \
-        initialize_result_dataframes(event_rate, thresh_lo, thresh_hi, thresh_step)
-    for i, predictor in enumerate(predictors):  # for each predictor
-        net_benefit[predictor] = np.nan  # initialize new column of net_benefits
-
-        for j in range(0, len(net_benefit['threshold'])):  # for each threshold value
-            #calculate true/false positives
-            true_positives, false_positives = \
-                calc_tf_positives(data, outcome, predictor,
-                                  net_benefit['threshold'], j)
-
-            #calculate net benefit
-            net_benefit_value = \
-                calculate_net_benefit(j, net_benefit['threshold'], harms[i],
-                                      true_positives, false_positives,
-                                      num_observations)
-            net_benefit.set_value(j, predictor, net_benefit_value)
-
-        #calculate interventions_avoided for the predictor
-        interventions_avoided[predictor] = calculate_interventions_avoided(
-            predictor, net_benefit, intervention_per,
-            interventions_avoided['threshold'])
-
-        #smooth the predictor, if specified
-        if smooth_results:
-            nb_sm, ia_sm = lowess_smooth_results(predictor, net_benefit, 
-                                                 interventions_avoided, lowess_frac)
-            #add the smoothed series to the dataframe
-            pd.concat([net_benefit, nb_sm], axis=1)
-            pd.concat([interventions_avoided, ia_sm], axis=1)
-
-    return net_benefit, interventions_avoided
+    if not isinstance(outcome, str):
+        raise ValueError("harm sensitivity is analyzed for a single outcome")
+    predictors = [predictors] if isinstance(predictors, str) else list(predictors)
+    thresholds = core.threshold_grid(thresh_lo, thresh_hi, thresh_step)
+    y = np.asarray(data[outcome])
+    w = None if weights is None else np.asarray(data[weights])
+    plan = plan_analysis(len(y), len(predictors), thresholds, memory_limit, engine,
+                         workers, weighted=w is not None)
+    true_positives, false_positives = core.count_positives(
+        y, [np.asarray(data[predictor]) for predictor in predictors], thresholds,
+        plan.row_chunk, plan.engine, plan.workers, w)
+    net_benefit = core.net_benefit_from_counts(true_positives, false_positives,
+                                               core.total_weight(y, w), thresholds)
+    net_benefit_all = core.net_benefit_all(core.weighted_event_rate(y, w), thresholds)
+    break_even_all, break_even_none = core.break_even_harms(net_benefit, net_benefit_all)
+    return {'harms' : np.asarray(harms, dtype=np.float64),
+            'thresholds' : thresholds,
+            'predictors' : predictors,
+            'net_benefit' : core.harm_surface(net_benefit, harms),
+            'net_benefit_all' : net_benefit_all,
+            'break_even_all' : break_even_all,
+            'break_even_none' : break_even_none,
+            'plan' : plan}
 
 
 def stdca(data, outcome, tt_outcome, time_point, predictors,
-          thresh_lb=0.01, thresh_ub=0.99, thresh_step=0.01,
-          probability=None, harm=None, intervention_per=100,
-          smooth_results=False, lowess_frac=0.10, cmp_risk=False):
+          thresh_lo=0.01, thresh_hi=0.99, thresh_step=0.01,
+          probabilities=None, harms=None, intervention_per=100,
+          smooth_results=False, lowess_frac=0.10, cmp_risk=False, profile=None,
+          weights=None):
     """Performs survival-time decision curve analysis on the input data set
 
     Parameters
     ----------
-    data : pd.DataFrame
+    data : pd.DataFrame or dcapy.columnar.ColumnStore
         the data set to analyze
     outcome : str
         the column of the data frame to use as the outcome
@@ -100,18 +265,18 @@ def stdca(data, outcome, tt_outcome, time_point, predictors,
         the time point of interest for this analysis
     predictors : str OR list(str)
         the column(s) that will be used to predict the outcome
-    thresh_lb : float
+    thresh_lo : float
         lower bound for threshold probabilities (defaults to 0.01)
-    thresh_ub : float
+    thresh_hi : float
         upper bound for threshold probabilities (defaults to 0.99)
     thresh_step : float
         step size for the set of threshold probabilities [x_start:x_stop]
-    probability : bool or list(bool)
+    probabilities : bool or list(bool)
         whether the outcome is coded as a probability
-        probability must have the same length as the predictors list
-    harm : float or list(float)
+        probabilities must have the same length as the predictors list
+    harms : float or list(float)
         the harm associated with each predictor
-        harm must have the same length as the predictors list
+        harms must have the same length as the predictors list
     intervention_per : int
         interventions per `intervention_per` patients
     smooth_results : bool
@@ -119,7 +284,13 @@ def stdca(data, outcome, tt_outcome, time_point, predictors,
     lowess_frac : float
         the fraction of the data used when estimating each endogenous value
     cmp_risk : bool
-        use competitive risk 
+        use competing risk; competing risk analysis is not supported, so this
+        must be `False`
+    profile : bool, callable or dcapy.profiling.Profile, optional
+        record the time, rows, bytes and engine of each phase of the analysis
+    weights : str, optional
+        a column of frequency or survey/sampling weights; the Kaplan-Meier
+        estimates count each row as its weight
 
     Returns
     -------
@@ -127,41 +298,73 @@ def stdca(data, outcome, tt_outcome, time_point, predictors,
         A tuple of length 2 with net_benefit, interventions_avoided
         net_benefit : TODO
         interventions_avoided : TODO
+
+    Raises
+    ------
+    ValueError
+        if `cmp_risk` is `True`
     """
-    num_observations = len(data[outcome])  # number of observations in data set
+    result = stdca_result(data, outcome, tt_outcome, time_point, predictors,
+                          thresh_lo, thresh_hi, thresh_step, probabilities, harms,
+                          intervention_per, smooth_results, lowess_frac, cmp_risk,
+                          profile=profile, weights=weights)
+    return result.net_benefit_frame(), result.interventions_avoided_frame()
 
-    #get probability of event for all subjects
-    #TODO: function call here
 
-    #initialize the results dataframes
-    net_benefit, interventions_avoided = \
-        initialize_result_dataframes(event_rate, thresh_lb, thresh_ub, thresh_step)
-    
-    for i, predictor in enumerate(predictors):
-        net_benefit[predictor] = np.nan  # initialize
-
-        for j in range(0, len(net_benefit['threshold'])):
-            p_x = sum(data[predictor]>=net_benefit['threshold'][j])/num_observations
-            if p_x == 0:
-                #TODO: this should be more specific
-                raise DCAError("no observations with risk greater than threshold")
-            if cmp_risk:  #TODO: calculate using competing risk
-                from statsmodels.sandbox.survival import SurvivalTime
-                pass
-            else:  #TODO: calculate using Kaplan Meier
-                from statsmodels.sandbox.survival2 import KaplanMeier
-                pass
-
-            #TODO: calculate net benefit based on calculated risk
-
-        #TODO: calculate interventions avoided
-        
-        #smooth the predictor, if specified
-        if smooth_results:
-            nb_sm, ia_sm = lowess_smooth_results(predictor, net_benefit, 
-                                                 interventions_avoided, lowess_frac)
-            #add the smoothed series to the dataframe
-            pd.concat([net_benefit, nb_sm], axis=1)
-            pd.concat([interventions_avoided, ia_sm], axis=1)
-
-    return net_benefit, interventions_avoided
+def stdca_result(data, outcome, tt_outcome, time_point, predictors,
+                 thresh_lo=0.01, thresh_hi=0.99, thresh_step=0.01,
+                 probabilities=None, harms=None, intervention_per=100,
+                 smooth_results=False, lowess_frac=0.10, cmp_risk=False,
+                 dtype=np.float64, profile=None, weights=None):
+    """Performs survival-time decision curve analysis on the input data set, see `stdca`
+
+    Parameters
+    ----------
+    dtype : np.dtype
+        the type to store the results as, `np.float64` (default) or `np.float32`
+    weights : str, optional
+        a column of frequency or survey/sampling weights, see `stdca`
+
+    Returns
+    -------
+    dcapy.result.DCAResult
+        the result, with the phases of the analysis in its `profile` if profiled
+    """
+    if cmp_risk:
+        raise ValueError("competing risk analysis is not supported")
+    profile = as_profile(profile)
+    predictors = [predictors] if isinstance(predictors, str) else list(predictors)
+
+    thresholds = core.threshold_grid(thresh_lo, thresh_hi, thresh_step)
+    y = np.asarray(data[outcome])
+    with phase(profile, 'count', len(y), 'kaplan-meier'):
+        net_benefit, net_benefit_all = core.survival_net_benefit(
+            y, np.asarray(data[tt_outcome]),
+            [np.asarray(data[predictor]) for predictor in predictors],
+            thresholds, time_point, harms,
+            None if weights is None else np.asarray(data[weights], dtype=np.float64))
+    with phase(profile, 'net_benefit', len(thresholds), 'numpy'):
+        interventions_avoided = core.interventions_avoided(
+            net_benefit, net_benefit_all, thresholds, intervention_per)
+    return _make_result(thresholds, predictors, net_benefit, interventions_avoided,
+                        net_benefit_all, smooth_results, lowess_frac, dtype, profile)
+
+
+def _make_result(thresholds, predictors, net_benefit, interventions_avoided,
+                 net_benefit_all, smooth_results, lowess_frac, dtype, profile=None,
+                 outcomes=None):
+    """Collects the curves into a `DCAResult` (or, for several `outcomes`, a
+    `MultiOutcomeResult`), smoothing them if specified
+    """
+    if outcomes is None:
+        result = DCAResult(thresholds, predictors, net_benefit, interventions_avoided,
+                           net_benefit_all, dtype)
+    else:
+        result = MultiOutcomeResult(outcomes, thresholds, predictors, net_benefit,
+                                    interventions_avoided, net_benefit_all, dtype)
+    if smooth_results:
+        with phase(profile, 'smoothing', len(thresholds), 'lowess'):
+            result.smooth('lowess', lowess_frac)
+    result.profile = profile
+    return result
+
@@ -0,0 +1,1151 @@
+import threading
+import numpy as np
+import dcapy.algo as algo
+import dcapy.core as core
+import dcapy.validate as val
+from dcapy.columnar import ColumnStore
+from dcapy.planner import plan_analysis
+from dcapy.profiling import as_profile, phase
+from dcapy.validate import DCAError
+
+#the stages of an analysis, in the order they are run; each depends on those before it
+STAGES = ['validation', 'conversion', 'count', 'net_benefit', 'interventions_avoided',
+          'smoothing']
+
+#the first stage that changing each argument makes dirty
+_INVALIDATES = {'data' : 'validation',
+                'outcome' : 'validation',
+                'predictors' : 'validation',
+                'tt_outcome' : 'validation',
+                'probabilities' : 'conversion',
+                'thresh_lo' : 'count',
+                'thresh_hi' : 'count',
+                'thresh_step' : 'count',
+                'time_point' : 'count',
+                'cmp_risk' : 'count',
+                'harms' : 'net_benefit',
+                'intervention_per' : 'interventions_avoided',
+                'weights' : 'validation'}
+
+class DecisionCurveAnalysis:
+    """DecisionCurveAnalysis(...)
+        DecisionCurveAnalysis(algorithm='dca', **kwargs)
+
+    Create an object of class DecisionCurveAnalysis for generating
+    and plotting "net benefit" and "interventions avoided" curves
+    
+    Parameters
+    ----------
+    algorithm : str
+        the type of analysis to run
+        valid values are 'dca' (decision curve) or 'stdca' (survival time decision curve)
+    **kwargs : object
+        keyword arguments that are used in the analysis
+        `composites` may be passed to declare multivariable predictors, see `composites`
+        `profile` may be passed to record the phases of each run, see `run`
+        Arguments are validated when the analysis is run, not when they are set
+
+    Attributes
+    ----------
+    data : pd.DataFrame or dcapy.columnar.ColumnStore
+        The data set to analyze, with observations in each row, and
+        outcomes/predictors in the columns
+        A path to a directory of `.npy` columns or a `.npz` file may be given,
+        in which case the columns are memory-mapped instead of loaded
+    outcome : str or list(str)
+        The column in `data` to use as the outcome for the analysis
+        All observations in this column must be coded 0/1
+        Several outcomes may be given for a 'dca' analysis, in which case the
+        predictors are validated and counted once for all of them and the
+        result is a `dcapy.result.MultiOutcomeResult`; the predictors must then
+        already be probabilities, and there can be no composites
+    predictors : list(str)
+        The column(s) in `data` to use as predictors during the analysis
+        All observations, 'x', in this column must be in the range 0 <= x <= 1
+    composites : dict(str, list(str))
+        Multivariable predictors, keyed by name, declared as a list of columns
+        or an additive formula (e.g. `{'joint' : 'marker + age + famhistory'}`)
+        Each is fit once with logistic regression and added to the data (and
+        the predictors, if not already listed) as a column of probabilities
+    coefficients : dict(str, np.ndarray)
+        Logistic regression coefficients for the predictors that were
+        converted to probabilities (those with probability `False`) and for
+        each composite predictor
+    weights : str
+        An optional column of frequency or survey/sampling weights; each
+        observation counts as its weight, so aggregated (predictor value,
+        outcome, count) tables can be analyzed without expanding them
+    dirty_stages : list(str)
+        The stages of the analysis (see `STAGES`) that the next `run`
+        recomputes; changing an argument dirties only the stages that depend on it
+
+    Methods
+    -------
+    run : runs the analysis, storing the results as `result` (a `DCAResult`)
+        and, as dataframes, `results`
+    arun : runs the analysis from asyncio code, without blocking the event loop
+    explain : the plan `run` would count the analysis with, and its estimated
+        runtime and memory
+    harm_sensitivity : the net benefit over a range of harms, and the harms
+        at which each predictor stops beating treating all or none
+    crossing_points, optimal_intervals : where the curves cross, and where
+        each strategy is best, found exactly rather than on the threshold grid
+    smooth_results : use local regression (LOWESS), or a Savitzky-Golay or
+        penalized spline smoother, to smooth the results of the analysis
+    plot_net_benefit : TODO
+    plot_interv_avoid : TODO
+
+    Examples
+    --------
+    TODO
+    """
+    #universal parameters for dca
+    _common_args = {'data' : None,
+                    'outcome' : None,
+                    'predictors' : None,
+                    'thresh_lo' : 0.01,
+                    'thresh_hi' : 0.99,
+                    'thresh_step' : 0.01,
+                    'probabilities' : None,
+                    'harms' : None,
+                    'intervention_per' : 100,
+                    'weights' : None}
+    
+    #stdca-specific attributes
+    _stdca_args = {'tt_outcome' : None,
+                   'time_point' : None,
+                   'cmp_risk' : False}
+    
+    def __init__(self, algorithm='dca', **kwargs):
+        """Initializes the DecisionCurveAnalysis object
+
+        Arguments for the analysis may be passed in as keywords upon object initialization
+
+        Parameters
+        ----------
+        algorithm : str
+            the algorithm to use, valid options are 'dca' or 'stdca'
+        **kwargs : 
+            keyword arguments to populate instance attributes that will be used in analysis
+
+        Raises
+        ------
+        ValueError
+            if user doesn't specify a valid algorithm; valid values are 'dca' or 'stdca'
+            if the user specifies an invalid keyword
+            if `cmp_risk` is `True`, competing risk analysis is not supported
+        """
+        if algorithm not in ['dca', 'stdca']:
+            raise ValueError("did not specify a valid algorithm, only 'dca' and 'stdca' are valid")
+        self.algorithm = algorithm
+        #copy the defaults so that analyses don't share arguments
+        self._common_args = dict(self._common_args)
+        self._stdca_args = dict(self._stdca_args)
+
+        #set args based on keywords passed in
+        #this naively assigns values passed in -- validation occurs afterwords
+        composites = kwargs.pop('composites', None)
+        self._profile = as_profile(kwargs.pop('profile', None))
+        for kw in kwargs:
+            if kw in self._common_args:
+                self._common_args[kw] = kwargs[kw]  #assign
+                continue
+            elif kw in self._stdca_args:
+                self._stdca_args[kw] = kwargs[kw]
+            else:
+                raise ValueError("{kw} is not a valid DCA keyword"
+                                 .format(kw=repr(kw)))
+
+        if not isinstance(self.outcome, str) and self.outcome is not None:
+            if algorithm != 'dca':
+                raise ValueError("only 'dca' analyses can have several outcomes")
+            if composites:
+                raise ValueError("composite predictors are fit to a single outcome")
+        if self._stdca_args['cmp_risk']:
+            raise ValueError("competing risk analysis is not supported")
+        #validation is deferred until the analysis is run (or a validated
+        #attribute is read), so every stage starts out dirty
+        self._composite_args = composites
+        self._smoothing = None
+        self._stale = 0
+        self._stages = {}
+        self._built = None
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        #only the arguments are pickled (e.g. for a process pool); the stages
+        #are recomputed by the copy
+        state = dict(self.__dict__)
+        for name in ['_lock', '_stages', '_built']:
+            del state[name]
+        state['_stale'] = 0
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._stages = {}
+        self._built = None
+        self._lock = threading.RLock()
+
+    @property
+    def dirty_stages(self):
+        """The stages that the next `run` recomputes, in order
+
+        Changing an argument of the analysis makes the first stage that depends
+        on it, and every stage after it, dirty (see `STAGES`); e.g. changing
+        `intervention_per` only rescales the interventions avoided
+
+        Returns
+        -------
+        list(str)
+        """
+        return STAGES[self._stale:]
+
+    def _invalidate(self, argument):
+        """Marks the stages that depend on `argument` as dirty
+        """
+        stage = _INVALIDATES[argument]
+        if argument == 'harms' and self.algorithm == 'stdca':
+            stage = 'count'  #survival net benefit is computed with the harms
+        with self._lock:
+            self._stale = min(self._stale, STAGES.index(stage))
+
+    def _prepare(self, profile=None, convert=True):
+        """Runs the validation and (if `convert`) conversion stages, if they are dirty
+        """
+        with self._lock:
+            if self._stale <= STAGES.index('validation'):
+                with phase(profile, 'validation', engine='dropna') as record:
+                    data = val.data_validate(self._common_args['data'],
+                                             self._analysis_columns(self._composite_args))
+                    outcome = val.outcome_validate(data, self.outcome)
+                    val.weights_validate(data, self.weights)
+                    record['rows'] = len(data)
+                #fit any composite predictors, adding them to the data and the predictors
+                composites = val.composites_validate(self._composite_args, data, outcome)
+                with phase(profile if composites else None, 'composites', len(data), 'irls'):
+                    data, composite_coefficients = val.materialize_composites(
+                        data, outcome, composites, return_coefficients=True,
+                        weights=self.weights)
+                predictors = [] if self._common_args['predictors'] is None else \
+                    val.predictors_validate(self._common_args['predictors'], data)
+                predictors += [name for name in composites if name not in predictors]
+                self._stages.update(data=data, composites=composites, predictors=predictors,
+                                    composite_coefficients=composite_coefficients)
+                self._stale = STAGES.index('conversion')
+            if convert and self._stale <= STAGES.index('conversion'):
+                data = self._stages['data']
+                probabilities = val.probabilities_validate(self._common_args['probabilities'],
+                                                           self._stages['predictors'])
+                if not all(probabilities):
+                    #converted columns are assigned to a copy, so the validated
+                    #data can be converted again with other probabilities
+                    data = data.copy() if isinstance(data, ColumnStore) else \
+                        data.copy(deep=False)
+                #validate the data in each predictor column
+                with phase(profile, 'conversion', len(data), 'irls'):
+                    data, coefficients = val.validate_data_predictors(
+                        data, self.outcome, self._stages['predictors'], probabilities,
+                        return_coefficients=True, weights=self.weights)
+                coefficients.update(self._stages['composite_coefficients'])
+                self._stages.update(converted=data, coefficients=coefficients)
+                self._stale = STAGES.index('count')
+            return self._stages
+
+    def _thresholds(self):
+        """The threshold grid of the analysis, after validating its bounds
+        """
+        bounds = [self.threshold_bound(bound) for bound in ['lower', 'upper', 'step']]
+        for bound, value in zip(['lower', 'upper', 'step'], bounds):
+            val.threshold_validate(bound, value, bounds)
+        return core.threshold_grid(*bounds)
+
+    def _analysis_columns(self, composites=None):
+        """The columns of the data set that are used in the analysis
+
+        Returns
+        -------
+        list(str)
+            the outcome, weights, predictor and composite predictor columns
+        """
+        columns = self._outcomes() + [self._stdca_args['tt_outcome'], self.weights]
+        if self._common_args['predictors'] is not None:
+            columns += val.predictors_validate(self._common_args['predictors'])
+        for composite_columns in val.composites_validate(composites).values():
+            columns += composite_columns
+        return [column for column in columns if column is not None]
+
+    def _outcomes(self):
+        """The outcome column(s), as a list
+        """
+        if self.outcome is None or isinstance(self.outcome, str):
+            return [self.outcome]
+        return list(self.outcome)
+
+    def _args_dict(self):
+        """Forms the arguments to pass to the analysis algorithm
+
+        Returns
+        -------
+        dict(str, object)
+            A dictionary that can be unpacked and passed to the algorithm for the
+            analysis
+        """
+        if self.algorithm == 'dca':
+            return self._common_args
+        else:
+            return dict(self._common_args, **self._stdca_args)
+
+    def explain(self, memory_limit=None, engine=None, workers=None):
+        """Plans how `run` would count the analysis, without running it
+
+        The runtime and memory of each counting engine, on one thread and on
+        each core, are estimated from the size of the data, the threshold grid
+        and the number of cores, and the fastest that fits in `memory_limit`
+        is chosen, as `run` does; `print` the plan to see the estimates
+
+        Parameters
+        ----------
+        memory_limit : int or str, optional
+            the most memory to use while counting, see `run`
+        engine : str, optional
+            the counting engine to use instead of the fastest, see `run`
+        workers : int, optional
+            the number of threads to use instead of the fastest, see `run`
+
+        Returns
+        -------
+        dcapy.planner.ExecutionPlan
+            the chosen plan, with the other candidates in its `candidates`
+
+        Raises
+        ------
+        ValueError
+            if this isn't a 'dca' analysis, or it can't fit in `memory_limit`
+        """
+        if self.algorithm != 'dca':
+            raise ValueError("only 'dca' analyses are planned")
+        return plan_analysis(len(self.data), len(self.predictors), self._thresholds(),
+                             memory_limit, engine, workers,
+                             num_outcomes=len(self._outcomes()),
+                             weighted=self.weights is not None)
+
+    def run(self, return_results=False, dtype='float64', profile=None, memory_limit=None,
+            engine=None, workers=None, metrics=None):
+        """Performs the analysis
+
+        'dca' analyses are counted with the plan `explain` gives, which is
+        stored in `result.plan`
+
+        The arguments of the analysis are validated here, not when they are set.
+        Only the stages made dirty since the last run are recomputed (see
+        `dirty_stages`); a run with nothing dirty returns the same result, and
+        e.g. a run after changing `harms` reuses the counts
+
+        Parameters
+        ----------
+        return_results : bool
+            if `True`, sets the results to the instance attribute `results`
+            if `False` (default), the function returns the results as a tuple
+        dtype : str
+            the type to store the results as, 'float64' (default) or 'float32'
+        profile : bool, callable or dcapy.profiling.Profile, optional
+            record the time, rows, bytes and engine of each phase of the run in
+            `result.profile`; a callable is called with each phase's record
+            defaults to the `profile` the analysis was created with
+            only the stages that are recomputed are recorded
+        memory_limit : int or str, optional
+            the most memory to use while counting (e.g. '512MB'); the rows are
+            processed in chunks to stay within it (only for 'dca' analyses)
+        engine : str, optional
+            the counting engine to use instead of the planner's choice, one of
+            `dcapy.core.ENGINES` (only for 'dca' analyses)
+        workers : int, optional
+            the number of threads to count predictors on instead of the
+            planner's choice (only for 'dca' analyses)
+        metrics : bool or list(str), optional
+            confusion matrix metrics (e.g. 'sensitivity', 'npv') to derive from
+            the same counts, stored in `result.metrics`; `True` for all of
+            `dcapy.core.METRICS` (only for 'dca' analyses)
+
+        Returns
+        -------
+        tuple(pd.DataFrame, pd.DataFrame)
+            Returns net_benefit, interventions_avoided if `return_results=True`
+        """
+        result = self._run_result(dtype, profile, memory_limit, engine, workers, metrics)
+        if return_results:
+            return result.net_benefit_frame(), result.interventions_avoided_frame()
+        else:
+            self._result = result
+
+    async def arun(self, return_results=False, timeout=None, runner=None, **run_args):
+        """Performs the analysis without blocking the event loop
+
+        The analysis is run in an executor by `runner`, which caps the number of
+        analyses in flight and shares one computation between identical
+        concurrent requests, see `dcapy.aio.AnalysisRunner`
+
+        Parameters
+        ----------
+        return_results : bool
+            as for `run`
+        timeout : float, optional
+            the most seconds to wait for the result, raising `asyncio.TimeoutError`
+        runner : dcapy.aio.AnalysisRunner, optional
+            the runner to use, defaults to one shared by the whole process
+        **run_args :
+            the arguments of `run`
+
+        Returns
+        -------
+        tuple(pd.DataFrame, pd.DataFrame)
+            Returns net_benefit, interventions_avoided if `return_results=True`
+        """
+        from dcapy.aio import default_runner
+        runner = default_runner() if runner is None else runner
+        result = await runner.run(self, timeout, **run_args)
+        if return_results:
+            return result.net_benefit_frame(), result.interventions_avoided_frame()
+        else:
+            self._result = result
+
+    def _run_result(self, dtype='float64', profile=None, memory_limit=None, engine=None,
+                    workers=None, metrics=None):
+        """Runs the dirty stages of the analysis, returning its result without
+        storing it, see `run`
+        """
+        if profile is None and self._profile is not None:
+            profile = self._profile.copy()
+        profile = as_profile(profile)
+        options = {name : value for name, value in [('memory_limit', memory_limit),
+                                                    ('engine', engine),
+                                                    ('workers', workers),
+                                                    ('metrics', metrics)]
+                   if value is not None}
+        if options and self.algorithm != 'dca':
+            raise ValueError("{0} only supported for 'dca' analyses".format(
+                ', '.join(options) + (' is' if len(options) == 1 else ' are')))
+        count_options = (memory_limit, engine, workers)
+        with self._lock:
+            #counting with other options gives the same counts, but a new plan
+            if self._stages.get('count_options') != count_options:
+                self._stale = min(self._stale, STAGES.index('count'))
+            stale = self._stale
+            self._prepare(profile)
+            if self._stale <= STAGES.index('count'):
+                self._count(profile, count_options)
+            if self._stale <= STAGES.index('net_benefit'):
+                self._net_benefit(profile)
+            if self._stale <= STAGES.index('interventions_avoided'):
+                self._interventions_avoided(profile)
+            key = (np.dtype(dtype).name,
+                   metrics if metrics in (None, True, False) else tuple(metrics))
+            if stale < len(STAGES) or self._built is None or self._built[0] != key:
+                self._built = (key, self._build(dtype, metrics, profile))
+            self._stale = len(STAGES)
+            return self._built[1]
+
+    def _count(self, profile, count_options):
+        """The count stage: the true and false positives of each predictor at
+        each threshold ('dca'), or the survival net benefit ('stdca')
+        """
+        stages = self._stages
+        data, predictors = stages['converted'], stages['predictors']
+        thresholds = self._thresholds()
+        if isinstance(self.outcome, str):
+            y = np.asarray(data[self.outcome])
+        else:
+            #one (n x k) matrix, so every outcome is counted in the same pass
+            y = np.column_stack([np.asarray(data[column]) for column in self.outcome])
+        columns = [np.asarray(data[predictor]) for predictor in predictors]
+        weights = None if self.weights is None else np.asarray(data[self.weights])
+        if self.algorithm == 'dca':
+            plan = plan_analysis(len(y), len(predictors), thresholds, *count_options,
+                                 num_outcomes=1 if y.ndim == 1 else y.shape[1],
+                                 weighted=weights is not None)
+            with phase(profile, 'count', len(y), plan.engine):
+                counts = core.count_positives(y, columns, thresholds, plan.row_chunk,
+                                              plan.engine, plan.workers, weights)
+            stages.update(counts=counts, plan=plan)
+        else:
+            harms = val.harms_validate(self._common_args['harms'], predictors)
+            with phase(profile, 'count', len(y), 'kaplan-meier'):
+                net_benefit, net_benefit_all = core.survival_net_benefit(
+                    y, np.asarray(data[self._stdca_args['tt_outcome']]), columns,
+                    thresholds, self._stdca_args['time_point'], harms, weights)
+            stages.update(net_benefit=net_benefit, net_benefit_all=net_benefit_all)
+        stages.update(y=y, weights=weights, thresholds=thresholds,
+                      count_options=count_options)
+        self._stale = STAGES.index('net_benefit')
+
+    def _net_benefit(self, profile):
+        """The net benefit stage: the net benefit of each predictor, with its
+        harm, and of treating all, from the counts
+        """
+        stages = self._stages
+        if self.algorithm == 'dca':
+            y, weights, thresholds = stages['y'], stages['weights'], stages['thresholds']
+            harms = val.harms_validate(self._common_args['harms'], stages['predictors'])
+            true_positives, false_positives = stages['counts']
+            total = core.total_weight(y, weights)
+            with phase(profile, 'net_benefit', len(thresholds), 'numpy'):
+                if y.ndim == 1:
+                    net_benefit = core.net_benefit_from_counts(
+                        true_positives, false_positives, total, thresholds, harms)
+                    net_benefit_all = core.net_benefit_all(
+                        core.weighted_event_rate(y, weights), thresholds)
+                else:
+                    net_benefit = np.stack([core.net_benefit_from_counts(
+                        true_positives[:, :, k], false_positives[:, :, k], total,
+                        thresholds, harms) for k in range(y.shape[1])])
+                    net_benefit_all = np.stack([core.net_benefit_all(
+                        core.weighted_event_rate(y[:, k], weights), thresholds)
+                        for k in range(y.shape[1])])
+            stages.update(net_benefit=net_benefit, net_benefit_all=net_benefit_all,
+                          harms=harms)
+        self._stale = STAGES.index('interventions_avoided')
+
+    def _interventions_avoided(self, profile):
+        """The interventions avoided stage: the net benefit over treating all,
+        per `intervention_per` patients
+        """
+        stages = self._stages
+        thresholds = stages['thresholds']
+        net_benefit, net_benefit_all = stages['net_benefit'], stages['net_benefit_all']
+        with phase(profile, 'interventions_avoided', len(thresholds), 'numpy'):
+            if net_benefit.ndim == 2:
+                interventions_avoided = core.interventions_avoided(
+                    net_benefit, net_benefit_all, thresholds, self.intervention_per)
+            else:
+                interventions_avoided = np.stack([core.interventions_avoided(
+                    net_benefit[k], net_benefit_all[k], thresholds, self.intervention_per)
+                    for k in range(len(net_benefit))])
+        stages['interventions_avoided'] = interventions_avoided
+        self._stale = STAGES.index('smoothing')
+
+    def _build(self, dtype, metrics, profile):
+        """Collects the curves into a result, with its metrics, and smooths it as
+        the last `smooth_results` did
+        """
+        stages = self._stages
+        thresholds = stages['thresholds']
+        outcomes = None if isinstance(self.outcome, str) else list(self.outcome)
+        result = algo._make_result(thresholds, stages['predictors'], stages['net_benefit'],
+                                   stages['interventions_avoided'],
+                                   stages['net_benefit_all'], False, None, dtype, profile,
+                                   outcomes)
+        if self.algorithm == 'dca':
+            result.plan = stages['plan']
+        if metrics:
+            y, (true_positives, false_positives) = stages['y'], stages['counts']
+            with phase(profile, 'metrics', len(thresholds), 'numpy'):
+                names = None if metrics is True else list(metrics)
+                if outcomes is None:
+                    algo._add_metrics(result, true_positives, false_positives, y, names,
+                                      stages['harms'], stages['weights'])
+                else:
+                    for k, outcome in enumerate(outcomes):
+                        algo._add_metrics(result[outcome], true_positives[:, :, k],
+                                          false_positives[:, :, k], y[:, k], names,
+                                          stages['harms'], stages['weights'])
+        if self._smoothing is not None:
+            method, lowess_frac, smoother_args = self._smoothing
+            with phase(profile, 'smoothing', len(thresholds), method):
+                result.smooth(method, lowess_frac, **smoother_args)
+        return result
+
+    def harm_sensitivity(self, harms, memory_limit=None, engine=None, workers=None):
+        """The net benefit of each predictor over a range of harms
+
+        The predictors are counted once, however many harms there are; the
+        analysis's own `harms` are ignored
+
+        Parameters
+        ----------
+        harms : list(float) or np.ndarray
+            the harms to evaluate, length H, applied to every predictor, or of
+            shape (H, p), a harm for each predictor
+        memory_limit, engine, workers : optional
+            how to count, see `run`
+
+        Returns
+        -------
+        dict
+            the (H, T, p) 'net_benefit' surface and the harms at which each
+            predictor stops beating treating all or none at each threshold, see
+            `dcapy.algo.harm_sensitivity`
+
+        Raises
+        ------
+        ValueError
+            if this isn't a 'dca' analysis
+        """
+        if self.algorithm != 'dca':
+            raise ValueError("harm sensitivity is only supported for 'dca' analyses")
+        return algo.harm_sensitivity(self.data, self.outcome, self.predictors, harms,
+                                     *[self.threshold_bound(bound)
+                                       for bound in ['lower', 'upper', 'step']],
+                                     memory_limit, engine, workers, self.weights)
+
+    def crossing_points(self):
+        """The exact thresholds, between the lower and upper bounds, at which
+        the net benefit curves of the predictors, treating all and treating
+        none cross, independent of the threshold step
+
+        Returns
+        -------
+        dict(tuple(str, str), np.ndarray)
+            the crossing thresholds of each pair of strategies, see
+            `dcapy.crossing.crossing_points`
+        """
+        from dcapy.crossing import crossing_points
+        return crossing_points(*self._crossing_args())
+
+    def optimal_intervals(self):
+        """The threshold intervals, between the lower and upper bounds, over
+        which each strategy has the highest net benefit, independent of the
+        threshold step
+
+        Returns
+        -------
+        list(tuple(float, float, str))
+            `(start, stop, strategy)` intervals, see `dcapy.crossing.optimal_intervals`
+        """
+        from dcapy.crossing import optimal_intervals
+        return optimal_intervals(*self._crossing_args())
+
+    def _crossing_args(self):
+        """The arguments of `dcapy.crossing` functions for this analysis
+        """
+        if self.algorithm != 'dca' or not isinstance(self.outcome, str):
+            raise ValueError("crossings are found for 'dca' analyses of a single outcome")
+        return (self.data[self.outcome],
+                [self.data[predictor] for predictor in self.predictors],
+                self.predictors, self.harms,
+                (self.threshold_bound('lower'), self.threshold_bound('upper')),
+                None if self.weights is None else self.data[self.weights])
+
+    def smooth_results(self, lowess_frac=0.10, return_results=False, method='lowess',
+                       **smoother_args):
+        """Smooths the results using a LOWESS smoother, or a linear smoother
+        
+        Notes
+        -----
+        The 'savgol' (Savitzky-Golay) and 'pspline' (penalized spline) smoothers are
+        a single matrix for the threshold grid, which is built once and cached;
+        use `dcapy.calc.smoother_matrix` and `dcapy.calc.linear_smooth` to apply
+        the same matrix to stacks of curves, e.g. bootstrap replicates
+
+        Parameters
+        ----------
+        lowess_frac : float
+            the fraction of the endog value to use when smoothing
+        return_results : bool
+            if `True`, sets the results to the instance attribute `results`
+            if `False` (default), the function returns the results as a tuple
+        method : str
+            the smoother to use, valid values are 'lowess' (default), 'savgol', 'pspline'
+        **smoother_args :
+            arguments for the smoother, `window` and `polyorder` for 'savgol'
+            (`window` defaults to `lowess_frac` of the grid), `penalty` and
+            `difference_order` for 'pspline'
+        
+        Returns
+        -------
+        tuple(pd.DataFrame, pd.DataFrame)
+            smoothed predictor dataFrames for results if `return_results=True`
+        """
+        if return_results:
+            from dcapy.calc import smooth_result_curves
+            return smooth_result_curves(self.predictors, self.results['net benefit'],
+                                        self.results['interventions avoided'],
+                                        method, lowess_frac, **smoother_args)
+        else:
+            self.result.smooth(method, lowess_frac, **smoother_args)
+            #later runs smooth their results the same way
+            self._smoothing = (method, lowess_frac, smoother_args)
+
+    def save_results(self, path, name=None):
+        """Appends the results of the analysis to a binary results file
+
+        The analysis settings (outcome, predictors, harms, threshold grid) and a
+        fingerprint of the analyzed data are stored with the results; see
+        `dcapy.storage` for the file layout
+
+        Parameters
+        ----------
+        path : str
+            the results file, created if it doesn't exist
+        name : str, optional
+            the name to store the analysis under
+
+        Returns
+        -------
+        str or list(str)
+            the name the analysis was stored under (the names, one per outcome,
+            for several outcomes, see `dcapy.result.MultiOutcomeResult.save`)
+        """
+        from dcapy.storage import data_fingerprint
+        metadata = {'algorithm' : self.algorithm,
+                    'outcome' : self.outcome,
+                    'harms' : [float(harm) for harm in self.harms],
+                    'probabilities' : [bool(prob) for prob in self.probabilities],
+                    'composites' : self.composites,
+                    'thresholds' : [self.threshold_bound(bound)
+                                    for bound in ['lower', 'upper', 'step']],
+                    'intervention_per' : self.intervention_per,
+                    'weights' : self.weights,
+                    'data_fingerprint' : data_fingerprint(
+                        self.data, self._outcomes() + self.predictors +
+                        ([] if self.weights is None else [self.weights]))}
+        return self.result.save(path, name, metadata)
+
+    def plot_net_benefit(self, custom_axes=None, make_legend=True):
+        """Plots the net benefit from the analysis
+
+        Parameters
+        ----------
+        custom_axes : list(float)
+            a length-4 list of dimensions for the plot, `[x_min, x_max, y_min, y_max]`
+        make_legend : bool
+            whether to include a legend in the plot
+
+        Returns
+        -------
+        matplotlib.rc_context
+
+        """
+        try:
+            import matplotlib.pyplot as plt
+        except ImportError as e:
+            e.args += ("plotting the analysis requires matplotlib")
+            raise
+            
+        try:
+            net_benefit = self.results['net benefit']
+        except DCAError:
+            raise DCAError("must run analysis before plotting!")
+        
+        plt.plot(net_benefit)
+        plt.ylabel("Net Benefit")
+        plt.xlabel("Threshold Probability")
+        #prettify the graph
+        if custom_axes:
+            plt.axis(custom_axes)
+        else:  #use default
+            plt.axis([0, self.threshold_bound('upper')*100,
+                      -0.05, 0.20])
+        
+
+    def plot_interventions_avoided(self, custom_axes=None, make_legend=True):
+        """Plots the interventions avoided per `interventions_per` patients
+
+        Notes
+        -----
+        Generated plots are 'interventions avoided per `intervention_per` patients' vs. threshold
+
+        Parameters
+        ----------
+        custom_axes : list(float)
+            a length-4 list of dimensions for the plot, `[x_min, x_max, y_min, y_max]`
+        make_legend : bool
+            whether to include a legend in the plot
+
+        Returns
+        -------
+        matplotlib.rc_context
+            context manager for working with the newly-created plot
+        """
+        try:
+            import matplotlib.pyplot as plt
+        except ImportError as e:
+            e.args += ("plotting the analysis requires matplotlib")
+            raise
+
+        try:
+            interv_avoid = self.results['interventions avoided']
+        except DCAError:
+            raise DCAError("must run analysis before plotting!")
+        iaplot = plt.plot(interv_avoid)
+        #TODO: graph prettying/customization
+        return iaplot
+    
+    @property
+    def result(self):
+        """The results of the last run of the analysis
+
+        Returns
+        -------
+        dcapy.result.DCAResult or dcapy.result.MultiOutcomeResult
+
+        Raises
+        ------
+        DCAError
+            if the analysis hasn't been run
+        """
+        try:
+            return self._result
+        except AttributeError:
+            raise DCAError("must run analysis before accessing results")
+
+    @property
+    def results(self):
+        """The results of the last run of the analysis, as dataframes
+
+        Returns
+        -------
+        dict(str, pd.DataFrame)
+            `'net benefit'` and `'interventions avoided'` dataframes
+        """
+        return self.result.results
+
+    @property
+    def data(self):
+        """The data set to analyze, validated, with any converted predictors
+
+        Returns
+        -------
+        pd.DataFrame
+        """
+        return self._prepare()['converted']
+
+    @data.setter
+    def data(self, value):
+        """Set the data for the analysis
+
+        Parameters
+        ----------
+        value : pd.DataFrame, dcapy.columnar.ColumnStore or str
+            the data to analyze, or the path to columnar data
+        """
+        self._common_args['data'] = value
+        self._invalidate('data')
+
+    @property
+    def coefficients(self):
+        """The logistic regression coefficients for predictors that were
+        converted to probabilities
+
+        Notes
+        -----
+        Use `dcapy.logistic.predict_logistic` with these coefficients to score
+        new data without refitting
+
+        Returns
+        -------
+        dict(str, np.ndarray)
+            `[intercept, slope]` for each predictor with probability `False`
+        """
+        return self._prepare()['coefficients']
+
+    @property
+    def composites(self):
+        """The composite (multivariable) predictors of the analysis
+
+        Returns
+        -------
+        dict(str, list(str))
+            the columns of each composite predictor, keyed by name
+        """
+        return self._prepare(convert=False)['composites']
+
+    @property
+    def outcome(self):
+        """The outcome to use for the analysis
+        """
+        return self._common_args['outcome']
+
+    @outcome.setter
+    def outcome(self, value):
+        """Sets the column in the dataset to use as the outcome for the analysis
+        
+        Parameters
+        ----------
+        value : str
+            the name of the column in `data` to set as `outcome`
+        """
+        self._common_args['outcome'] = value
+        self._invalidate('outcome')
+
+    @property
+    def predictors(self):
+        """The predictors to use
+
+        Returns
+        -------
+        list(str)
+            A list of all predictors for the analysis, including composites
+        """
+        return self._prepare(convert=False)['predictors']
+
+    @predictors.setter
+    def predictors(self, value):
+        """Sets the predictors to use for the analysis
+
+        Parameters
+        ----------
+        value : list(str)
+            the list of predictors to use
+        """
+        self._common_args['predictors'] = value
+        self._invalidate('predictors')
+
+    def threshold_bound(self, bound):
+        """Gets the specified threshold boundary
+
+        Parameters
+        ----------
+        bound : str
+            the boundary to get; valid values are "lower", "upper", or "step"
+
+        Returns
+        -------
+        float
+            the current value of that boundary
+        """
+        mapping = {'lower' : 'thresh_lo',
+                   'upper' : 'thresh_hi',
+                   'step' : 'thresh_step'}
+        try:
+            return self._common_args[mapping[bound]]
+        except KeyError:
+            raise ValueError("did not specify a valid boundary")
+
+    def set_threshold_bounds(self, lower, upper, step=None):
+        """Sets the threshold boundaries (thresh_*) for the analysis
+
+        Notes
+        -----
+        Passing `None` for any of the parameters will skip that parameter
+        The analysis will be run over all steps, x, lower <= x <= upper
+
+        Parameters
+        ----------
+        lower : float
+            the lower boundary
+        upper : float
+            the upper boundary
+        step : float
+            the increment between calculations
+        """
+        for name, value in [('thresh_lo', lower), ('thresh_hi', upper),
+                            ('thresh_step', step)]:
+            if value is not None:
+                self._common_args[name] = value
+                self._invalidate(name)
+
+    @property
+    def probabilities(self):
+        """The list of probability values for each predictor
+
+        Returns
+        -------
+        list(bool)
+            the probability list
+        """
+        return val.probabilities_validate(self._common_args['probabilities'],
+                                          self.predictors)
+
+    @probabilities.setter
+    def probabilities(self, value):
+        """Sets the probabilities list for the analysis
+
+        Notes
+        -----
+        The length of the parameter `value` must match that of the predictors
+
+        Parameters
+        ----------
+        value : list(bool)
+            a list of probabilities to assign, one for each predictor
+        """
+        self._common_args['probabilities'] = value
+        self._invalidate('probabilities')
+
+    def set_probability_for_predictor(self, predictor, probability):
+        """Sets the probability value for the given predictor
+
+        Parameters
+        ----------
+        predictor : str
+            the predictor to set the probability value for
+        probability : bool
+            the probability value
+        """
+        probabilities = list(self.probabilities)
+        try:  # make sure we're setting a valid predictor
+            ind = self.predictors.index(predictor)
+        except ValueError as e:
+            e.args += ("did not specify a valid predictor",)
+            raise
+        probabilities[ind] = probability
+        self.probabilities = probabilities
+
+    @property
+    def harms(self):
+        """The list of harm values for the predictors
+
+        Returns
+        -------
+        list(float)
+        """
+        return val.harms_validate(self._common_args['harms'], self.predictors)
+
+    @harms.setter
+    def harms(self, value):
+        """Sets the list of harm values to be used
+
+        Notes
+        -----
+        The length of the parameter `value` must match that of the predictors
+
+        Parameters
+        ----------
+        value : list(float)
+            a list of floats to assign, one for each predictor
+        """
+        self._common_args['harms'] = value
+        self._invalidate('harms')
+
+    def set_harm_for_predictor(self, predictor, harm):
+        """Sets the harm value for the given predictor
+
+        Parameters
+        ----------
+        predictor : str
+            the predictor to set the harm value for
+        harm : float
+            the harm value (must be between 0 and 1)
+        """
+        harms = list(self.harms)
+        try:  # make sure specifying a valid predictor
+            ind = self.predictors.index(predictor)
+        except ValueError as e:
+            e.args += ("did not specify a valid predictor",)
+            raise
+        harms[ind] = harm
+        self.harms = harms
+
+    @property
+    def intervention_per(self):
+        """The number of patients per intervention
+
+        Returns
+        -------
+        int
+        """
+        return self._common_args['intervention_per']
+
+    @intervention_per.setter
+    def intervention_per(self, value):
+        """Sets the value of the number of patients to assume per intervention
+
+        Parameters
+        ----------
+        value : int
+        """
+        self._common_args['intervention_per'] = value
+        self._invalidate('intervention_per')
+
+    @property
+    def weights(self):
+        """The column of frequency or survey/sampling weights, if any
+
+        Notes
+        -----
+        Each observation counts as its weight, so an aggregated table of
+        (predictor value, outcome, count) rows gives the same curves as one
+        row per patient
+
+        Returns
+        -------
+        str or None
+        """
+        return self._common_args['weights']
+
+    @weights.setter
+    def weights(self, value):
+        """Sets the column of observation weights for the analysis
+
+        Parameters
+        ----------
+        value : str or None
+            the name of the column in `data`, or `None` to count every row once
+        """
+        self._common_args['weights'] = value
+        self._invalidate('weights')
+
+    @property
+    def time_to_outcome(self):
+        """The column in the data used to specify the time taken to reach the outcome
+        
+        Returns
+        -------
+        str
+        """
+        return self._stdca_args['tt_outcome']
+
+    @time_to_outcome.setter
+    def time_to_outcome(self, value):
+        """Sets the column to use as the `tt_outcome` for the analysis
+
+        Parameters
+        ----------
+        value : str
+        """
+        self._stdca_args['tt_outcome'] = value
+        self._invalidate('tt_outcome')
+
+    @property
+    def time_point(self):
+        """The time point of interest
+
+        Returns
+        -------
+        float
+        """
+        return self._stdca_args['time_point']
+
+    @time_point.setter
+    def time_point(self, value):
+        """Sets the time point of interest
+
+        Parameters
+        ----------
+        value : float
+        """
+        self._stdca_args['time_point'] = value
+        self._invalidate('time_point')
+
+    @property
+    def competing_risk(self):
+        """Run competing risk analysis (not supported, always `False`)
+
+        Returns
+        -------
+        bool
+        """
+        return self._stdca_args['cmp_risk']
+
+    @competing_risk.setter
+    def competing_risk(self, value):
+        """Sets whether to run a competing risk analysis
+
+        Parameters
+        ----------
+        value : bool
+
+        Raises
+        ------
+        TypeError
+            if `value` isn't a boolean
+        ValueError
+            if `value` is `True`, competing risk analysis is not supported
+        """
+        if not isinstance(value, bool):
+            raise TypeError("competing risk must be a boolean value")
+        if value:
+            raise ValueError("competing risk analysis is not supported")
+        self._stdca_args['cmp_risk'] = value
+        self._invalidate('cmp_risk')
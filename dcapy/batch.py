@@ -0,0 +1,492 @@
+import json
+import os
+import time
+import numpy as np
+import dcapy.core as core
+
+#the fields of a job, and their defaults
+JOB_FIELDS = {'name' : None,
+              'data' : None,
+              'algorithm' : 'dca',
+              'outcome' : None,
+              'predictors' : None,
+              'thresh_lo' : 0.01,
+              'thresh_hi' : 0.99,
+              'thresh_step' : 0.01,
+              'probabilities' : None,
+              'harms' : None,
+              'intervention_per' : 100,
+              'smooth_results' : False,
+              'lowess_frac' : 0.10,
+              'composites' : None,
+              'weights' : None,
+              'tt_outcome' : None,
+              'time_point' : None,
+              'cmp_risk' : False,
+              'dtype' : 'float64',
+              'output' : None}
+
+#the fields that don't change the counts, so jobs differing only in them share a count
+_CURVE_FIELDS = ['name', 'thresh_lo', 'thresh_hi', 'thresh_step', 'harms',
+                 'intervention_per', 'smooth_results', 'lowess_frac', 'dtype', 'output']
+
+
+def load_jobs(path):
+    """Reads a job file
+
+    A job file is YAML (`.yaml`/`.yml`, which needs PyYAML) or JSON holding
+    a list of jobs, or a mapping with the 'jobs', and optionally 'defaults'
+    (fields every job starts from), an 'output' file and the number of
+    'workers'. Each job is a mapping of the fields in `JOB_FIELDS`: the 'data'
+    (a `.csv` file, a `.npz` file or a directory of `.npy` columns), the
+    'algorithm', and the arguments of `dcapy.algo.dca` or `dcapy.algo.stdca`.
+    Relative paths are relative to the job file
+
+    Parameters
+    ----------
+    path : str
+        the job file
+
+    Returns
+    -------
+    dict
+        the 'jobs', with defaults and paths filled in, the 'output' and the
+        number of 'workers' (`None` if not given)
+
+    Raises
+    ------
+    ValueError
+        if the file or a job isn't valid
+    """
+    with open(path) as f:
+        if os.path.splitext(path)[1].lower() in ['.yaml', '.yml']:
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("reading YAML job files requires PyYAML; "
+                                  "job files can also be JSON")
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    if isinstance(spec, list):
+        spec = {'jobs' : spec}
+    if not isinstance(spec, dict) or not isinstance(spec.get('jobs'), list):
+        raise ValueError("a job file must hold a list of jobs, or a mapping with 'jobs'")
+    base_dir = os.path.dirname(os.path.abspath(path))
+    output = spec.get('output')
+    jobs = [make_job(dict(spec.get('defaults') or {}, **job), i, base_dir)
+            for i, job in enumerate(spec['jobs'])]
+    return {'jobs' : jobs,
+            'output' : None if output is None else os.path.join(base_dir, output),
+            'workers' : spec.get('workers')}
+
+
+def make_job(job, index=0, base_dir=None):
+    """Fills in a job's defaults, checking its fields
+
+    Parameters
+    ----------
+    job : dict
+        the job's fields, see `JOB_FIELDS`
+    index : int
+        the job's position, which names it if it has no 'name'
+    base_dir : str, optional
+        the directory relative 'data' and 'output' paths are relative to
+
+    Returns
+    -------
+    dict
+        the job
+    """
+    if not isinstance(job, dict):
+        raise ValueError("job {0} must be a mapping".format(index))
+    unknown = sorted(set(job) - set(JOB_FIELDS))
+    if unknown:
+        raise ValueError("job {0} has unknown fields {1}".format(index, unknown))
+    job = dict(JOB_FIELDS, **job)
+    if job['name'] is None:
+        job['name'] = 'job_{0}'.format(index)
+    for field in ['data', 'outcome', 'predictors']:
+        if job[field] is None:
+            raise ValueError("job {0} needs {1}".format(repr(job['name']), repr(field)))
+    if job['algorithm'] not in ['dca', 'stdca']:
+        raise ValueError("the algorithm of job {0} must be 'dca' or 'stdca'"
+                         .format(repr(job['name'])))
+    if isinstance(job['predictors'], str):
+        job['predictors'] = [job['predictors']]
+    if isinstance(job['outcome'], list) and job['algorithm'] != 'dca':
+        raise ValueError("only 'dca' jobs can have several outcomes")
+    if job['cmp_risk']:
+        raise ValueError("job {0} asks for competing risk analysis, which is not "
+                         "supported".format(repr(job['name'])))
+    for field in ['data', 'output']:
+        if job[field] is not None and base_dir is not None:
+            job[field] = os.path.join(base_dir, job[field])
+    return job
+
+
+def run_jobs(jobs, output=None, workers=1, log=None):
+    """Runs jobs, writing each result to a binary results file
+
+    Each data file is loaded and validated (rows with missing values
+    dropped, as `DecisionCurveAnalysis` does) once for all of its jobs. 'dca'
+    jobs on the same data that differ only in their threshold grid, harms,
+    `intervention_per`, smoothing or dtype share one count, at every
+    threshold of their grids; predictors are converted to probabilities once
+    for them. With more than one worker, counts (and jobs that can't share
+    one) run in a process pool, and the validated columns are passed to it in
+    shared memory (see `dcapy.shared.SharedColumns`)
+
+    A job that fails is reported, and the others still run
+
+    Parameters
+    ----------
+    jobs : list(dict)
+        the jobs, see `make_job`
+    output : str, optional
+        the results file of jobs without their own 'output'
+    workers : int
+        the number of worker processes, or 1 to run every job in this process
+    log : callable, optional
+        called with each job's record once it is written
+
+    Returns
+    -------
+    list(dict)
+        a record for each job, in order: its 'job' name, 'status' ('ok' or
+        'error'), any 'error', the 'rows' analyzed, the 'output' file and the
+        'names' it was stored under, the number of jobs it shared its load
+        ('load_shared') and its count ('count_shared') with, and the seconds
+        of each step: 'load', 'validation', 'conversion', 'count' (each shared
+        with the other jobs), 'curves' and 'write'
+    """
+    from contextlib import ExitStack
+    records = {job['name'] : _record(job, output) for job in jobs}
+    if len(records) != len(jobs):
+        raise ValueError("job names must be unique")
+    for record in records.values():
+        if record['output'] is None:
+            raise ValueError("job {0} has no output file".format(repr(record['job'])))
+    with ExitStack() as stack:
+        tasks = []
+        for path, file_jobs in _by_key(jobs, lambda job: job['data']).items():
+            try:
+                loaded = _load(path, file_jobs, records)
+            except Exception as e:
+                _fail(file_jobs, records, e)
+                continue
+            for data, data_jobs in loaded:
+                if workers > 1:
+                    from dcapy.shared import SharedColumns
+                    columns = sorted(set(column for job in data_jobs for column in
+                                         _job_columns(job) if column in data))
+                    data = stack.enter_context(SharedColumns(data, columns)).store
+                tasks.extend((data, group) for group in _count_groups(data_jobs))
+
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = stack.enter_context(ProcessPoolExecutor(workers))
+            futures = [executor.submit(run_group, data, group) for data, group in tasks]
+            try:
+                outcomes = (future.result() for future in futures)
+                _write(outcomes, records, log)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        else:
+            _write((run_group(data, group) for data, group in tasks), records, log)
+    return [records[job['name']] for job in jobs]
+
+
+def run_group(data, jobs):
+    """Runs jobs that share a count (or one job that can't share its count)
+
+    Parameters
+    ----------
+    data : pd.DataFrame or dcapy.columnar.ColumnStore
+        the validated data set
+    jobs : list(dict)
+        the jobs, which differ only in the fields that don't change the counts
+
+    Returns
+    -------
+    list(tuple(str, object, dict))
+        for each job, its name, its result (or the exception it raised) and the
+        seconds of each step
+    """
+    from dcapy import algo
+    from dcapy import validate as val
+    timings = {'conversion' : 0., 'count' : 0.}
+    try:
+        start = time.perf_counter()
+        job = jobs[0]
+        data = data.copy(deep=False) if hasattr(data, 'iloc') else data.copy()
+        outcome = val.outcome_validate(data, job['outcome'])
+        weights = val.weights_validate(data, job['weights'])
+        probabilities = val.probabilities_validate(job['probabilities'], job['predictors'])
+        for each in jobs:
+            val.harms_validate(each['harms'], each['predictors'] +
+                               [name for name in each['composites'] or {}
+                                if name not in each['predictors']])
+            _validate_grid(each)
+        data = val.validate_data_predictors(data, outcome, job['predictors'],
+                                            probabilities, weights=weights)
+        timings['conversion'] = time.perf_counter() - start
+        if job['algorithm'] == 'stdca' or job['composites']:
+            start = time.perf_counter()
+            if job['algorithm'] == 'stdca':
+                result = algo.stdca_result(
+                    data, outcome, job['tt_outcome'], job['time_point'], job['predictors'],
+                    **_curve_args(job), probabilities=probabilities, cmp_risk=job['cmp_risk'],
+                    weights=weights)
+            else:
+                result = algo.dca_result(data, outcome, job['predictors'], **_curve_args(job),
+                                         probabilities=probabilities,
+                                         composites=job['composites'], weights=weights)
+            return [(job['name'], result, dict(timings, curves=time.perf_counter() - start))]
+        start = time.perf_counter()
+        counts = _count(data, outcome, job['predictors'], weights, jobs)
+        timings['count'] = time.perf_counter() - start
+    except Exception as e:
+        return [(job['name'], e, dict(timings)) for job in jobs]
+
+    results = []
+    for job in jobs:
+        start = time.perf_counter()
+        try:
+            result = _job_result(job, outcome, *counts)
+        except Exception as e:
+            result = e
+        results.append((job['name'], result, dict(timings, curves=time.perf_counter() - start)))
+    return results
+
+
+def format_report(records):
+    """The per-job timing report as a table
+
+    Parameters
+    ----------
+    records : list(dict)
+        the records returned by `run_jobs`
+
+    Returns
+    -------
+    str
+    """
+    steps = ['load', 'validation', 'conversion', 'count', 'curves', 'write']
+    lines = ['{0:<24}{1:<8}{2:>10}{3:>8}{4:>8}'.format('job', 'status', 'rows', 'loads',
+                                                     'counts')
+             + ''.join('{0:>12}'.format(step) for step in steps)]
+    for record in records:
+        lines.append('{0:<24}{1:<8}{2:>10}{3:>8}{4:>8}'.format(
+            record['job'][:23], record['status'], _or_dash(record['rows']),
+            record['load_shared'], record['count_shared'])
+            + ''.join('{0:>12.4f}'.format(record[step] or 0.) for step in steps))
+        if record['error'] is not None:
+            lines.append('    ' + record['error'])
+    failed = sum(record['status'] != 'ok' for record in records)
+    lines.append('{0} jobs, {1} failed; loads and counts are the number of jobs '
+                 'sharing each'.format(len(records), failed))
+    return '\n'.join(lines)
+
+
+def _record(job, output):
+    return {'job' : job['name'], 'algorithm' : job['algorithm'], 'data' : job['data'],
+            'status' : None, 'error' : None, 'rows' : None,
+            'output' : job['output'] or output, 'names' : None,
+            'load_shared' : 1, 'count_shared' : 1,
+            'load' : None, 'validation' : None, 'conversion' : None, 'count' : None,
+            'curves' : None, 'write' : None}
+
+
+def _load(path, jobs, records):
+    """Loads and validates a data file once for its jobs
+
+    Returns
+    -------
+    list(tuple(data, list(dict)))
+        the validated data, and the jobs to run on it; columnar data is
+        validated once for each set of columns with missing values that jobs use
+    """
+    from dcapy import validate as val
+    from dcapy.columnar import ColumnStore
+    start = time.perf_counter()
+    if os.path.isdir(path) or path.lower().endswith('.npz'):
+        data = ColumnStore.open(path)
+    elif path.lower().endswith('.csv'):
+        import pandas as pd
+        data = pd.read_csv(path)
+    else:
+        raise ValueError("data must be a .csv file, a .npz file or a directory of "
+                         ".npy files")
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if isinstance(data, ColumnStore):
+        #only the rows missing a job's own columns are dropped for it
+        missing = set(column for column in set(sum([_job_columns(job) for job in jobs], []))
+                      if column in data and data[column].dtype.kind == 'f'
+                      and np.isnan(data[column]).any())
+        loaded = []
+        for key, key_jobs in _by_key(
+                jobs, lambda job: tuple(sorted(missing.intersection(_job_columns(job))))).items():
+            columns = sorted(set(column for job in key_jobs for column in _job_columns(job)
+                                 if column in data))
+            complete = slice(None)
+            if key:
+                complete = ~np.any([np.isnan(data[column]) for column in key], axis=0)
+            loaded.append((ColumnStore({column : data[column][complete]
+                                        for column in columns}), key_jobs))
+    else:
+        loaded = [(val.data_validate(data), jobs)]
+    validation_seconds = time.perf_counter() - start
+
+    for data, data_jobs in loaded:
+        for job in data_jobs:
+            records[job['name']].update(rows=len(data), load=load_seconds,
+                                        validation=validation_seconds,
+                                        load_shared=len(jobs))
+    return loaded
+
+
+def _count_groups(jobs):
+    """Splits jobs into groups that share a count
+    """
+    groups = []
+    for key, key_jobs in _by_key(jobs, _count_key).items():
+        if key is None:
+            groups.extend([job] for job in key_jobs)
+        else:
+            groups.append(key_jobs)
+    return groups
+
+
+def _count_key(job):
+    """What a job's counts depend on, or `None` if it can't share them
+    """
+    if job['algorithm'] != 'dca' or job['composites']:
+        return None
+    return json.dumps({field : value for field, value in job.items()
+                       if field not in _CURVE_FIELDS}, sort_keys=True)
+
+
+def _count(data, outcome, predictors, weights, jobs):
+    """Counts the predictors at every threshold of the jobs' grids
+
+    Returns
+    -------
+    tuple
+        the outcome(s) (n x k), the weights (or `None`), the position of each
+        threshold, and the true and false positives (T x p x k) at each
+    """
+    from dcapy.planner import plan_analysis
+    grids = [core.threshold_grid(job['thresh_lo'], job['thresh_hi'], job['thresh_step'])
+             for job in jobs]
+    thresholds = np.unique(np.concatenate(grids))
+    outcomes = [outcome] if isinstance(outcome, str) else outcome
+    y = np.column_stack([np.asarray(data[column]) for column in outcomes])
+    w = None if weights is None else np.asarray(data[weights])
+    plan = plan_analysis(len(y), len(predictors), thresholds, num_outcomes=len(outcomes),
+                         weighted=w is not None)
+    true_positives, false_positives = core.count_positives(
+        y, [np.asarray(data[predictor]) for predictor in predictors], thresholds,
+        plan.row_chunk, plan.engine, plan.workers, w)
+    positions = {threshold : i for i, threshold in enumerate(thresholds)}
+    return y, w, positions, true_positives, false_positives
+
+
+def _job_result(job, outcome, y, w, positions, true_positives, false_positives):
+    """A job's result from the shared counts
+    """
+    from dcapy import algo
+    thresholds = core.threshold_grid(job['thresh_lo'], job['thresh_hi'], job['thresh_step'])
+    rows = [positions[threshold] for threshold in thresholds]
+    curves = [algo._curves(true_positives[rows, :, k], false_positives[rows, :, k], y[:, k],
+                           thresholds, job['harms'], job['intervention_per'], w)
+              for k in range(y.shape[1])]
+    outcomes = None
+    if isinstance(outcome, str):
+        curves = curves[0]
+    else:
+        curves, outcomes = [np.stack(metric) for metric in zip(*curves)], outcome
+    return algo._make_result(thresholds, job['predictors'], *curves, job['smooth_results'],
+                             job['lowess_frac'], job['dtype'], None, outcomes)
+
+
+def _validate_grid(job):
+    """Checks a job's threshold grid as `DecisionCurveAnalysis` does
+    """
+    from dcapy import validate as val
+    fields = ['thresh_lo', 'thresh_hi', 'thresh_step']
+    bounds = [job[field] for field in fields]
+    for field, bound, value in zip(fields, ['lower', 'upper', 'step'], bounds):
+        try:
+            val.threshold_validate(bound, value, bounds)
+        except ValueError:
+            raise ValueError("job {0} has an invalid {1}: {2!r}"
+                             .format(repr(job['name']), field, value))
+
+
+def _curve_args(job):
+    return {field : job[field] for field in ['thresh_lo', 'thresh_hi', 'thresh_step',
+                                             'harms', 'intervention_per',
+                                             'smooth_results', 'lowess_frac', 'dtype']}
+
+
+def _job_columns(job):
+    """The columns of the data a job uses
+    """
+    columns = [job['outcome']] if isinstance(job['outcome'], str) else list(job['outcome'])
+    columns += list(job['predictors'])
+    for field in ['tt_outcome', 'weights']:
+        if job[field] is not None:
+            columns.append(job[field])
+    for composite_columns in (job['composites'] or {}).values():
+        columns += list(composite_columns)
+    return columns
+
+
+def _write(outcomes, records, log):
+    """Writes each result as it arrives, completing its record
+    """
+    for group in outcomes:
+        for name, result, timings in group:
+            record = records[name]
+            record.update(timings, count_shared=len(group))
+            if isinstance(result, Exception):
+                record.update(status='error', error='{0}: {1}'.format(
+                    type(result).__name__, result))
+            else:
+                start = time.perf_counter()
+                try:
+                    names = result.save(record['output'], name,
+                                        {'algorithm' : record['algorithm'],
+                                         'data' : record['data']})
+                except (OSError, ValueError) as e:
+                    record.update(status='error', error='{0}: {1}'.format(
+                        type(e).__name__, e))
+                else:
+                    record.update(status='ok', write=time.perf_counter() - start,
+                                  names=names if isinstance(names, list) else [names])
+            if log is not None:
+                log(record)
+
+
+def _fail(jobs, records, error):
+    for job in jobs:
+        records[job['name']].update(status='error', error='{0}: {1}'.format(
+            type(error).__name__, error), load_shared=len(jobs))
+
+
+def _by_key(items, key):
+    """Groups items by key, keeping the order keys are first seen
+    """
+    groups = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    return groups
+
+
+def _or_dash(value):
+    return '-' if value is None else value
@@ -9,6 +9,8 @@ def initialize_result_dataframes(event_rate, thresh_lo, thresh_hi, thresh_step):
     Parameters
     ----------
     event_rate : float
+        the rate of the outcome; for weighted observations, the weighted rate
+        (see `dcapy.core.weighted_event_rate`)
     thresh_lo : float
     thresh_hi : float
     thresh_step : float
@@ -32,12 +34,12 @@ def initialize_result_dataframes(event_rate, thresh_lo, thresh_hi, thresh_step):
     return net_benefit, interventions_avoided
 
 
-def calc_tf_positives(data, outcome, predictor, net_benefit_threshold, j):
+def calc_tf_positives(data, outcome, predictor, net_benefit_threshold, j, weights=None):
     """Calculate the number of true/false positives for the given parameters
 
     Parameters
     ----------
-    data : pd.DataFrame
+    data : pd.DataFrame or dcapy.columnar.ColumnStore
         the data set to analyze
     outcome : str
         the column of the data frame to use as the outcome
@@ -47,6 +49,9 @@ def calc_tf_positives(data, outcome, predictor, net_benefit_threshold, j):
         the threshold column of the net_benefit data frame
     j : int
         the index in the net_benefit data frame to use
+    weights : str, optional
+        the column of observation weights, in which case the counts are the
+        weighted sums
 
     Returns
     -------
@@ -55,18 +60,20 @@ def calc_tf_positives(data, outcome, predictor, net_benefit_threshold, j):
     """
     true_positives = false_positives = 0
     #create a filter mask
-    filter_mask = data[predictor] >= net_benefit_threshold[j]
-    filter_mask_sum = filter_mask.sum()
+    filter_mask = np.asarray(data[predictor]) >= net_benefit_threshold[j]
+    if weights is None:
+        filter_mask_sum = np.count_nonzero(filter_mask)
+        outcomes = np.asarray(data[outcome])
+    else:
+        w = np.asarray(data[weights], dtype=float)
+        filter_mask_sum = w[filter_mask].sum()
+        outcomes = np.asarray(data[outcome])*w
     if filter_mask_sum == 0:
         pass
     else:
-        #get all outcomes where the filter_mask is 'True'
-        filtered_outcomes = map(lambda x,y: x if y == True else np.nan,
-                                data[outcome],filter_mask)
-        filtered_outcomes = [outcome for outcome in filtered_outcomes
-                             if outcome is not np.nan]  #drop all NaN values
-        true_positives = mean(filtered_outcomes)*filter_mask_sum
-        false_positives = (1-mean(filtered_outcomes))*filter_mask_sum
+        #sum the outcomes where the filter_mask is 'True'
+        true_positives = outcomes[filter_mask].sum()
+        false_positives = filter_mask_sum - true_positives
 
     return true_positives, false_positives
 
@@ -173,43 +180,434 @@ def competing_risk(data, outcome, tt_outcome, use_kmf):
         pass
 
 
-def lowess_smooth_results(predictor, net_benefit, interventions_avoided, 
+#grids of up to this many points are smoothed with a dense (T, T) weight matrix;
+#larger grids only hold the weights of each point's neighborhood, a chunk at a time
+_DENSE_LOWESS_POINTS = 2000
+#the most neighborhood weights (times curves) held at once for larger grids
+_LOWESS_CHUNK_VALUES = 2**22
+
+
+def lowess_weights(x, lowess_frac):
+    """Computes the LOWESS neighborhood (tricube) weights for every point of a grid
+
+    Row `i` of the returned matrix holds the weight of each grid point in the
+    local regression centered on `x[i]`; since every decision curve of an
+    analysis shares the same threshold grid, these only need computing once
+
+    Parameters
+    ----------
+    x : np.ndarray
+        the grid (e.g. thresholds) the curves are evaluated on
+    lowess_frac : float
+        the fraction of the grid used when estimating each value
+
+    Returns
+    -------
+    np.ndarray
+        the (T, T) neighborhood weights
+    """
+    x = np.asarray(x, dtype=float)
+    num_neighbors = _lowess_neighbors(len(x), lowess_frac)
+    distance = np.abs(x[:, np.newaxis] - x[np.newaxis, :])
+    #radius of each neighborhood is the distance to the farthest neighbor
+    radius = np.partition(distance, num_neighbors - 1, axis=1)[:, num_neighbors - 1]
+    scaled = distance/radius[:, np.newaxis]
+    return np.where(scaled < 1, (1 - scaled**3)**3, 0.)
+
+
+def _lowess_neighbors(num_points, lowess_frac):
+    """The number of grid points in each LOWESS neighborhood
+    """
+    return min(max(int(lowess_frac*num_points + 1e-10), 2), num_points)
+
+
+class _LowessWindows:
+    """The neighborhood weights of a sorted grid, as `lowess_weights`, kept as
+    the window of `k` neighbors around each point
+
+    The `k` nearest neighbors of a point of a sorted grid are a contiguous
+    window of it, and no point outside the window has weight, so multiplying
+    by the weights only gathers each row's window: a block of rows at a time,
+    at most about `_LOWESS_CHUNK_VALUES` values, rather than a (T, T) matrix
+    """
+
+    def __init__(self, x, lowess_frac):
+        self.x = x
+        k = _lowess_neighbors(len(x), lowess_frac)
+        points = np.arange(len(x))
+        #binary search each point's window start: the first start whose next
+        #point out on the right is no nearer than its first point on the left
+        lo = np.clip(points - k + 1, 0, len(x) - k)
+        hi = np.clip(points, 0, len(x) - k)
+        while np.any(lo < hi):
+            mid = (lo + hi)//2
+            right = np.minimum(mid + k, len(x) - 1)
+            done = (mid + k >= len(x)) | (x[right] - x >= x - x[mid])
+            hi = np.where(done, mid, hi)
+            lo = np.where(done, lo, mid + 1)
+        self.starts, self.neighbors = lo, np.arange(k)
+        self.radius = np.maximum(x - x[lo], x[lo + k - 1] - x)
+
+    def dot(self, A, support=False):
+        """The product of the (T, T) weights (or, if `support`, of whether each
+        weight is nonzero) and `A` (T, m)
+        """
+        product = np.empty(A.shape)
+        block_rows = max(_LOWESS_CHUNK_VALUES//(len(self.neighbors)*A.shape[1]), 1)
+        for start in range(0, len(self.x), block_rows):
+            rows = slice(start, start + block_rows)
+            window = self.starts[rows, np.newaxis] + self.neighbors
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scaled = np.abs(self.x[window] - self.x[rows, np.newaxis]) \
+                    / self.radius[rows, np.newaxis]
+            #tricube weights, zero from the radius out (and for a zero radius)
+            weights = 1 - np.fmin(scaled, 1.)**3
+            weights *= weights*weights
+            if support:
+                weights = (weights > 1e-12).astype(float)
+            product[rows] = np.matmul(weights[:, np.newaxis, :], A[window])[:, 0]
+        return product
+
+
+def lowess_smooth(x, Y, lowess_frac=0.10, weights=None, iterations=3, out=None):
+    """Smooths every column of `Y` over the grid `x` with LOWESS
+
+    Each of the local linear regressions is computed for all columns at once with
+    matrix products against the neighborhood weights, followed by `iterations`
+    robustifying (bisquare) passes, as in `statsmodels.nonparametric.lowess`.
+    Missing values are given zero weight. Grids of more than
+    `_DENSE_LOWESS_POINTS` points (without precomputed `weights`) only hold the
+    weights of each point's neighborhood, so their memory doesn't grow as T^2
+
+    Parameters
+    ----------
+    x : np.ndarray
+        the grid the columns are evaluated on, length T
+    Y : np.ndarray
+        the curves to smooth, shape (T,) or (T, k)
+    lowess_frac : float
+        the fraction of the grid used when estimating each value
+    weights : np.ndarray, optional
+        precomputed neighborhood weights from `lowess_weights`
+    iterations : int
+        the number of robustifying iterations
+    out : np.ndarray, optional
+        a preallocated array (same shape as `Y`) to write the smoothed curves to
+
+    Returns
+    -------
+    np.ndarray
+        the smoothed curves
+    """
+    x = np.asarray(x, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    Y2 = Y.reshape(len(x), -1)
+    order = None
+    if weights is None and len(x) > _DENSE_LOWESS_POINTS:
+        #smoothed in grid order, and put back in the given order at the end
+        order = np.argsort(x, kind='stable')
+        x, Y2 = x[order], Y2[order]
+        weights = _LowessWindows(x, lowess_frac)
+        support_dot = lambda A: weights.dot(A, support=True)
+    else:
+        if weights is None:
+            weights = _cached_grid_matrix(lowess_weights, x, lowess_frac=lowess_frac)
+        support_dot = (weights > 1e-12).astype(float).dot
+    missing = np.isnan(Y2)
+    Y2 = np.where(missing, 0., Y2)
+    robust = (~missing).astype(float)
+    xc = x[:, np.newaxis]
+
+    for i in range(iterations + 1):
+        #weighted moments of every local regression, for all columns together
+        s0, sx, sy, sxx, sxy = np.split(weights.dot(np.hstack(
+            [robust, robust*xc, robust*Y2, robust*xc*xc, robust*xc*Y2])), 5, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_bar = sx/s0
+            y_bar = sy/s0
+            var = np.fmax(sxx/s0 - x_bar**2, 1e-12)
+            cov = sxy/s0 - x_bar*y_bar
+        fitted = y_bar + cov/var*(xc - x_bar)
+        #a regression needs at least 2 points with weight, otherwise keep the value
+        too_few = support_dot((robust > 1e-12).astype(float)) < 2
+        fitted[too_few] = Y2[too_few]
+        if i == iterations:
+            break
+        resid = np.abs(Y2 - fitted)
+        resid[missing] = np.nan
+        median = np.nanmedian(resid, axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scaled = np.where(median > 0, resid/(6*median), resid > 0)
+        robust = np.where(scaled < 1, (1 - scaled**2)**2, 0.)
+        robust[missing] = 0.
+
+    if order is not None:
+        fitted[order] = fitted.copy()
+    fitted = fitted.reshape(Y.shape)
+    if out is None:
+        return fitted
+    out[...] = fitted
+    return out
+
+
+def lowess_smooth_results(predictors, net_benefit, interventions_avoided,
                           lowess_frac):
     """Smooths the result data using local regression
 
-    This function uses the index of the passed in dataframes as exogenous
-    values for the smoothing
+    This function uses the 'threshold' column of the passed in dataframes as exogenous
+    values for the smoothing. The neighborhood weights are computed once and
+    applied to every predictor column of both dataframes
 
     Parameters
     ----------
+    predictors : str or list(str)
+        the predictor(s) to smooth for
+        (must match a column in both net_benefit/interventions_avoided dataframes)
     net_benefit : pd.DataFrame
         a dataframe of net benefit results
     interventions_avoided : pd.DataFrame
         a dataframe of interventions avoided results
-    predictors : str
-        the predictor to smooth for
-        (must match a column in both net_benefit/interventions_avoided dataframes)
     lowess_frac : float
         the fraction of the data used when estimating each endogenous value
 
     Returns:
     --------
     tuple(pd.DataFrame, pd.DataFrame)
-        smoothed net_benefit and interventions_avoided dataframes
+        smoothed net_benefit and interventions_avoided dataframes, with a
+        '<predictor>_sm' column for each predictor
     """
-    
-    #call smoothing function
-    import statsmodels.api as sm
-    lowess = sm.nonparametric.lowess
-    smoothed_net_benefit = lowess(net_benefit[predictor], net_benefit.index.values,
-                                  frac=lowess_frac, missing='drop')
-    smoothed_interv = lowess(interventions_avoided[predictor],
-                             interventions_avoided.index.values,
-                             frac=lowess_frac, missing='drop')
-    return pd.Series(smooth_net_benefit, index=net_benefit['threshold'],
-                     name='{}_sm'.format(predictor)), pd.Series(
-                         smooth_interv, index=interventions_avoided['threshold'],
-                         name='{}_sm'.format(predictor))
+    return smooth_result_curves(predictors, net_benefit, interventions_avoided,
+                                'lowess', lowess_frac)
+
+
+def savgol_matrix(x, window, polyorder=2):
+    """Builds the Savitzky-Golay smoothing matrix for a grid
+
+    Each value is replaced by a least squares polynomial of degree `polyorder`
+    fit over a window of `window` grid points centered on it; near the ends of
+    the grid the first/last full window is used. The fits use the grid values
+    themselves, so the grid doesn't need to be evenly spaced
+
+    Parameters
+    ----------
+    x : np.ndarray
+        the grid the curves are evaluated on, length T
+    window : int
+        the number of grid points in each window (odd, at most T)
+    polyorder : int
+        the degree of the local polynomials (less than `window`)
+
+    Returns
+    -------
+    np.ndarray
+        the (T, T) smoothing matrix
+    """
+    x = np.asarray(x, dtype=float)
+    num_points = len(x)
+    window = int(window)
+    if window % 2 == 0 or window > num_points:
+        raise ValueError("window must be odd and no larger than the threshold grid")
+    if polyorder >= window:
+        raise ValueError("polyorder must be less than window")
+    matrix = np.zeros((num_points, num_points))
+    powers = np.arange(polyorder + 1)
+    for i in range(num_points):
+        start = min(max(i - window//2, 0), num_points - window)
+        x_window = x[start:start + window]
+        #center and scale the window for a well conditioned fit
+        center, scale = x[i], np.ptp(x_window)/2 or 1.
+        vander = ((x_window - center)/scale)[:, np.newaxis]**powers
+        #the fitted value at x[i] is the constant term of the local polynomial
+        matrix[i, start:start + window] = np.linalg.pinv(vander)[0]
+    return matrix
+
+
+def pspline_matrix(x, penalty=10., difference_order=2):
+    """Builds the smoothing matrix of a penalized spline for a grid
+
+    This is the discrete penalized spline (Whittaker-Eilers) smoother, which
+    minimizes `|y - z|^2 + penalty*|D z|^2` where `D` takes differences of
+    order `difference_order` along the grid, so the smoother is `(I + penalty*D'D)^-1`
+
+    Parameters
+    ----------
+    x : np.ndarray
+        the grid the curves are evaluated on, length T
+    penalty : float
+        the roughness penalty, larger values give smoother curves
+    difference_order : int
+        the order of the differences that are penalized
+
+    Returns
+    -------
+    np.ndarray
+        the (T, T) smoothing matrix
+    """
+    num_points = len(x)
+    if penalty < 0:
+        raise ValueError("penalty must be non-negative")
+    difference = np.diff(np.eye(num_points), n=difference_order, axis=0)
+    return np.linalg.inv(np.eye(num_points) + penalty*difference.T.dot(difference))
+
+
+def smoother_matrix(x, method, **smoother_args):
+    """Gets the (cached) linear smoothing matrix of `method` for a grid
+
+    Every curve of an analysis shares the threshold grid, so the matrix is only
+    built the first time it is needed for a grid and set of arguments
+
+    Parameters
+    ----------
+    x : np.ndarray
+        the grid the curves are evaluated on
+    method : str
+        the smoother, valid values are 'savgol' or 'pspline'
+    **smoother_args :
+        arguments for `savgol_matrix` or `pspline_matrix`
+
+    Returns
+    -------
+    np.ndarray
+        the (T, T) smoothing matrix (read only)
+    """
+    builders = {'savgol' : savgol_matrix,
+                'pspline' : pspline_matrix}
+    try:
+        builder = builders[method]
+    except KeyError:
+        raise ValueError("did not specify a valid smoother, valid values are "
+                         "'lowess', 'savgol', 'pspline'")
+    return _cached_grid_matrix(builder, x, **smoother_args)
+
+
+def linear_smooth(matrix, Y):
+    """Applies a linear smoothing matrix to curves
+
+    Parameters
+    ----------
+    matrix : np.ndarray
+        the (T, T) smoothing matrix, see `smoother_matrix`
+    Y : np.ndarray
+        the curves to smooth, with the grid along the first axis, e.g. shape
+        (T,), (T, p) or (T, p, replicates)
+
+    Returns
+    -------
+    np.ndarray
+        the smoothed curves, same shape as `Y`
+    """
+    Y = np.asarray(Y, dtype=float)
+    #flatten the trailing dimensions so all curves are smoothed in one product
+    return matrix.dot(Y.reshape(Y.shape[0], -1)).reshape(Y.shape)
+
+
+def smooth_curves(x, Y, method='lowess', lowess_frac=0.10, out=None, **smoother_args):
+    """Smooths curves over a grid with the specified smoother
+
+    Parameters
+    ----------
+    x : np.ndarray
+        the grid the curves are evaluated on, length T
+    Y : np.ndarray
+        the curves to smooth, with the grid along the first axis
+    method : str
+        the smoother, valid values are 'lowess' (default), 'savgol' or 'pspline'
+    lowess_frac : float
+        the fraction of the grid used when estimating each value; for 'savgol',
+        sets the window (at most the length of the grid) if `window` isn't given
+    out : np.ndarray, optional
+        a preallocated array (same shape as `Y`, may be `Y` itself) to write the
+        smoothed curves to
+    **smoother_args :
+        arguments for the 'savgol' (`window`, `polyorder`) or
+        'pspline' (`penalty`, `difference_order`) smoothers
+
+    Returns
+    -------
+    np.ndarray
+        the smoothed curves, same shape as `Y`
+    """
+    if method == 'lowess':
+        return lowess_smooth(x, Y, lowess_frac, out=out)
+    if method == 'savgol' and 'window' not in smoother_args:
+        window = int(np.ceil(lowess_frac*len(x))) | 1  # must be odd
+        #no wider than the grid (keeping it odd), so short grids can be smoothed
+        window = min(max(window, 3), len(x) - 1 + len(x) % 2)
+        smoother_args['window'] = window
+        smoother_args.setdefault('polyorder', min(2, window - 1))
+    smoothed = linear_smooth(smoother_matrix(x, method, **smoother_args), Y)
+    if out is None:
+        return smoothed
+    out[...] = smoothed
+    return out
+
+
+def smooth_result_curves(predictors, net_benefit, interventions_avoided,
+                         method='lowess', lowess_frac=0.10, **smoother_args):
+    """Smooths the result data with the specified smoother
+
+    The predictor columns of both dataframes are smoothed together as one block
+
+    Parameters
+    ----------
+    predictors : str or list(str)
+        the predictor(s) to smooth for
+    net_benefit : pd.DataFrame
+        a dataframe of net benefit results
+    interventions_avoided : pd.DataFrame
+        a dataframe of interventions avoided results
+    method : str
+        the smoother, valid values are 'lowess' (default), 'savgol' or 'pspline'
+    lowess_frac : float
+        the fraction of the data used when estimating each value
+    **smoother_args :
+        arguments for the smoother, see `smooth_curves`
+
+    Returns
+    -------
+    tuple(pd.DataFrame, pd.DataFrame)
+        smoothed net_benefit and interventions_avoided dataframes, with a
+        '<predictor>_sm' column for each predictor
+    """
+    if isinstance(predictors, str):
+        predictors = [predictors]
+    num_predictors = len(predictors)
+    thresholds = net_benefit['threshold'].values
+
+    block = np.empty((len(thresholds), 2*num_predictors))
+    block[:, :num_predictors] = net_benefit[predictors].values
+    block[:, num_predictors:] = interventions_avoided[predictors].values
+    smooth_curves(thresholds, block, method, lowess_frac, out=block, **smoother_args)
+
+    columns = ['{}_sm'.format(predictor) for predictor in predictors]
+    return pd.DataFrame(block[:, :num_predictors], index=net_benefit.index,
+                        columns=columns), \
+           pd.DataFrame(block[:, num_predictors:], index=interventions_avoided.index,
+                        columns=columns)
+
+
+#matrices that only depend on the threshold grid, see _cached_grid_matrix
+_grid_matrix_cache = {}
+_max_cached_matrices = 16
+
+
+def _cached_grid_matrix(builder, x, **kwargs):
+    """Builds `builder(x, **kwargs)`, or returns it from the cache if it has
+    already been built for this grid and set of arguments
+    """
+    from dcapy.logistic import column_fingerprint
+    x = np.asarray(x, dtype=float)
+    key = (builder.__name__, column_fingerprint(x), tuple(sorted(kwargs.items())))
+    try:
+        return _grid_matrix_cache[key]
+    except KeyError:
+        pass
+    matrix = builder(x, **kwargs)
+    matrix.flags.writeable = False
+    if len(_grid_matrix_cache) >= _max_cached_matrices:
+        del _grid_matrix_cache[next(iter(_grid_matrix_cache))]
+    _grid_matrix_cache[key] = matrix
+    return matrix
 
 
 def frange(start, stop, step):
@@ -0,0 +1,219 @@
+import os
+import struct
+import zipfile
+import numpy as np
+
+#size of the fixed part of a zip local file header, and the struct for it
+_ZIP_LOCAL_HEADER = struct.Struct('<4s5H3I2H')
+
+
+class ColumnStore:
+    """ColumnStore(columns)
+
+    A read-only set of equal-length columns, used in place of a pandas DataFrame
+    as the data for an analysis
+
+    Columns opened from disk (see `open_columns`) are memory-mapped: nothing is
+    read until a column is used, and then only the pages that are touched.
+    Assigning to a column (e.g. when predictors are converted to probabilities)
+    holds the new values in memory without changing the files
+
+    Parameters
+    ----------
+    columns : dict(str, np.ndarray or callable)
+        the columns, keyed by name; a callable is called (once) to open the
+        column the first time it is used
+    num_rows : int, optional
+        the number of rows, required if every column is a callable
+
+    Attributes
+    ----------
+    columns : list(str)
+        the names of the columns
+    """
+
+    def __init__(self, columns, num_rows=None):
+        self._columns = dict(columns)
+        self._num_rows = num_rows
+        for name, values in self._columns.items():
+            if not callable(values):
+                self._check_length(name, values)
+
+    @classmethod
+    def open(cls, path):
+        """Opens a directory of `.npy` columns or a `.npz` file, see `open_columns`
+        """
+        return open_columns(path)
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __len__(self):
+        if self._num_rows is None:
+            self[self.columns[0]]  # open a column to learn the length
+        return self._num_rows
+
+    def __getitem__(self, name):
+        try:
+            values = self._columns[name]
+        except KeyError:
+            raise KeyError("{name} is not a column".format(name=repr(name)))
+        if callable(values):
+            values = self._columns[name] = values()
+            self._check_length(name, values)
+        return values
+
+    def __setitem__(self, name, values):
+        values = np.asarray(values)
+        self._check_length(name, values)
+        self._columns[name] = values
+
+    def __repr__(self):
+        return "ColumnStore(columns={0})".format(self.columns)
+
+    def copy(self):
+        """A store of the same columns, without copying them; assigning to a
+        column of the copy doesn't change this store
+
+        Returns
+        -------
+        ColumnStore
+        """
+        return ColumnStore(self._columns, self._num_rows)
+
+    def dropna(self, columns=None):
+        """Drops the rows with a missing (NaN) value in any of `columns`
+
+        Only `columns` are read. If none of them have missing values the store is
+        returned unchanged, so memory-mapped columns stay on disk; otherwise a new
+        store holding only the complete rows of `columns` is returned
+
+        Parameters
+        ----------
+        columns : list(str), optional
+            the columns to check, defaults to all columns
+
+        Returns
+        -------
+        ColumnStore
+        """
+        columns = self.columns if columns is None else list(columns)
+        complete = None
+        for name in columns:
+            values = self[name]
+            if values.dtype.kind not in 'fc':
+                continue  # only floating point columns can hold NaN
+            missing = np.isnan(values)
+            if missing.any():
+                complete = ~missing if complete is None else complete & ~missing
+        if complete is None:
+            return self
+        return ColumnStore({name: self[name][complete] for name in columns})
+
+    def _check_length(self, name, values):
+        if values.ndim != 1:
+            raise ValueError("{name} must be one dimensional".format(name=repr(name)))
+        if self._num_rows is None:
+            self._num_rows = len(values)
+        elif len(values) != self._num_rows:
+            raise ValueError("all columns must have the same number of rows")
+
+
+def open_columns(path):
+    """Opens columnar data from disk without loading it
+
+    Parameters
+    ----------
+    path : str
+        a directory holding one `<column>.npy` file per column, or a `.npz` file
+        with one `<column>.npy` member per column (e.g. written by `save_columns`);
+        uncompressed `.npz` members are memory-mapped, compressed ones are read
+        into memory when first used
+
+    Returns
+    -------
+    ColumnStore
+        the columns, memory-mapped and opened on first use
+
+    Raises
+    ------
+    ValueError
+        if `path` is not a directory or a `.npz` file
+    """
+    if os.path.isdir(path):
+        columns = {}
+        for filename in sorted(os.listdir(path)):
+            name, ext = os.path.splitext(filename)
+            if ext == '.npy':
+                columns[name] = _opener(np.load, os.path.join(path, filename),
+                                        mmap_mode='r')
+        return ColumnStore(columns)
+    if zipfile.is_zipfile(path):
+        columns = {}
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                name, ext = os.path.splitext(info.filename)
+                if ext == '.npy':
+                    columns[name] = _opener(_memmap_member, path, info)
+        return ColumnStore(columns)
+    raise ValueError("path must be a directory of .npy files or a .npz file")
+
+
+def save_columns(path, data, columns=None):
+    """Writes columns of a data set to an uncompressed `.npz` file (if `path` ends in
+    '.npz') or a directory of `.npy` files that `open_columns` can memory-map
+
+    Parameters
+    ----------
+    path : str
+        the file or directory to write
+    data : pd.DataFrame or ColumnStore
+        the data set
+    columns : list(str), optional
+        the columns to write, defaults to all numeric columns
+    """
+    if columns is None:
+        columns = [name for name in data.columns
+                   if np.asarray(data[name]).dtype.kind in 'biuf']
+    arrays = {name: np.ascontiguousarray(data[name]) for name in columns}
+    if path.endswith('.npz'):
+        np.savez(path, **arrays)
+    else:
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        for name, values in arrays.items():
+            np.save(os.path.join(path, name + '.npy'), values)
+
+
+def _opener(func, *args, **kwargs):
+    """Defers `func(*args, **kwargs)` until the column is used
+    """
+    return lambda: func(*args, **kwargs)
+
+
+def _memmap_member(path, info):
+    """Memory-maps an uncompressed `.npy` member of a zip file
+    """
+    if info.compress_type != zipfile.ZIP_STORED:
+        with zipfile.ZipFile(path) as archive:
+            with archive.open(info) as f:
+                return np.lib.format.read_array(f, allow_pickle=False)
+    with open(path, 'rb') as f:
+        f.seek(info.header_offset)
+        header = _ZIP_LOCAL_HEADER.unpack(f.read(_ZIP_LOCAL_HEADER.size))
+        name_length, extra_length = header[-2:]
+        f.seek(name_length + extra_length, os.SEEK_CUR)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if dtype.hasobject:
+        raise ValueError("columns cannot hold python objects")
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                     order='F' if fortran_order else 'C')
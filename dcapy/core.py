@@ -0,0 +1,788 @@
+import warnings
+import numpy as np
+
+#the engines `count_positives` can count with
+ENGINES = ['histogram', 'regular', 'sort', 'loop']
+#the metrics `confusion_metrics` can derive from the counts
+METRICS = ['true_positives', 'false_positives', 'true_negatives', 'false_negatives',
+           'sensitivity', 'specificity', 'ppv', 'npv', 'net_benefit',
+           'standardized_net_benefit', 'net_reduction']
+
+
+def threshold_grid(thresh_lo=0.01, thresh_hi=0.99, thresh_step=0.01):
+    """The threshold probabilities of an analysis
+
+    The grid is built by repeatedly adding `thresh_step`, exactly as the
+    dataframe functions build it, so results computed from either agree
+
+    Parameters
+    ----------
+    thresh_lo : float
+        lower bound for threshold probabilities (defaults to 0.01)
+    thresh_hi : float
+        upper bound for threshold probabilities (defaults to 0.99)
+    thresh_step : float
+        step size for the set of threshold probabilities
+
+    Returns
+    -------
+    np.ndarray
+        the thresholds, `thresh_lo <= x <= thresh_hi`
+    """
+    thresholds = []
+    threshold, stop = thresh_lo, thresh_hi + thresh_step
+    while threshold < stop:
+        thresholds.append(threshold)
+        threshold += thresh_step
+    return np.array(thresholds, dtype=np.float64)
+
+
+def count_positives(y, P, thresholds, row_chunk=None, engine='histogram', workers=1,
+                    weights=None):
+    """Counts the true and false positives of each predictor at each threshold
+
+    An observation is positive at a threshold if its predictor value is greater
+    than or equal to the threshold. Each engine gives the same counts:
+
+    * 'histogram' (default) bins each predictor against the thresholds with a
+      binary search and counts the bins, one pass over the data per predictor
+    * 'regular' computes the bins arithmetically, for evenly spaced thresholds
+      (e.g. from `threshold_grid`, see `grid_step`), correcting any value that
+      rounds into the wrong bin; uneven thresholds are binary searched
+    * 'sort' sorts each predictor and binary searches the thresholds in it,
+      cheap when there are many more thresholds than rows
+    * 'loop' compares the predictor against one threshold at a time, with the
+      least memory but one pass over the data per threshold
+
+    Passing `row_chunk` counts the rows in chunks, adding up the counts of
+    each, so the memory used does not grow with the number of rows (e.g. for
+    memory-mapped columns). `dcapy.planner.plan_analysis` picks an engine,
+    chunk size and number of workers for an analysis
+
+    Several outcomes can be counted at once from an (n x k) outcome matrix;
+    each predictor is then binned or sorted once for all of the outcomes
+
+    With `weights`, each observation counts as its weight rather than once,
+    e.g. the number of patients in each row of an aggregated (predictor value,
+    outcome, count) table, or a survey weight; the counts are weighted sums
+
+    Parameters
+    ----------
+    y : np.ndarray
+        the outcome, coded 0/1, length n, or an (n x k) matrix of k outcomes
+    P : np.ndarray or list(np.ndarray)
+        the predictors, an (n x p) matrix, a length n vector, or a list of
+        length n columns
+    thresholds : np.ndarray
+        the threshold probabilities, length T
+    row_chunk : int, optional
+        the number of rows to count at once, defaults to all of them
+    engine : str
+        the counting engine, one of `ENGINES`
+    workers : int
+        the number of threads to count predictors on
+    weights : np.ndarray, optional
+        the non-negative weight of each observation, length n
+
+    Returns
+    -------
+    tuple(np.ndarray, np.ndarray)
+        the true positives, false positives, each of shape (T, p), or (T, p, k)
+        for an outcome matrix
+
+    Raises
+    ------
+    ValueError
+        if `engine` isn't one of `ENGINES`
+    """
+    if engine not in ENGINES:
+        raise ValueError("engine must be one of {0}".format(ENGINES))
+    y = _outcome_array(y, matrix=True)
+    outcomes = y.reshape(len(y), -1)
+    columns = _predictor_columns(P, len(y))
+    if weights is not None:
+        #checked and weighted a chunk at a time, so the memory used still
+        #does not grow with the number of rows
+        weights = np.asarray(weights)
+        if weights.shape != (len(y),):
+            raise ValueError("the weights must have one value per observation")
+    thresholds, order = _sorted_thresholds(thresholds)
+    row_chunk = max(len(y), 1) if row_chunk is None else max(int(row_chunk), 1)
+    counter = _COUNTERS[engine]
+
+    def count_column(x):
+        positives = np.zeros(len(thresholds),
+                             dtype=np.int64 if weights is None else np.float64)
+        events = np.zeros((len(thresholds), outcomes.shape[1]))
+        for start in range(0, len(y), row_chunk):
+            chunk = slice(start, start+row_chunk)
+            if weights is None:
+                w, chunk_outcomes = None, outcomes[chunk]
+            else:
+                w = _weights_array(weights[chunk], len(outcomes[chunk]))
+                chunk_outcomes = outcomes[chunk]*w[:, np.newaxis]
+            chunk_positives, chunk_events = counter(x[chunk], chunk_outcomes, thresholds, w)
+            positives += chunk_positives
+            events += chunk_events
+        return positives, events
+
+    if workers > 1 and len(columns) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(min(workers, len(columns))) as executor:
+            counts = list(executor.map(count_column, columns))
+    else:
+        counts = [count_column(x) for x in columns]
+    true_positives = np.empty((len(thresholds), len(columns)) + y.shape[1:])
+    false_positives = np.empty_like(true_positives)
+    for i, (positives, events) in enumerate(counts):
+        events = events.reshape(true_positives.shape[:1] + y.shape[1:])
+        true_positives[order, i] = events
+        false_positives[order, i] = (positives.reshape(-1, *[1]*(y.ndim-1))
+                                     - events)
+    return true_positives, false_positives
+
+
+def net_benefit(y, P, thresholds, harms=None, weights=None):
+    """Calculates the net benefit of each predictor at each threshold
+
+    Parameters
+    ----------
+    y : np.ndarray
+        the outcome, coded 0/1, length n
+    P : np.ndarray or list(np.ndarray)
+        the predicted probabilities, an (n x p) matrix, a length n vector, or a
+        list of length n columns
+    thresholds : np.ndarray
+        the threshold probabilities, length T
+    harms : list(float), optional
+        the harm associated with each predictor, defaults to 0
+    weights : np.ndarray, optional
+        the weight of each observation, see `count_positives`
+
+    Returns
+    -------
+    np.ndarray
+        the net benefit, shape (T, p)
+    """
+    y = _outcome_array(y)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    weights = _weights_array(weights, len(y))
+    true_positives, false_positives = count_positives(y, P, thresholds, weights=weights)
+    return net_benefit_from_counts(true_positives, false_positives,
+                                   total_weight(y, weights), thresholds, harms)
+
+
+def net_benefit_from_counts(true_positives, false_positives, num_observations,
+                            thresholds, harms=None):
+    """Calculates the net benefit from true and false positive counts
+
+    Parameters
+    ----------
+    true_positives : np.ndarray
+        the true positives of each predictor at each threshold, shape (T, p)
+    false_positives : np.ndarray
+        the false positives of each predictor at each threshold, shape (T, p)
+    num_observations : float
+        the number (or, for weighted counts, the total weight) of observations
+        counted, see `total_weight`
+    thresholds : np.ndarray
+        the threshold probabilities, length T
+    harms : list(float), optional
+        the harm associated with each predictor, defaults to 0
+
+    Returns
+    -------
+    np.ndarray
+        the net benefit, shape (T, p)
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    harms = _harms_array(harms, np.shape(true_positives)[1])
+    multiplier = (thresholds/(1-thresholds))[:, np.newaxis]
+    return true_positives/num_observations \
+        - false_positives/num_observations*multiplier - harms
+
+
+def confusion_metrics(true_positives, false_positives, num_events, num_observations,
+                      thresholds, metrics=None, harms=None):
+    """Derives the confusion matrix, and metrics of it, from the counts
+
+    Every metric is computed from the true and false positives in O(T*p), and
+    only the metrics asked for are computed:
+
+    * 'true_positives', 'false_positives', 'true_negatives', 'false_negatives'
+    * 'sensitivity' (TP/events) and 'specificity' (TN/non-events)
+    * 'ppv' (TP/positives) and 'npv' (TN/negatives)
+    * 'net_benefit', and 'standardized_net_benefit', the net benefit as a
+      fraction of the event rate
+    * 'net_reduction', the net reduction in interventions per patient, as
+      `interventions_avoided` with `intervention_per=1`
+
+    Ratios with nothing to divide by (e.g. the PPV where no one is positive) are NaN
+
+    Parameters
+    ----------
+    true_positives : np.ndarray
+        the true positives of each predictor at each threshold, shape (T, p)
+    false_positives : np.ndarray
+        the false positives of each predictor at each threshold, shape (T, p)
+    num_events : float
+        the number (or total weight) of observations with the outcome
+    num_observations : float
+        the number (or total weight) of observations counted
+    thresholds : np.ndarray
+        the threshold probabilities, length T
+    metrics : list(str), optional
+        the metrics to compute, from `METRICS`, defaults to all of them
+    harms : list(float), optional
+        the harm associated with each predictor, defaults to 0
+
+    Returns
+    -------
+    dict(str, np.ndarray)
+        each metric, of shape (T, p), in the order asked for
+
+    Raises
+    ------
+    ValueError
+        if a metric isn't one of `METRICS`
+    """
+    metrics = list(METRICS) if metrics is None else list(metrics)
+    unknown = [metric for metric in metrics if metric not in METRICS]
+    if unknown:
+        raise ValueError("unknown metrics {0}, valid metrics are {1}".format(
+            unknown, METRICS))
+    true_positives = np.asarray(true_positives, dtype=np.float64)
+    false_positives = np.asarray(false_positives, dtype=np.float64)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    num_non_events = num_observations - num_events
+    computed = {}
+
+    def metric(name):
+        if name not in computed:
+            computed[name] = _CONFUSION_METRICS[name](
+                metric, true_positives, false_positives, num_events, num_non_events,
+                thresholds, harms)
+        return computed[name]
+    return {name : metric(name) for name in metrics}
+
+
+def _ratio(numerator, denominator):
+    """`numerator/denominator`, NaN where the denominator is 0
+    """
+    numerator, denominator = np.broadcast_arrays(np.asarray(numerator, dtype=np.float64),
+                                                 np.asarray(denominator, dtype=np.float64))
+    return np.divide(numerator, denominator, out=np.full(numerator.shape, np.nan),
+                     where=denominator != 0)
+
+
+#each metric of `confusion_metrics`, from the metrics it depends on (`metric`),
+#the counts, the number of events and non-events, the thresholds and the harms
+_CONFUSION_METRICS = {
+    'true_positives' : lambda metric, tp, fp, e, ne, t, h: tp,
+    'false_positives' : lambda metric, tp, fp, e, ne, t, h: fp,
+    'true_negatives' : lambda metric, tp, fp, e, ne, t, h: ne - fp,
+    'false_negatives' : lambda metric, tp, fp, e, ne, t, h: e - tp,
+    'sensitivity' : lambda metric, tp, fp, e, ne, t, h: _ratio(tp, e),
+    'specificity' : lambda metric, tp, fp, e, ne, t, h: _ratio(metric('true_negatives'), ne),
+    'ppv' : lambda metric, tp, fp, e, ne, t, h: _ratio(tp, tp + fp),
+    'npv' : lambda metric, tp, fp, e, ne, t, h: _ratio(
+        metric('true_negatives'), metric('true_negatives') + metric('false_negatives')),
+    'net_benefit' : lambda metric, tp, fp, e, ne, t, h: net_benefit_from_counts(
+        tp, fp, e + ne, t, h),
+    'standardized_net_benefit' : lambda metric, tp, fp, e, ne, t, h: _ratio(
+        metric('net_benefit'), e/(e + ne)),
+    'net_reduction' : lambda metric, tp, fp, e, ne, t, h: interventions_avoided(
+        metric('net_benefit'), net_benefit_all(e/(e + ne), t), t, 1)}
+
+
+def net_benefit_all(event_rate, thresholds):
+    """Calculates the net benefit of treating all patients
+
+    Parameters
+    ----------
+    event_rate : float
+        the rate at which the outcome happens
+    thresholds : np.ndarray
+        the threshold probabilities, length T
+
+    Returns
+    -------
+    np.ndarray
+        the net benefit of treating all, length T
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    return event_rate - (1-event_rate)*thresholds/(1-thresholds)
+
+
+def harm_surface(net_benefit, harms):
+    """The net benefit of each predictor over a range of harms
+
+    Harm is subtracted from net benefit after counting, so the net benefit at
+    every harm comes from the one set of counts
+
+    Parameters
+    ----------
+    net_benefit : np.ndarray
+        the net benefit of each predictor with no harm, shape (T, p)
+    harms : np.ndarray
+        the harms to evaluate, length H, applied to every predictor, or of
+        shape (H, p), a harm for each predictor
+
+    Returns
+    -------
+    np.ndarray
+        the net benefit at each harm, shape (H, T, p)
+    """
+    net_benefit = np.asarray(net_benefit, dtype=np.float64)
+    harms = np.asarray(harms, dtype=np.float64)
+    if harms.ndim == 1:
+        harms = harms[:, np.newaxis]
+    if harms.ndim != 2 or harms.shape[1] not in (1, net_benefit.shape[1]):
+        raise ValueError("harms must be a vector, or have one column per predictor")
+    return net_benefit[np.newaxis, :, :] - harms[:, np.newaxis, :]
+
+
+def break_even_harms(net_benefit, net_benefit_all):
+    """The harms at which each predictor stops beating treating all or none
+
+    A predictor with harm `h` has net benefit `net_benefit - h`, so it beats
+    treating none (net benefit 0) while `h < net_benefit` and treating all
+    while `h < net_benefit - net_benefit_all`; a negative break-even harm
+    means the predictor doesn't beat the strategy even when harmless
+
+    Parameters
+    ----------
+    net_benefit : np.ndarray
+        the net benefit of each predictor with no harm, shape (T, p)
+    net_benefit_all : np.ndarray
+        the net benefit of treating all, length T
+
+    Returns
+    -------
+    tuple(np.ndarray, np.ndarray)
+        the break-even harm against treating all, and against treating none,
+        each of shape (T, p)
+    """
+    net_benefit = np.asarray(net_benefit, dtype=np.float64)
+    net_benefit_all = np.asarray(net_benefit_all, dtype=np.float64)
+    return net_benefit - net_benefit_all[:, np.newaxis], net_benefit.copy()
+
+
+def interventions_avoided(net_benefit, net_benefit_all, thresholds, intervention_per=100):
+    """Calculates the interventions avoided per `intervention_per` patients
+
+    Parameters
+    ----------
+    net_benefit : np.ndarray
+        the net benefit of each predictor, shape (T, p)
+    net_benefit_all : np.ndarray
+        the net benefit of treating all, length T
+    thresholds : np.ndarray
+        the threshold probabilities, length T
+    intervention_per : int
+        interventions per `intervention_per` patients
+
+    Returns
+    -------
+    np.ndarray
+        the interventions avoided, shape (T, p)
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    net_benefit_factor = np.asarray(net_benefit) \
+        - np.asarray(net_benefit_all)[:, np.newaxis]
+    interv_denom = (thresholds/(1-thresholds))[:, np.newaxis]
+    return net_benefit_factor * intervention_per/interv_denom
+
+
+def total_weight(y, weights=None):
+    """The number of observations, or their total weight
+
+    Parameters
+    ----------
+    y : np.ndarray
+        the outcome, length n, or an (n x k) matrix of outcomes
+    weights : np.ndarray, optional
+        the weight of each observation
+
+    Returns
+    -------
+    float
+    """
+    return len(y) if weights is None else float(np.sum(weights))
+
+
+def weighted_event_rate(y, weights=None):
+    """The rate of the outcome, weighted by `weights`
+
+    Parameters
+    ----------
+    y : np.ndarray
+        the outcome, coded 0/1, length n, or an (n x k) matrix of outcomes
+    weights : np.ndarray, optional
+        the weight of each observation
+
+    Returns
+    -------
+    float or np.ndarray
+        the event rate, or the event rate of each outcome (length k)
+    """
+    if weights is None:
+        return np.mean(y, axis=0)
+    return np.average(y, axis=0, weights=weights)
+
+
+def decision_curves(y, P, thresholds, harms=None, intervention_per=100, weights=None):
+    """Performs decision curve analysis on arrays
+
+    Parameters
+    ----------
+    y : np.ndarray
+        the outcome, coded 0/1, length n
+    P : np.ndarray or list(np.ndarray)
+        the predicted probabilities, an (n x p) matrix, a length n vector, or a
+        list of length n columns
+    thresholds : np.ndarray
+        the threshold probabilities, length T
+    harms : list(float), optional
+        the harm associated with each predictor, defaults to 0
+    intervention_per : int
+        interventions per `intervention_per` patients
+    weights : np.ndarray, optional
+        the weight of each observation, see `count_positives`
+
+    Returns
+    -------
+    tuple(np.ndarray, np.ndarray, np.ndarray)
+        net benefit (T, p), interventions avoided (T, p), and the net benefit
+        of treating all (T,)
+    """
+    y = _outcome_array(y)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    weights = _weights_array(weights, len(y))
+    nb = net_benefit(y, P, thresholds, harms, weights)
+    nb_all = net_benefit_all(weighted_event_rate(y, weights), thresholds)
+    return nb, interventions_avoided(nb, nb_all, thresholds, intervention_per), nb_all
+
+
+def survival_net_benefit(y, time, P, thresholds, time_point, harms=None, weights=None):
+    """Calculates the net benefit of each predictor at a time point for
+    time-to-event outcomes
+
+    The risk of the outcome by `time_point` is estimated with the Kaplan-Meier
+    product-limit estimator, overall (for treating all patients) and among the
+    observations that are positive at each threshold; as in R's `stdca`, an
+    observation is positive if its predictor value is greater than the
+    threshold. With `weights`, the numbers at risk and of events are weighted sums
+
+    R's `stdca` leaves the rest of a curve missing from the first threshold
+    with no positive observations, or none followed up to `time_point`; here
+    the net benefit is `-harm` with no positives, and the last Kaplan-Meier
+    estimate is carried forward past the follow-up, with a `RuntimeWarning`
+    naming the thresholds affected
+
+    Parameters
+    ----------
+    y : np.ndarray
+        whether the outcome occurred (1) or the observation was censored (0), length n
+    time : np.ndarray
+        the time to the outcome or censoring, length n
+    P : np.ndarray or list(np.ndarray)
+        the predicted probabilities, an (n x p) matrix, a length n vector, or a
+        list of length n columns
+    thresholds : np.ndarray
+        the threshold probabilities, length T
+    time_point : float
+        the time point of interest
+    harms : list(float), optional
+        the harm associated with each predictor, defaults to 0
+    weights : np.ndarray, optional
+        the weight of each observation, see `count_positives`
+
+    Returns
+    -------
+    tuple(np.ndarray, np.ndarray)
+        the net benefit (T, p), and the net benefit of treating all (T,)
+
+    Raises
+    ------
+    ValueError
+        if `time` doesn't match the outcome, or no time point is given
+    """
+    if time_point is None:
+        raise ValueError("must specify the time point of interest")
+    y = _outcome_array(y)
+    time = np.asarray(time, dtype=np.float64)
+    if time.shape != y.shape:
+        raise ValueError("the time to outcome must have one value per observation")
+    columns = _predictor_columns(P, len(y))
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    harms = _harms_array(harms, len(columns))
+    weights = _weights_array(weights, len(y))
+    multiplier = thresholds/(1-thresholds)
+
+    #sort by time once, grouping tied times, for every Kaplan-Meier estimate
+    order = np.argsort(time, kind='stable')
+    time = time[order]
+    if weights is not None:
+        weights = weights[order]
+    survival = _KaplanMeier(time, y[order], time_point, weights)
+    risk_all = 1 - survival.estimate(np.ones(len(y), dtype=bool))
+    nb_all = risk_all - (1-risk_all)*multiplier
+    total = total_weight(y, weights)
+
+    nb = np.empty((len(thresholds), len(columns)))
+    for i, x in enumerate(columns):
+        x = x[order]
+        untreated, unfollowed = [], []
+        for j, threshold in enumerate(thresholds):
+            positive = x > threshold
+            num_positive = np.count_nonzero(positive) if weights is None else \
+                np.sum(weights[positive])
+            if num_positive == 0:  # no one is treated
+                untreated.append(threshold)
+                nb[j, i] = -harms[i]
+                continue
+            #the times are sorted, so the last positive is followed up the longest
+            if time[np.flatnonzero(positive)[-1]] < time_point:
+                unfollowed.append(threshold)
+            p_x = num_positive/total
+            risk = 1 - survival.estimate(positive)
+            nb[j, i] = risk*p_x - (1-risk)*p_x*multiplier[j] - harms[i]
+        if untreated:
+            _warn_thresholds(i, untreated, "no observations are positive, so the net "
+                             "benefit is -harm")
+        if unfollowed:
+            _warn_thresholds(i, unfollowed, "no positive observations are followed up "
+                             "to the time point, so the last risk estimate is carried forward")
+    return nb, nb_all
+
+
+def _warn_thresholds(predictor, thresholds, message):
+    """Warns that the net benefit of a predictor departs from R's `stdca` at
+    some thresholds
+    """
+    warnings.warn("predictor {0}, thresholds {1:g} to {2:g}: {3}".format(
+        predictor, min(thresholds), max(thresholds), message), RuntimeWarning, stacklevel=3)
+
+
+class _KaplanMeier:
+    """Product-limit estimates of survival at a time point for subsets of
+    observations sorted by time
+    """
+
+    def __init__(self, time, y, time_point, weights=None):
+        unique_times, self.starts = np.unique(time, return_index=True)
+        self.events = y > 0
+        self.weights = weights
+        #only the times up to the time point contribute factors to the estimate
+        self.num_factors = np.searchsorted(unique_times, time_point, side='right')
+
+    def estimate(self, mask):
+        #counts must be summed as numbers, `add` on booleans is a logical or
+        at_risk = np.add.reduceat(self._counts(mask), self.starts)
+        at_risk = np.cumsum(at_risk[::-1])[::-1][:self.num_factors]
+        events = np.add.reduceat(self._counts(mask & self.events),
+                                 self.starts)[:self.num_factors]
+        factors = 1 - np.divide(events, at_risk, out=np.zeros_like(at_risk),
+                                where=at_risk > 0)
+        return np.prod(factors)
+
+    def _counts(self, mask):
+        """What each observation in `mask` counts as: 1, or its weight
+        """
+        if self.weights is None:
+            return mask.astype(np.float64)
+        return np.where(mask, self.weights, 0.)
+
+
+def _outcome_array(y, matrix=False):
+    """The outcome as a one dimensional array (or, if `matrix`, an (n x k)
+    matrix of outcomes), without copying it
+    """
+    y = np.asarray(y)
+    if y.dtype.kind not in 'biuf':
+        y = y.astype(np.float64)
+    if y.ndim != 1 and not (matrix and y.ndim == 2):
+        raise ValueError("the outcome must be one dimensional")
+    return y
+
+
+def _predictor_columns(P, num_observations):
+    """The predictors as a list of one dimensional arrays, without copying columns
+    """
+    if isinstance(P, np.ndarray) and P.ndim == 1:
+        columns = [P]
+    elif isinstance(P, np.ndarray):
+        if P.ndim != 2:
+            raise ValueError("predictors must be a vector or an (n x p) matrix")
+        columns = [P[:, i] for i in range(P.shape[1])]
+    else:
+        columns = [np.asarray(column) for column in P]
+    for column in columns:
+        if column.shape != (num_observations,):
+            raise ValueError("each predictor must have one value per observation")
+    return columns
+
+
+def _harms_array(harms, num_predictors):
+    """The harms as an array with one value per predictor
+    """
+    if harms is None:
+        return np.zeros(num_predictors)
+    harms = np.asarray(harms, dtype=np.float64).reshape(-1)
+    if len(harms) != num_predictors:
+        raise ValueError("number of harms must match number of predictors")
+    return harms
+
+
+def _weights_array(weights, num_observations):
+    """The weights as a float array with one value per observation, or `None`
+    """
+    if weights is None:
+        return None
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.shape != (num_observations,):
+        raise ValueError("the weights must have one value per observation")
+    if not np.all(np.isfinite(weights)) or np.any(weights < 0):
+        raise ValueError("the weights must be finite and non-negative")
+    return weights
+
+
+def _sorted_thresholds(thresholds):
+    """The thresholds in increasing order, and their original positions
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    order = np.argsort(thresholds, kind='stable')
+    return thresholds[order], order
+
+
+def _threshold_bins(x, thresholds):
+    """For each value, the number of (sorted) thresholds it is positive at
+    """
+    bins = np.searchsorted(thresholds, x, side='right')
+    if x.dtype.kind == 'f':
+        bins[np.isnan(x)] = 0  # missing values are never positive
+    return bins
+
+
+def _regular_bins(x, thresholds):
+    """`_threshold_bins` for evenly spaced (sorted) thresholds
+
+    The bin is estimated from the spacing, which is off by at most one bin when
+    the thresholds are even to within rounding, then moved up or down one bin
+    if the thresholds around it don't bracket the value. Uneven thresholds are
+    binary searched instead
+    """
+    num_thresholds = len(thresholds)
+    step = grid_step(thresholds)
+    if step is None:
+        return _threshold_bins(x, thresholds)
+    estimate = (x - thresholds[0])*(1/step)
+    estimate += 1
+    np.clip(estimate, 0, num_thresholds, out=estimate)
+    missing = None
+    if x.dtype.kind == 'f':
+        missing = np.isnan(x)
+        estimate[missing] = 0
+    bins = estimate.astype(np.intp)
+    #bounds[k] and bounds[k+1] bracket the values in bin k; nothing is above the last
+    bounds = np.concatenate(([-np.inf], thresholds, [np.nan]))
+    bins += x >= bounds.take(bins + 1)
+    bins -= x < bounds.take(bins)
+    if missing is not None:
+        bins[missing] = 0  # missing values are never positive
+    return bins
+
+
+def grid_step(thresholds, tolerance=1e-3):
+    """The spacing of evenly spaced, increasing thresholds
+
+    Parameters
+    ----------
+    thresholds : np.ndarray
+        the threshold probabilities
+    tolerance : float
+        how far, as a fraction of the spacing, a threshold may be from where an
+        even grid puts it
+
+    Returns
+    -------
+    float or None
+        the spacing, or `None` if there are fewer than two thresholds or they
+        aren't increasing and evenly spaced
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    if len(thresholds) < 2:
+        return None
+    step = (thresholds[-1] - thresholds[0])/(len(thresholds) - 1)
+    if not step > 0:
+        return None
+    even = thresholds[0] + step*np.arange(len(thresholds))
+    if np.max(np.abs(thresholds - even)) > tolerance*step:
+        return None
+    return float(step)
+
+
+def _count_above(counts):
+    """Totals the per-bin counts of `_threshold_bins` into counts per threshold
+    """
+    return np.cumsum(counts[::-1])[::-1][1:]
+
+
+def _count_histogram(x, Y, thresholds, w=None):
+    """Positives, and events of each outcome in `Y` (n x k), at each sorted
+    threshold, by binary searching each value
+
+    Each counter counts an observation as its weight in `w`, if given; the
+    events in `Y` are then already weighted
+    """
+    return _count_bins(_threshold_bins(x, thresholds), Y, len(thresholds), w)
+
+
+def _count_regular(x, Y, thresholds, w=None):
+    """Positives and events at each evenly spaced sorted threshold, by arithmetic
+    """
+    return _count_bins(_regular_bins(x, thresholds), Y, len(thresholds), w)
+
+
+def _count_bins(bins, Y, num_thresholds, w=None):
+    positives = _count_above(np.bincount(bins, weights=w, minlength=num_thresholds+1))
+    events = np.empty((num_thresholds, Y.shape[1]))
+    for k in range(Y.shape[1]):
+        events[:, k] = _count_above(np.bincount(bins, weights=Y[:, k],
+                                                minlength=num_thresholds+1))
+    return positives, events
+
+
+def _count_sorted(x, Y, thresholds, w=None):
+    """Positives and events at each sorted threshold, by sorting the values
+    """
+    order = np.argsort(x, kind='stable')  # missing values sort last
+    x = x[order]
+    num_valid = len(x) - (np.count_nonzero(np.isnan(x)) if x.dtype.kind == 'f' else 0)
+    cumulative_events = np.zeros((len(x) + 1, Y.shape[1]))
+    np.cumsum(Y[order], axis=0, dtype=np.float64, out=cumulative_events[1:])
+    below = np.minimum(np.searchsorted(x, thresholds, side='left'), num_valid)
+    events = cumulative_events[num_valid] - cumulative_events[below]
+    if w is None:
+        return num_valid - below, events
+    cumulative_weights = np.concatenate(([0.], np.cumsum(w[order])))
+    return cumulative_weights[num_valid] - cumulative_weights[below], events
+
+
+def _count_loop(x, Y, thresholds, w=None):
+    """Positives and events at each sorted threshold, one threshold at a time
+    """
+    positives = np.empty(len(thresholds), dtype=np.int64 if w is None else np.float64)
+    events = np.empty((len(thresholds), Y.shape[1]))
+    for j, threshold in enumerate(thresholds):
+        positive = x >= threshold
+        positives[j] = np.count_nonzero(positive) if w is None else np.sum(w[positive])
+        events[j] = np.sum(Y[positive], axis=0, dtype=np.float64)
+    return positives, events
+
+
+_COUNTERS = {'histogram' : _count_histogram,
+             'regular' : _count_regular,
+             'sort' : _count_sorted,
+             'loop' : _count_loop}
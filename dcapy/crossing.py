@@ -0,0 +1,183 @@
+import numpy as np
+import dcapy.core as core
+
+#the reference strategies, compared with the predictors
+REFERENCES = ['none', 'all']
+
+
+def crossing_points(y, P, names=None, harms=None, thresh_range=(0.01, 0.99),
+                    weights=None):
+    """The exact thresholds at which the net benefit curves cross
+
+    Between consecutive distinct predictor values no one changes from positive
+    to negative, so each net benefit curve is a line in the threshold odds,
+    `t/(1-t)`, and the crossings of two curves are found exactly, either as
+    the root of their difference within such a piece or as a jump in it at a
+    predictor value. The cost depends on the number of distinct predictor
+    values, not on any threshold grid
+
+    Parameters
+    ----------
+    y : np.ndarray
+        the outcome, coded 0/1, length n
+    P : np.ndarray or list(np.ndarray)
+        the predicted probabilities, an (n x p) matrix, a length n vector, or a
+        list of length n columns
+    names : list(str), optional
+        the name of each predictor, defaults to 'predictor_<i>'
+    harms : list(float), optional
+        the harm associated with each predictor, defaults to 0
+    thresh_range : tuple(float, float)
+        the thresholds, `(lo, hi]`, to search, with `0 <= lo < hi < 1`
+    weights : np.ndarray, optional
+        the weight of each observation, see `dcapy.core.count_positives`
+
+    Returns
+    -------
+    dict(tuple(str, str), np.ndarray)
+        for each pair of strategies (each predictor with 'none', 'all' and
+        every later predictor), the increasing thresholds at which the one
+        that is better changes; where the curves tie over a range, the
+        crossing is at the start of the tie
+    """
+    names, bounds, intercepts, slopes = _pieces(y, P, names, harms, thresh_range, weights)
+    odds = bounds/(1 - bounds)
+    strategies = REFERENCES + names
+    crossings = {}
+    for k in range(len(REFERENCES), len(strategies)):
+        for m in range(k):
+            crossings[(strategies[k], strategies[m])] = _sign_changes(
+                intercepts[:, k] - intercepts[:, m], slopes[:, k] - slopes[:, m],
+                bounds, odds)
+    return crossings
+
+
+def optimal_intervals(y, P, names=None, harms=None, thresh_range=(0.01, 0.99),
+                      weights=None):
+    """The threshold intervals over which each strategy has the highest net benefit
+
+    The upper envelope of the net benefit curves of the predictors and of
+    treating all or none is found exactly, piece by piece, as for
+    `crossing_points`. Ties go to 'none', then 'all', then the predictors in order
+
+    Parameters
+    ----------
+    y, P, names, harms, thresh_range, weights :
+        see `crossing_points`
+
+    Returns
+    -------
+    list(tuple(float, float, str))
+        consecutive `(start, stop, strategy)` intervals covering `thresh_range`;
+        the strategy is best at the thresholds `start < t <= stop`
+    """
+    names, bounds, intercepts, slopes = _pieces(y, P, names, harms, thresh_range, weights)
+    strategies = REFERENCES + names
+    odds = bounds/(1 - bounds)
+    num_pieces = len(bounds) - 1
+    pieces = np.arange(num_pieces)
+    position = odds[:-1].copy()
+    #the best just right of the start of each piece: the highest value, then the
+    #lowest slope (the line that falls the slowest), then the first strategy
+    values = intercepts - slopes*position[:, np.newaxis]
+    best_value = values.max(axis=1, keepdims=True)
+    current = np.argmin(np.where(values == best_value, slopes, np.inf), axis=1)
+    starts, piece_of, chosen = [bounds[:-1]], [pieces], [current.copy()]
+    for _ in range(len(strategies)):
+        #each line with a lower slope overtakes the current one where they meet
+        current_intercept = intercepts[pieces, current][:, np.newaxis]
+        current_slope = slopes[pieces, current][:, np.newaxis]
+        overtakes = slopes < current_slope
+        with np.errstate(divide='ignore', invalid='ignore'):
+            meets = np.where(overtakes, (current_intercept - intercepts)
+                             / (current_slope - slopes), np.inf)
+        meets = np.where(meets >= position[:, np.newaxis], meets, np.inf)
+        first = meets.min(axis=1)
+        switching = first < odds[1:]
+        if not switching.any():
+            break
+        after = np.argmin(np.where(meets == first[:, np.newaxis], slopes, np.inf), axis=1)
+        position[switching] = first[switching]
+        current[switching] = after[switching]
+        starts.append(first[switching]/(1 + first[switching]))
+        piece_of.append(pieces[switching])
+        chosen.append(after[switching])
+
+    starts, piece_of, chosen = [np.concatenate(parts) for parts in (starts, piece_of, chosen)]
+    #switches within a piece were found in increasing order
+    order = np.lexsort((np.arange(len(starts)), piece_of))
+    starts, chosen = starts[order], chosen[order]
+    new = np.concatenate(([True], chosen[1:] != chosen[:-1]))
+    thresholds, chosen = starts[new], chosen[new]
+    stops = np.append(thresholds[1:], bounds[-1])
+    return [(float(start), float(stop), strategies[k])
+            for start, stop, k in zip(thresholds, stops, chosen)]
+
+
+def _pieces(y, P, names, harms, thresh_range, weights=None):
+    """The net benefit of each strategy as a line in the threshold odds on
+    each piece between distinct predictor values
+
+    Returns
+    -------
+    tuple
+        the predictor names; the piece bounds (J + 1), piece j being the
+        thresholds `bounds[j] < t <= bounds[j+1]`; and the intercepts and
+        slopes (J, 2 + p) of each strategy, in the order of `REFERENCES` then
+        the predictors, so that net benefit is `intercept - slope*t/(1-t)`
+    """
+    lo, hi = thresh_range
+    if not 0 <= lo < hi < 1:
+        raise ValueError("the threshold range must be within [0, 1)")
+    y = core._outcome_array(y)
+    columns = core._predictor_columns(P, len(y))
+    names = ['predictor_{0}'.format(i) for i in range(len(columns))] \
+        if names is None else list(names)
+    if len(names) != len(columns):
+        raise ValueError("number of names must match number of predictors")
+    harms = core._harms_array(harms, len(columns))
+    values = np.unique(np.concatenate([column[np.isfinite(column)] for column in columns]
+                                      + [np.empty(0)]))
+    bounds = np.concatenate(([lo], values[(values > lo) & (values < hi)], [hi]))
+    #no value lies inside a piece, so its counts are those at its upper bound
+    weights = core._weights_array(weights, len(y))
+    true_positives, false_positives = core.count_positives(y, columns, bounds[1:],
+                                                           weights=weights)
+    num_observations = core.total_weight(y, weights)
+    event_rate = core.weighted_event_rate(y, weights) if num_observations else 0.
+    num_observations = num_observations or 1
+    intercepts = np.empty((len(bounds) - 1, len(REFERENCES) + len(columns)))
+    slopes = np.empty_like(intercepts)
+    intercepts[:, 0], slopes[:, 0] = 0., 0.  # none
+    intercepts[:, 1], slopes[:, 1] = event_rate, 1 - event_rate  # all
+    intercepts[:, 2:] = true_positives/num_observations - harms
+    slopes[:, 2:] = false_positives/num_observations
+    return names, bounds, intercepts, slopes
+
+
+def _sign_changes(intercepts, slopes, bounds, odds):
+    """The thresholds at which `intercepts - slopes*odds`, a line on each piece,
+    changes sign
+    """
+    #the sign just right of the start, and at the end, of each piece
+    left = intercepts - slopes*odds[:-1]
+    left_sign = np.where(left != 0, np.sign(left), -np.sign(slopes))
+    right_sign = np.sign(intercepts - slopes*odds[1:])
+    samples = np.column_stack([left_sign, right_sign]).reshape(-1)
+    positions = np.column_stack([bounds[:-1], bounds[1:]]).reshape(-1)
+    nonzero = np.flatnonzero(samples)
+    changes = np.flatnonzero(samples[nonzero[1:]] != samples[nonzero[:-1]])
+    before, after = nonzero[changes], nonzero[changes + 1]
+    crossings = np.empty(len(changes))
+    #the difference reaches zero at a sample between the two
+    touching = after > before + 1
+    crossings[touching] = positions[before[touching] + 1]
+    #or jumps across zero between pieces
+    jumping = ~touching & (before % 2 == 1)
+    crossings[jumping] = positions[before[jumping]]
+    #or crosses zero within a piece
+    within = ~touching & ~jumping
+    piece = before[within]//2
+    root = intercepts[piece]/slopes[piece]
+    crossings[within] = root/(1 + root)
+    return crossings
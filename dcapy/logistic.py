@@ -0,0 +1,335 @@
+import hashlib
+import numpy as np
+
+#fitted coefficients, keyed by the fingerprints of the (outcome, predictor) columns
+_coefficient_cache = {}
+_max_cached_fits = 256
+
+
+def column_fingerprint(values):
+    """Computes a fingerprint of a column of data
+
+    Two columns with the same dtype, length and values have the same fingerprint
+
+    Parameters
+    ----------
+    values : array-like
+        the column to fingerprint
+
+    Returns
+    -------
+    str
+        a hex digest identifying the column
+    """
+    values = np.ascontiguousarray(values)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(values.dtype).encode())
+    digest.update(str(values.shape).encode())
+    digest.update(values.view(np.uint8).ravel())
+    return digest.hexdigest()
+
+
+def expit(eta):
+    """Logistic (inverse logit) function, 1/(1+exp(-eta))
+
+    Parameters
+    ----------
+    eta : np.ndarray
+        the linear predictor
+
+    Returns
+    -------
+    np.ndarray
+        the probabilities for `eta`
+    """
+    return 0.5*(1 + np.tanh(0.5*np.asarray(eta, dtype=float)))
+
+
+def fit_univariate_logistic(y, X, max_iter=50, tol=1e-10, weights=None):
+    """Fits one logistic regression, `logit(p) = b0 + b1*x`, for each column of `X`
+
+    All of the models are fit together with iteratively reweighted least squares
+    (IRLS); the 2x2 Newton system of each model is solved in closed form so each
+    iteration is a handful of vectorized operations over the whole batch
+
+    Parameters
+    ----------
+    y : np.ndarray
+        the outcome vector (length n), coded 0/1
+    X : np.ndarray
+        the predictors to fit, shape (n,) or (n, p)
+    max_iter : int
+        the maximum number of IRLS iterations
+    tol : float
+        convergence tolerance on the largest coefficient update
+    weights : np.ndarray, optional
+        frequency (or sampling) weights of the observations, length n
+
+    Returns
+    -------
+    np.ndarray
+        coefficients with shape (p, 2), `[intercept, slope]` for each column
+
+    Raises
+    ------
+    ValueError
+        if the fit does not converge (e.g. the outcome is perfectly separated)
+    """
+    y = np.asarray(y, dtype=float)
+    X = np.asarray(X, dtype=float)
+    if X.ndim == 1:
+        X = X[:, np.newaxis]
+    X2 = X*X
+    weights = _column_weights(weights)
+    #start from the intercept-only model
+    event_rate = np.clip(np.average(y, weights=weights), 1e-8, 1 - 1e-8)
+    coefs = np.zeros((X.shape[1], 2))
+    coefs[:, 0] = np.log(event_rate/(1 - event_rate))
+
+    for _ in range(max_iter):
+        mu = expit(coefs[:, 0] + X*coefs[:, 1])
+        w = mu*(1 - mu)
+        resid = y[:, np.newaxis] - mu
+        if weights is not None:
+            w *= weights[:, np.newaxis]
+            resid *= weights[:, np.newaxis]
+        #gradient and hessian of the log likelihood, for every column at once
+        g0 = resid.sum(axis=0)
+        g1 = (X*resid).sum(axis=0)
+        h00 = w.sum(axis=0)
+        h01 = (w*X).sum(axis=0)
+        h11 = (w*X2).sum(axis=0)
+        det = h00*h11 - h01*h01
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = np.column_stack([(h11*g0 - h01*g1)/det,
+                                    (h00*g1 - h01*g0)/det])
+        if not np.all(np.isfinite(step)):
+            raise ValueError("logistic regression is singular, "
+                             "check that each predictor is not constant")
+        coefs += step
+        if np.max(np.abs(step)) < tol*(1 + np.max(np.abs(coefs))):
+            return coefs
+    raise ValueError("logistic regression did not converge, "
+                     "the outcome may be perfectly separated by a predictor")
+
+
+def predict_logistic(coefs, X):
+    """Scores data with fitted logistic regression coefficients
+
+    Parameters
+    ----------
+    coefs : np.ndarray
+        coefficients from `fit_univariate_logistic`, shape (2,) or (p, 2)
+    X : np.ndarray
+        the data to score, shape (n,) or (n, p)
+
+    Returns
+    -------
+    np.ndarray
+        predicted probabilities with the same shape as `X`
+    """
+    coefs = np.asarray(coefs, dtype=float)
+    X = np.asarray(X, dtype=float)
+    if coefs.ndim == 1:
+        return expit(coefs[0] + X*coefs[1])
+    return expit(coefs[:, 0] + X*coefs[:, 1])
+
+
+def convert_to_probabilities(y, columns, use_cache=True, weights=None):
+    """Converts raw predictor columns to probabilities with univariate logistic
+    regression
+
+    Coefficients are looked up by the fingerprints of the outcome and predictor
+    columns, only the columns that haven't been fit before are passed (as a single
+    batch) to the solver
+
+    Parameters
+    ----------
+    y : np.ndarray
+        the outcome vector, coded 0/1
+    columns : dict(str, np.ndarray)
+        the predictor columns to convert, keyed by name
+    use_cache : bool
+        whether to reuse (and store) previously fitted coefficients
+    weights : np.ndarray, optional
+        frequency (or sampling) weights of the observations
+
+    Returns
+    -------
+    tuple(dict(str, np.ndarray), dict(str, np.ndarray))
+        the converted columns and the `[intercept, slope]` coefficients for each
+        predictor, both keyed by name
+    """
+    y = np.asarray(y, dtype=float)
+    y_key = column_fingerprint(y)
+    if weights is not None:
+        y_key += column_fingerprint(np.asarray(weights, dtype=float))
+    coefficients = {}
+    to_fit = []
+    for name, values in columns.items():
+        key = (y_key, column_fingerprint(values))
+        if use_cache and key in _coefficient_cache:
+            coefficients[name] = _coefficient_cache[key]
+        else:
+            to_fit.append((name, key))
+
+    if to_fit:
+        X = np.column_stack([np.asarray(columns[name], dtype=float)
+                             for name, _ in to_fit])
+        fitted = fit_univariate_logistic(y, X, weights=weights)
+        for (name, key), coefs in zip(to_fit, fitted):
+            coefs = coefs.copy()
+            coefs.flags.writeable = False
+            coefficients[name] = coefs
+            if use_cache:
+                _cache_coefficients(key, coefs)
+
+    probabilities = {name: predict_logistic(coefficients[name], values)
+                     for name, values in columns.items()}
+    return probabilities, coefficients
+
+
+def fit_multivariable_logistic(y, X, max_iter=50, tol=1e-10, weights=None):
+    """Fits a single logistic regression, `logit(p) = b0 + X*b`, on all columns of `X`
+
+    Uses iteratively reweighted least squares; the intercept is handled
+    separately so no augmented copy of `X` is made
+
+    Parameters
+    ----------
+    y : np.ndarray
+        the outcome vector (length n), coded 0/1
+    X : np.ndarray
+        the design matrix, shape (n, k), without an intercept column
+    max_iter : int
+        the maximum number of IRLS iterations
+    tol : float
+        convergence tolerance on the largest coefficient update
+    weights : np.ndarray, optional
+        frequency (or sampling) weights of the observations, length n
+
+    Returns
+    -------
+    np.ndarray
+        coefficients with shape (k+1,), `[intercept, b1, ..., bk]`
+
+    Raises
+    ------
+    ValueError
+        if the fit does not converge or the design matrix is singular
+    """
+    y = np.asarray(y, dtype=float)
+    X = np.asarray(X, dtype=float)
+    if X.ndim == 1:
+        X = X[:, np.newaxis]
+    k = X.shape[1]
+    weights = _column_weights(weights)
+    event_rate = np.clip(np.average(y, weights=weights), 1e-8, 1 - 1e-8)
+    coefs = np.zeros(k + 1)
+    coefs[0] = np.log(event_rate/(1 - event_rate))
+    hessian = np.empty((k + 1, k + 1))
+    gradient = np.empty(k + 1)
+
+    for _ in range(max_iter):
+        mu = expit(coefs[0] + X.dot(coefs[1:]))
+        w = mu*(1 - mu)
+        resid = y - mu
+        if weights is not None:
+            w *= weights
+            resid *= weights
+        gradient[0] = resid.sum()
+        gradient[1:] = X.T.dot(resid)
+        wX = X*w[:, np.newaxis]
+        hessian[0, 0] = w.sum()
+        hessian[0, 1:] = hessian[1:, 0] = wX.sum(axis=0)
+        hessian[1:, 1:] = X.T.dot(wX)
+        try:
+            step = np.linalg.solve(hessian, gradient)
+        except np.linalg.LinAlgError:
+            raise ValueError("logistic regression is singular, "
+                             "check that the predictors are not collinear")
+        coefs += step
+        if np.max(np.abs(step)) < tol*(1 + np.max(np.abs(coefs))):
+            return coefs
+    raise ValueError("logistic regression did not converge, "
+                     "the outcome may be perfectly separated by the predictors")
+
+
+def predict_multivariable_logistic(coefs, X):
+    """Scores data with coefficients from `fit_multivariable_logistic`
+
+    Parameters
+    ----------
+    coefs : np.ndarray
+        coefficients, `[intercept, b1, ..., bk]`
+    X : np.ndarray
+        the data to score, shape (n, k)
+
+    Returns
+    -------
+    np.ndarray
+        predicted probabilities, length n
+    """
+    coefs = np.asarray(coefs, dtype=float)
+    X = np.asarray(X, dtype=float)
+    if X.ndim == 1:
+        X = X[:, np.newaxis]
+    return expit(coefs[0] + X.dot(coefs[1:]))
+
+
+def convert_composite(y, columns, use_cache=True, weights=None):
+    """Converts several predictor columns to a single probability with one
+    multivariable logistic regression
+
+    Parameters
+    ----------
+    y : np.ndarray
+        the outcome vector, coded 0/1
+    columns : list(np.ndarray)
+        the columns of the model, in order
+    use_cache : bool
+        whether to reuse (and store) previously fitted coefficients
+    weights : np.ndarray, optional
+        frequency (or sampling) weights of the observations
+
+    Returns
+    -------
+    tuple(np.ndarray, np.ndarray)
+        the predicted probabilities and the `[intercept, b1, ..., bk]` coefficients
+    """
+    y = np.asarray(y, dtype=float)
+    key = (column_fingerprint(y),) + tuple(column_fingerprint(c) for c in columns)
+    if weights is not None:
+        key += ('weights', column_fingerprint(np.asarray(weights, dtype=float)))
+    #build the design matrix once, straight from the column arrays
+    X = np.empty((len(y), len(columns)))
+    for i, column in enumerate(columns):
+        X[:, i] = column
+    if use_cache and key in _coefficient_cache:
+        coefs = _coefficient_cache[key]
+    else:
+        coefs = fit_multivariable_logistic(y, X, weights=weights)
+        coefs.flags.writeable = False
+        if use_cache:
+            _cache_coefficients(key, coefs)
+    return predict_multivariable_logistic(coefs, X), coefs
+
+
+def _column_weights(weights):
+    """The weights as a float vector, or `None`
+    """
+    return None if weights is None else np.asarray(weights, dtype=float)
+
+
+def clear_cache():
+    """Removes all cached logistic regression coefficients
+    """
+    _coefficient_cache.clear()
+
+
+def _cache_coefficients(key, coefs):
+    """Stores fitted coefficients, evicting the oldest fit if the cache is full
+    """
+    if len(_coefficient_cache) >= _max_cached_fits:
+        del _coefficient_cache[next(iter(_coefficient_cache))]
+    _coefficient_cache[key] = coefs
@@ -0,0 +1,408 @@
+import math
+import os
+import re
+import numpy as np
+from dcapy.core import ENGINES, grid_step
+
+#bytes per row held while binning one predictor chunk: the outcome and
+#predictor values (as float64), the bin of each value, and the missing-value mask
+_BYTES_PER_ROW = 8 + 8 + 8 + 1
+#bytes per row held while counting one predictor chunk with each engine: the
+#outcome and predictor values, and the engine's temporaries
+_ENGINE_BYTES_PER_ROW = {
+    'histogram' : _BYTES_PER_ROW,
+    #the estimated bin (as a float, then an integer), the gathered bounds, the masks
+    'regular' : 8 + 8 + 8 + 8 + 8 + 1 + 1,
+    #the sort order, the sorted values and outcomes, the cumulative outcomes
+    'sort' : 8 + 8 + 8 + 8 + 8 + 8,
+    #the mask of positives, and the outcomes selected by it
+    'loop' : 8 + 8 + 1 + 8}
+#bytes per row held for each outcome counted beyond the first: its values, and
+#its weights or cumulative counts
+_EXTRA_OUTCOME_BYTES_PER_ROW = 8 + 8
+#bytes per row held for weighted counts: the chunk's weights (as float64),
+#and its weighted values of each outcome
+_WEIGHT_BYTES_PER_ROW = 8
+_WEIGHTED_OUTCOME_BYTES_PER_ROW = 8
+#bytes per threshold held by each worker: the per-bin counts and their totals
+_BYTES_PER_THRESHOLD = 4 * 8
+#seconds per row of each engine, measured with NumPy 2 on one core; binary
+#searches and sorts also scale with log2 of the thresholds and rows
+_SEARCH_SECONDS = 9.5e-9
+_BINCOUNT_SECONDS = 8e-9
+_REGULAR_SECONDS = 25e-9
+_SORT_SECONDS = 10e-9
+_LOOP_SECONDS = 7e-9
+#seconds per threshold per chunk, totalling the counts
+_THRESHOLD_SECONDS = 40e-9
+#the speedup of each extra worker thread, and the cost of starting one
+_PARALLEL_EFFICIENCY = 0.75
+_WORKER_SECONDS = 1e-4
+#bytes per row held while counting one chunk of a resampled replicate: the
+#drawn rows, the resampled outcome, and the gathered bins (and their cast to intp)
+_BYTES_PER_RESAMPLED_ROW = 8 + 8 + 8 + 8
+#the fewest rows worth binning at once
+_MIN_ROW_CHUNK = 1024
+
+_UNITS = {'' : 1, 'b' : 1,
+          'kb' : 10**3, 'mb' : 10**6, 'gb' : 10**9, 'tb' : 10**12,
+          'kib' : 2**10, 'mib' : 2**20, 'gib' : 2**30, 'tib' : 2**40}
+
+
+class ExecutionPlan:
+    """ExecutionPlan(num_rows, num_predictors, num_thresholds, replicates, ...)
+
+    How an analysis is counted and split up to fit in memory, see
+    `plan_analysis` and `plan_resampling`
+
+    Attributes
+    ----------
+    num_rows, num_predictors, num_thresholds, replicates : int
+        the size of the analysis
+    memory_limit : int or None
+        the budget, in bytes
+    row_chunk : int
+        the number of rows binned at once
+    predictor_chunk : int
+        the number of predictors held at once
+    estimated_bytes : int
+        the estimated peak working set of the plan, in bytes
+    engine : str
+        the counting engine, see `dcapy.core.count_positives`
+    workers : int
+        the number of threads predictors are counted on
+    bin_dtype : np.dtype
+        the type the threshold bins are held in
+    estimated_seconds : float or None
+        the estimated time to count, if the plan was costed
+    candidates : list(dict)
+        the plans that were costed, with their 'engine', 'workers',
+        'row_chunk', 'seconds' and 'bytes' ('seconds' is `None` for plans that
+        don't fit in the memory limit)
+    grid_step : float or None
+        the spacing of the thresholds, if they are evenly spaced
+    num_cores : int or None
+        the number of cores the plan was made for
+    """
+
+    def __init__(self, num_rows, num_predictors, num_thresholds, replicates,
+                 memory_limit, row_chunk, predictor_chunk, estimated_bytes,
+                 engine='histogram', workers=1, bin_dtype=None, estimated_seconds=None,
+                 candidates=None, grid_step=None, num_cores=None):
+        self.num_rows = num_rows
+        self.num_predictors = num_predictors
+        self.num_thresholds = num_thresholds
+        self.replicates = replicates
+        self.memory_limit = memory_limit
+        self.row_chunk = row_chunk
+        self.predictor_chunk = predictor_chunk
+        self.estimated_bytes = estimated_bytes
+        self.engine = engine
+        self.workers = workers
+        self.bin_dtype = bin_dtype
+        self.estimated_seconds = estimated_seconds
+        self.candidates = list(candidates or [])
+        self.grid_step = grid_step
+        self.num_cores = num_cores
+
+    @property
+    def num_chunks(self):
+        """The number of (row, predictor) chunks the data is processed in
+        """
+        return _ceil_div(self.num_rows, self.row_chunk) * \
+            _ceil_div(self.num_predictors, self.predictor_chunk)
+
+    def as_dict(self):
+        """The plan as a (JSON-serializable) dict
+        """
+        return {'num_rows' : self.num_rows, 'num_predictors' : self.num_predictors,
+                'num_thresholds' : self.num_thresholds, 'replicates' : self.replicates,
+                'memory_limit' : self.memory_limit, 'row_chunk' : self.row_chunk,
+                'predictor_chunk' : self.predictor_chunk,
+                'estimated_bytes' : self.estimated_bytes,
+                'num_chunks' : self.num_chunks, 'engine' : self.engine,
+                'workers' : self.workers,
+                'bin_dtype' : None if self.bin_dtype is None else str(self.bin_dtype),
+                'estimated_seconds' : self.estimated_seconds,
+                'candidates' : [dict(candidate) for candidate in self.candidates],
+                'grid_step' : self.grid_step, 'num_cores' : self.num_cores}
+
+    def explain(self):
+        """Describes the plan, and the candidates it was chosen from
+
+        Returns
+        -------
+        str
+            the size of the analysis, then a table of the candidate plans with
+            their estimated time and memory; the chosen plan is marked with '*'
+        """
+        grid = 'regular, step {0:.6g}'.format(self.grid_step) \
+            if self.grid_step is not None else 'not known to be evenly spaced'
+        lines = ['{0} rows x {1} predictors x {2} thresholds ({3}), {4} cores, '
+                 'memory limit {5}'.format(
+                     self.num_rows, self.num_predictors, self.num_thresholds, grid,
+                     _or_dash(self.num_cores), _or_dash(self.memory_limit)),
+                 '  {0:<10}{1:>8}{2:>12}{3:>8}{4:>14}{5:>14}'.format(
+                     'engine', 'workers', 'row_chunk', 'chunks', 'est. seconds',
+                     'est. bytes')]
+        candidates = self.candidates or [{'engine' : self.engine,
+                                          'workers' : self.workers,
+                                          'row_chunk' : self.row_chunk,
+                                          'seconds' : self.estimated_seconds,
+                                          'bytes' : self.estimated_bytes}]
+        for candidate in candidates:
+            chosen = candidate['engine'] == self.engine and \
+                candidate['workers'] == self.workers
+            fits = candidate['row_chunk'] is not None
+            lines.append('{0} {1:<10}{2:>8}{3:>12}{4:>8}{5:>14}{6:>14}'.format(
+                '*' if chosen else ' ', candidate['engine'], candidate['workers'],
+                candidate['row_chunk'] if fits else '-',
+                _ceil_div(self.num_rows, candidate['row_chunk']) if fits else '-',
+                '-' if candidate['seconds'] is None
+                else '{0:.4g}'.format(candidate['seconds']),
+                candidate['bytes'] if fits else 'too large'))
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.explain()
+
+    def __repr__(self):
+        return ("ExecutionPlan(engine={0!r}, workers={1}, row_chunk={2}, "
+                "predictor_chunk={3}, chunks={4}, estimated_bytes={5}, "
+                "memory_limit={6})").format(
+                    self.engine, self.workers, self.row_chunk, self.predictor_chunk,
+                    self.num_chunks, self.estimated_bytes, self.memory_limit)
+
+
+def parse_memory_limit(memory_limit):
+    """Converts a memory limit to bytes
+
+    Parameters
+    ----------
+    memory_limit : int, str or None
+        a number of bytes, or a string such as '512MB' or '2GiB'
+
+    Returns
+    -------
+    int or None
+
+    Raises
+    ------
+    ValueError
+        if the limit isn't a positive size
+    """
+    if memory_limit is None:
+        return None
+    if isinstance(memory_limit, str):
+        match = re.match(r'^\s*([0-9.]+)\s*([a-zA-Z]*)\s*$', memory_limit)
+        if not match or match.group(2).lower() not in _UNITS:
+            raise ValueError("did not understand the memory limit {0}"
+                             .format(repr(memory_limit)))
+        memory_limit = float(match.group(1)) * _UNITS[match.group(2).lower()]
+    memory_limit = int(memory_limit)
+    if memory_limit <= 0:
+        raise ValueError("memory limit must be positive")
+    return memory_limit
+
+
+def plan_analysis(num_rows, num_predictors, num_thresholds, memory_limit=None,
+                  engine=None, workers=None, num_cores=None, num_outcomes=1,
+                  weighted=False):
+    """Plans the counting of a decision curve analysis
+
+    Every counting engine of `dcapy.core.count_positives` is costed, on one
+    worker thread and on as many as there are cores (up to one per predictor),
+    from the number of rows, predictors and thresholds, and whether the
+    thresholds are evenly spaced; the fastest plan that fits in the memory
+    budget is chosen. Predictors are counted one at a time per worker, so only
+    the rows are chunked, and plans that need chunks stream the rows through
+    the engine. The estimates are from timings on a typical machine, so they
+    rank the plans rather than predict their times exactly
+
+    Parameters
+    ----------
+    num_rows : int
+        the number of observations
+    num_predictors : int
+        the number of predictors
+    num_thresholds : int or np.ndarray
+        the number of thresholds, or the thresholds themselves; the 'regular'
+        engine is only considered for evenly spaced thresholds
+    memory_limit : int or str, optional
+        the budget, see `parse_memory_limit`; without one, all rows are counted at once
+    engine : str, optional
+        the engine to use instead of the fastest
+    workers : int, optional
+        the number of worker threads (of the calling process, so the data is
+        never copied to them) to use instead of the fastest
+    num_cores : int, optional
+        the number of cores to plan for, defaults to `os.cpu_count()`
+    num_outcomes : int
+        the number of outcomes counted together, see `dcapy.core.count_positives`
+    weighted : bool
+        whether the observations are weighted, see `dcapy.core.count_positives`
+
+    Returns
+    -------
+    ExecutionPlan
+        the chosen plan, with the others in its `candidates`
+
+    Raises
+    ------
+    ValueError
+        if `engine` isn't an engine, or the analysis can't fit in `memory_limit`
+    """
+    memory_limit = parse_memory_limit(memory_limit)
+    step = None
+    if np.ndim(num_thresholds) > 0:
+        step = grid_step(np.sort(num_thresholds))
+        num_thresholds = len(num_thresholds)
+    num_predictors = max(num_predictors, 1)
+    if engine is not None and engine not in ENGINES:
+        raise ValueError("engine must be one of {0}".format(ENGINES))
+    num_cores = max(int(num_cores or os.cpu_count() or 1), 1)
+    if workers is None:
+        worker_options = sorted({1, min(num_cores, num_predictors)})
+    else:
+        worker_options = [max(int(workers), 1)]
+    engines = [engine] if engine is not None else \
+        [name for name in ENGINES if name != 'regular' or step is not None]
+
+    #true/false positives, net benefit and interventions avoided of each outcome
+    fixed = 4 * 8 * num_thresholds * num_predictors * num_outcomes
+    #each extra outcome holds its values, and its weights or cumulative counts
+    extra_per_row = _EXTRA_OUTCOME_BYTES_PER_ROW*(num_outcomes - 1)
+    if weighted:
+        extra_per_row += _WEIGHT_BYTES_PER_ROW + _WEIGHTED_OUTCOME_BYTES_PER_ROW*num_outcomes
+    candidates, chosen, error = [], None, None
+    for name in engines:
+        for num_workers in worker_options:
+            held = fixed + num_workers*_BYTES_PER_THRESHOLD*num_thresholds*num_outcomes
+            bytes_per_row = num_workers*(_ENGINE_BYTES_PER_ROW[name] + extra_per_row)
+            candidate = {'engine' : name, 'workers' : num_workers,
+                         'row_chunk' : None, 'seconds' : None, 'bytes' : None}
+            try:
+                candidate['row_chunk'] = _row_chunk(num_rows, memory_limit, held,
+                                                    bytes_per_row)
+            except ValueError as e:
+                error = error or e
+            else:
+                candidate['bytes'] = held + candidate['row_chunk']*bytes_per_row
+                candidate['seconds'] = _estimate_seconds(
+                    name, num_rows, num_predictors, num_thresholds,
+                    candidate['row_chunk'], num_workers, num_cores, num_outcomes)
+                if chosen is None or candidate['seconds'] < chosen['seconds']:
+                    chosen = candidate
+            candidates.append(candidate)
+    if chosen is None:
+        raise error
+    return ExecutionPlan(num_rows, num_predictors, num_thresholds, 1, memory_limit,
+                         chosen['row_chunk'], num_predictors, chosen['bytes'],
+                         chosen['engine'], chosen['workers'], np.dtype(np.intp),
+                         chosen['seconds'], candidates, step, num_cores)
+
+
+def plan_resampling(num_rows, num_predictors, num_thresholds, replicates,
+                    memory_limit=None, bin_bytes=8):
+    """Plans bootstrap or permutation replicates within a memory budget
+
+    The bins of each predictor (`bin_bytes` per row) are computed once and held
+    for all of the replicates, so predictors are processed in chunks; each
+    replicate is drawn and counted in chunks of rows
+
+    Parameters
+    ----------
+    num_rows : int
+        the number of observations
+    num_predictors : int
+        the number of predictors (or, for permutations, predictor pairs x 2)
+    num_thresholds : int
+        the number of thresholds
+    replicates : int
+        the number of replicates
+    memory_limit : int or str, optional
+        the budget, see `parse_memory_limit`
+    bin_bytes : int
+        the bytes used for the bin of each value
+
+    Returns
+    -------
+    ExecutionPlan
+
+    Raises
+    ------
+    ValueError
+        if the replicates' results alone, or one predictor's bins, exceed `memory_limit`
+    """
+    memory_limit = parse_memory_limit(memory_limit)
+    num_predictors = max(num_predictors, 1)
+    #net benefit and interventions avoided of every replicate, and the treat-all curves
+    fixed = 8 * replicates * num_thresholds * (2*num_predictors + 1)
+    held_per_predictor = bin_bytes * num_rows
+    if memory_limit is None:
+        predictor_chunk = num_predictors
+    else:
+        #give the held bins at most half of what the results leave
+        available = (memory_limit - fixed - _MIN_ROW_CHUNK*_BYTES_PER_RESAMPLED_ROW)//2
+        predictor_chunk = min(num_predictors, available // max(held_per_predictor, 1))
+        if predictor_chunk < 1:
+            raise ValueError("a memory limit of {0} bytes is too small, at least {1} "
+                             "bytes are needed".format(
+                                 memory_limit, fixed + 2*held_per_predictor
+                                 + _MIN_ROW_CHUNK*_BYTES_PER_RESAMPLED_ROW))
+    held = fixed + predictor_chunk*held_per_predictor
+    row_chunk = _row_chunk(num_rows, memory_limit, held, _BYTES_PER_RESAMPLED_ROW)
+    return ExecutionPlan(num_rows, num_predictors, num_thresholds, replicates,
+                         memory_limit, row_chunk, predictor_chunk,
+                         held + row_chunk*_BYTES_PER_RESAMPLED_ROW,
+                         bin_dtype=np.min_scalar_type(num_thresholds))
+
+
+def _row_chunk(num_rows, memory_limit, fixed, bytes_per_row):
+    """The most rows that fit in what `fixed` leaves of `memory_limit`
+    """
+    if memory_limit is None:
+        return max(num_rows, 1)
+    row_chunk = (memory_limit - fixed) // bytes_per_row
+    if row_chunk < min(_MIN_ROW_CHUNK, num_rows):
+        raise ValueError("a memory limit of {0} bytes is too small, at least {1} "
+                         "bytes are needed".format(
+                             memory_limit,
+                             fixed + min(_MIN_ROW_CHUNK, num_rows)*bytes_per_row))
+    return max(min(num_rows, row_chunk), 1)
+
+
+def _estimate_seconds(engine, num_rows, num_predictors, num_thresholds, row_chunk,
+                      workers, num_cores, num_outcomes=1):
+    """The estimated time to count with an engine, see `plan_analysis`
+    """
+    num_chunks = _ceil_div(num_rows, row_chunk)
+    chunk_log = math.log2(max(min(row_chunk, num_rows), 2))
+    #every engine totals each extra outcome about as fast as a weighted bincount
+    per_outcome = _BINCOUNT_SECONDS/2*(num_outcomes - 1)
+    if engine == 'histogram':
+        per_row = _SEARCH_SECONDS*math.log2(num_thresholds + 1) + _BINCOUNT_SECONDS
+        per_chunk = 0
+    elif engine == 'regular':
+        per_row, per_chunk = _REGULAR_SECONDS + _BINCOUNT_SECONDS, 0
+    elif engine == 'sort':
+        per_row = _SORT_SECONDS*chunk_log
+        per_chunk = _SEARCH_SECONDS*num_thresholds*chunk_log
+    else:
+        per_row, per_chunk = _LOOP_SECONDS*num_thresholds, 0
+        per_outcome *= num_thresholds
+    per_predictor = num_rows*(per_row + per_outcome) + num_chunks*(
+        per_chunk + _THRESHOLD_SECONDS*num_thresholds*num_outcomes)
+    if workers <= 1:
+        return num_predictors*per_predictor
+    #threads beyond the cores, or the predictors, don't help
+    speedup = 1 + _PARALLEL_EFFICIENCY*(min(workers, num_cores, num_predictors) - 1)
+    return num_predictors*per_predictor/speedup + workers*_WORKER_SECONDS
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def _or_dash(value):
+    return '-' if value is None else value
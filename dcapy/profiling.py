@@ -0,0 +1,145 @@
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+
+class Profile:
+    """Profile(callback=None, memory=True)
+
+    Per-phase timings and counters of an analysis
+
+    Pass `profile=True` (or a callback, or a `Profile`) to
+    `DecisionCurveAnalysis` / `DecisionCurveAnalysis.run` or `dcapy.algo.dca` to
+    record one entry per phase: 'validation' (dropping incomplete rows),
+    'composites' and 'conversion' (logistic regression), 'count' (true/false
+    positives), 'net_benefit' (assembling the curves), 'interventions_avoided'
+    (`DecisionCurveAnalysis` runs only), 'smoothing' and 'metrics' (confusion
+    matrix metrics)
+
+    Parameters
+    ----------
+    callback : callable, optional
+        called with each phase's record as soon as the phase ends, e.g. to
+        forward it to a metrics system
+    memory : bool
+        whether to record the bytes allocated in each phase; this traces
+        allocations with `tracemalloc` while the analysis runs
+
+    Attributes
+    ----------
+    phases : list(dict)
+        a record for each phase, in the order they ran, with the 'phase' name,
+        wall time in 'seconds', the number of 'rows' processed, the peak
+        'bytes' allocated (`None` if not recorded) and the 'engine' used
+    """
+
+    def __init__(self, callback=None, memory=True, phases=None):
+        self.callback = callback
+        self.memory = memory
+        self.phases = list(phases or [])
+
+    @contextmanager
+    def phase(self, name, rows=None, engine=None):
+        """Records a phase of the analysis
+
+        Phases may not be nested
+
+        Parameters
+        ----------
+        name : str
+            the name of the phase
+        rows : int, optional
+            the number of rows (observations, or thresholds) the phase processes
+        engine : str, optional
+            the implementation used for the phase
+
+        Yields
+        ------
+        dict
+            the phase's record, which may be updated while the phase runs
+        """
+        record = {'phase' : name, 'seconds' : None, 'rows' : rows, 'bytes' : None,
+                  'engine' : engine}
+        tracing = self.memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if self.memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            if self.memory:
+                record['bytes'] = tracemalloc.get_traced_memory()[1] - baseline
+            if tracing:
+                tracemalloc.stop()
+        self.phases.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def copy(self):
+        """A profile with the same settings and the phases recorded so far
+        """
+        return Profile(self.callback, self.memory, self.phases)
+
+    @property
+    def seconds(self):
+        """The total wall time of the recorded phases
+        """
+        return sum(record['seconds'] for record in self.phases)
+
+    def __iter__(self):
+        return iter(self.phases)
+
+    def __len__(self):
+        return len(self.phases)
+
+    def __str__(self):
+        lines = ['{0:<12}{1:>10}{2:>12}{3:>14}  {4}'.format(
+            'phase', 'seconds', 'rows', 'bytes', 'engine')]
+        for record in self.phases:
+            lines.append('{0:<12}{1:>10.4f}{2:>12}{3:>14}  {4}'.format(
+                record['phase'], record['seconds'], _or_dash(record['rows']),
+                _or_dash(record['bytes']), _or_dash(record['engine'])))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return "Profile(phases={0})".format([record['phase'] for record in self.phases])
+
+
+def as_profile(profile):
+    """Interprets a `profile=` argument
+
+    Parameters
+    ----------
+    profile : bool, callable or Profile
+        `None`/`False` to not profile, `True` to profile, a callable to profile
+        and call it with each phase record, or a `Profile` to record into
+
+    Returns
+    -------
+    Profile or None
+    """
+    if profile is None or profile is False:
+        return None
+    if isinstance(profile, Profile):
+        return profile
+    if profile is True:
+        return Profile()
+    if callable(profile):
+        return Profile(callback=profile)
+    raise TypeError("profile must be a bool, a callable or a Profile")
+
+
+def phase(profile, name, rows=None, engine=None):
+    """Records a phase in `profile`, or does nothing if it is `None`, see `Profile.phase`
+    """
+    if profile is None:
+        return nullcontext({})
+    return profile.phase(name, rows, engine)
+
+
+def _or_dash(value):
+    return '-' if value is None else value
@@ -0,0 +1,209 @@
+import numpy as np
+import dcapy.core as core
+from dcapy.planner import plan_resampling
+
+
+def bootstrap(y, P, thresholds, replicates=1000, harms=None, intervention_per=100,
+              seed=None, memory_limit=None):
+    """Bootstrap replicates of the decision curves
+
+    Each predictor is binned against the thresholds once; a replicate then only
+    resamples rows and counts their bins. Every predictor sees the same
+    resampled rows in a replicate, so replicates of the difference between two
+    predictors' curves are paired. The replicates are the same for any
+    `memory_limit`
+
+    The replicates are drawn in the calling process; to spread them over
+    processes without copying the data, see `dcapy.shared.SharedColumns.map`
+
+    Parameters
+    ----------
+    y : np.ndarray
+        the outcome, coded 0/1, length n
+    P : np.ndarray or list(np.ndarray)
+        the predicted probabilities, an (n x p) matrix, a length n vector, or a
+        list of length n columns
+    thresholds : np.ndarray
+        the threshold probabilities, length T
+    replicates : int
+        the number of bootstrap replicates, B
+    harms : list(float), optional
+        the harm associated with each predictor, defaults to 0
+    intervention_per : int
+        interventions per `intervention_per` patients
+    seed : int, optional
+        seed for the random number generator
+    memory_limit : int or str, optional
+        the most memory to use (e.g. '512MB'); rows and predictors are processed
+        in chunks to stay within it, see `dcapy.planner.plan_resampling`
+
+    Returns
+    -------
+    dict
+        'net_benefit' and 'interventions_avoided' (B, T, p), 'net_benefit_all'
+        (B, T), and the 'plan' (a `dcapy.planner.ExecutionPlan`) that was used
+    """
+    y = core._outcome_array(y)
+    columns = core._predictor_columns(P, len(y))
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    harms = core._harms_array(harms, len(columns))
+    num_rows, num_thresholds = len(y), len(thresholds)
+    bin_dtype = np.min_scalar_type(num_thresholds)
+    plan = plan_resampling(num_rows, len(columns), num_thresholds, replicates,
+                           memory_limit, bin_dtype.itemsize)
+    seeds = np.random.SeedSequence(seed).spawn(replicates)
+    sorted_thresholds, order = core._sorted_thresholds(thresholds)
+    multiplier = thresholds/(1-thresholds)
+
+    net_benefit = np.empty((replicates, num_thresholds, len(columns)))
+    num_events = np.empty(replicates)
+    for first in range(0, len(columns), plan.predictor_chunk):
+        bins = [_bins(x, sorted_thresholds, bin_dtype, plan.row_chunk)
+                for x in columns[first:first+plan.predictor_chunk]]
+        for replicate in range(replicates):
+            rng = np.random.default_rng(seeds[replicate])
+            positives = np.zeros((len(bins), num_thresholds+1), dtype=np.int64)
+            events = np.zeros((len(bins), num_thresholds+1))
+            replicate_events = 0
+            for start in range(0, num_rows, plan.row_chunk):
+                rows = rng.integers(0, num_rows, size=min(plan.row_chunk, num_rows-start))
+                y_rows = y[rows]
+                replicate_events += np.count_nonzero(y_rows)
+                for k, predictor_bins in enumerate(bins):
+                    rows_bins = predictor_bins[rows]
+                    positives[k] += np.bincount(rows_bins, minlength=num_thresholds+1)
+                    events[k] += np.bincount(rows_bins, weights=y_rows,
+                                             minlength=num_thresholds+1)
+            num_events[replicate] = replicate_events
+            for k in range(len(bins)):
+                true_positives = np.empty(num_thresholds)
+                false_positives = np.empty(num_thresholds)
+                true_positives[order] = core._count_above(events[k])
+                false_positives[order] = core._count_above(positives[k]) - true_positives[order]
+                net_benefit[replicate, :, first+k] = true_positives/num_rows \
+                    - false_positives/num_rows*multiplier - harms[first+k]
+
+    net_benefit_all = core.net_benefit_all((num_events/num_rows)[:, np.newaxis],
+                                           thresholds[np.newaxis, :])
+    interventions_avoided = (net_benefit - net_benefit_all[:, :, np.newaxis]) \
+        * intervention_per/multiplier[np.newaxis, :, np.newaxis]
+    return {'net_benefit' : net_benefit,
+            'interventions_avoided' : interventions_avoided,
+            'net_benefit_all' : net_benefit_all,
+            'plan' : plan}
+
+
+def permutation_test(y, a, b, thresholds, replicates=1000, harms=None, seed=None,
+                     memory_limit=None):
+    """Tests whether two predictors' net benefits differ at each threshold
+
+    Under the null hypothesis the two predictors are exchangeable, so each
+    replicate swaps their values for a random half of the observations. As
+    with `bootstrap`, the replicates are drawn in the calling process
+
+    Parameters
+    ----------
+    y : np.ndarray
+        the outcome, coded 0/1, length n
+    a : np.ndarray
+        the first predictor's probabilities, length n
+    b : np.ndarray
+        the second predictor's probabilities, length n
+    thresholds : np.ndarray
+        the threshold probabilities, length T
+    replicates : int
+        the number of permutations, R
+    harms : list(float), optional
+        the harms of `a` and `b`, defaults to 0
+    seed : int, optional
+        seed for the random number generator
+    memory_limit : int or str, optional
+        the most memory to use (e.g. '512MB'); rows are processed in chunks to
+        stay within it, see `dcapy.planner.plan_resampling`
+
+    Returns
+    -------
+    dict
+        the observed 'difference' in net benefit (a - b, length T), its 'null'
+        distribution (R, T), the two-sided 'p_value' at each threshold, and the
+        'plan' that was used
+
+    Raises
+    ------
+    ValueError
+        if the bins of both predictors don't fit in `memory_limit`
+    """
+    y = core._outcome_array(y)
+    a, b = core._predictor_columns([a, b], len(y))
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    harms = core._harms_array(harms, 2)
+    num_rows, num_thresholds = len(y), len(thresholds)
+    bin_dtype = np.min_scalar_type(num_thresholds)
+    plan = plan_resampling(num_rows, 2, num_thresholds, replicates, memory_limit,
+                           bin_dtype.itemsize)
+    if plan.predictor_chunk < 2:
+        raise ValueError("a memory limit of {0} bytes is too small to hold both "
+                         "predictors".format(plan.memory_limit))
+    sorted_thresholds, order = core._sorted_thresholds(thresholds)
+    bins_a = _bins(a, sorted_thresholds, bin_dtype, plan.row_chunk)
+    bins_b = _bins(b, sorted_thresholds, bin_dtype, plan.row_chunk)
+    multiplier = thresholds/(1-thresholds)
+
+    def difference(swap_rows):
+        counts = np.zeros((2, 2, num_thresholds+1))  # (a/b, positives/events)
+        for start in range(0, num_rows, plan.row_chunk):
+            stop = min(start + plan.row_chunk, num_rows)
+            swap = swap_rows(stop - start)
+            y_rows = y[start:stop]
+            for k, (own, other) in enumerate([(bins_a, bins_b), (bins_b, bins_a)]):
+                rows_bins = np.where(swap, other[start:stop], own[start:stop])
+                counts[k, 0] += np.bincount(rows_bins, minlength=num_thresholds+1)
+                counts[k, 1] += np.bincount(rows_bins, weights=y_rows,
+                                            minlength=num_thresholds+1)
+        net_benefit = np.empty((2, num_thresholds))
+        for k in range(2):
+            true_positives = core._count_above(counts[k, 1])
+            false_positives = core._count_above(counts[k, 0]) - true_positives
+            net_benefit[k, order] = true_positives/num_rows \
+                - false_positives/num_rows*multiplier[order] - harms[k]
+        return net_benefit[0] - net_benefit[1]
+
+    observed = difference(lambda size: False)
+    null = np.empty((replicates, num_thresholds))
+    for replicate, replicate_seed in enumerate(np.random.SeedSequence(seed).spawn(replicates)):
+        rng = np.random.default_rng(replicate_seed)
+        null[replicate] = difference(lambda size: rng.random(size) < 0.5)
+    #values within rounding of the observed difference count as at least as extreme
+    extreme = np.abs(null) >= np.abs(observed) - 1e-12
+    p_value = (1 + np.count_nonzero(extreme, axis=0))/(replicates + 1)
+    return {'difference' : observed, 'null' : null, 'p_value' : p_value, 'plan' : plan}
+
+
+def percentile_interval(replicates, level=0.95):
+    """Percentile confidence intervals from replicates
+
+    Parameters
+    ----------
+    replicates : np.ndarray
+        replicates of a curve or curves, with the replicates along the first axis
+    level : float
+        the confidence level
+
+    Returns
+    -------
+    tuple(np.ndarray, np.ndarray)
+        the lower and upper bounds, each shaped like one replicate
+    """
+    alpha = (1 - level)/2
+    lower, upper = np.nanpercentile(replicates, [100*alpha, 100*(1-alpha)], axis=0)
+    return lower, upper
+
+
+def _bins(x, sorted_thresholds, bin_dtype, row_chunk):
+    """The threshold bins of a predictor, in the smallest type, computed in chunks
+    """
+    bins = np.empty(len(x), dtype=bin_dtype)
+    for start in range(0, len(x), row_chunk):
+        bins[start:start+row_chunk] = core._threshold_bins(
+            x[start:start+row_chunk], sorted_thresholds)
+    return bins
@@ -0,0 +1,436 @@
+import numpy as np
+
+
+class DCAResult:
+    """DCAResult(thresholds, predictors, net_benefit, interventions_avoided, net_benefit_all)
+
+    The results of a decision curve analysis
+
+    Each metric is held in one contiguous (threshold x predictor) array and all
+    of them share a single threshold vector; pandas DataFrames in the layout
+    returned by `dcapy.algo.dca` are only built when they are asked for. The
+    frames are built once and each caller gets its own copy, so editing a
+    returned frame doesn't change the result or what other callers see
+
+    Parameters
+    ----------
+    thresholds : np.ndarray
+        the threshold probabilities, length T
+    predictors : list(str)
+        the predictors, one per column of the metric arrays
+    net_benefit : np.ndarray
+        net benefit of each predictor, shape (T, p)
+    interventions_avoided : np.ndarray
+        interventions avoided for each predictor, shape (T, p)
+    net_benefit_all : np.ndarray
+        net benefit of treating all patients, length T
+    dtype : np.dtype
+        the type to store the metrics as, `np.float64` (default) or `np.float32`
+
+    Attributes
+    ----------
+    smoothed : dict(str, np.ndarray)
+        smoothed net benefit and interventions avoided, keyed by metric name,
+        once `smooth` has been called
+    metadata : dict
+        information about the analysis that produced the result (e.g. harms,
+        the threshold grid), saved and loaded with it
+    profile : dcapy.profiling.Profile or None
+        the timings of each phase of the analysis, if it was profiled
+    plan : dcapy.planner.ExecutionPlan or None
+        how a decision curve analysis was counted (engine, workers, chunks), see
+        `dcapy.planner.plan_analysis`
+    metrics : dict(str, np.ndarray)
+        confusion matrix metrics (e.g. 'sensitivity'), each of shape (T, p),
+        if the analysis was asked for them, see `dcapy.core.confusion_metrics`
+    """
+    __slots__ = ('thresholds', 'predictors', 'net_benefit', 'interventions_avoided',
+                 'net_benefit_all', 'smoothed', 'metadata', 'profile', 'plan', 'metrics',
+                 '_frames')
+
+    def __init__(self, thresholds, predictors, net_benefit, interventions_avoided,
+                 net_benefit_all, dtype=np.float64):
+        if np.dtype(dtype) not in (np.float64, np.float32):
+            raise ValueError("dtype must be float64 or float32")
+        self.thresholds = np.ascontiguousarray(thresholds, dtype=np.float64)
+        self.predictors = list(predictors)
+        shape = (len(self.thresholds), len(self.predictors))
+        self.net_benefit = np.ascontiguousarray(net_benefit, dtype=dtype).reshape(shape)
+        self.interventions_avoided = np.ascontiguousarray(
+            interventions_avoided, dtype=dtype).reshape(shape)
+        self.net_benefit_all = np.ascontiguousarray(net_benefit_all, dtype=dtype)
+        self.smoothed = {}
+        self.metadata = {}
+        self.profile = None
+        self.plan = None
+        self.metrics = {}
+        self._frames = None
+
+    @classmethod
+    def from_frames(cls, net_benefit, interventions_avoided, predictors=None,
+                    dtype=np.float64):
+        """Creates a result from `net_benefit`, `interventions_avoided` dataframes
+
+        Parameters
+        ----------
+        net_benefit : pd.DataFrame
+            net benefit results, as returned by `dcapy.algo.dca`
+        interventions_avoided : pd.DataFrame
+            interventions avoided results, as returned by `dcapy.algo.dca`
+        predictors : list(str), optional
+            the predictor columns, defaults to all of the non-reference columns
+        dtype : np.dtype
+            the type to store the metrics as
+
+        Returns
+        -------
+        DCAResult
+        """
+        if predictors is None:
+            predictors = [column for column in net_benefit.columns
+                          if column not in ['threshold', 'all', 'none']
+                          and not str(column).endswith('_sm')]
+        return cls(net_benefit['threshold'].values, predictors,
+                   net_benefit[predictors].values,
+                   interventions_avoided[predictors].values,
+                   net_benefit['all'].values, dtype)
+
+    @classmethod
+    def load(cls, path, name=None, predictors=None):
+        """Loads a result saved with `save`
+
+        Parameters
+        ----------
+        path : str
+            the results file
+        name : str, optional
+            the analysis to load, may be omitted if the file holds only one
+        predictors : list(str), optional
+            the predictors to load, defaults to all of them
+
+        Returns
+        -------
+        DCAResult
+        """
+        from dcapy.storage import load_result
+        return load_result(path, name, predictors)
+
+    def save(self, path, name=None, metadata=None):
+        """Appends the result to a binary results file, see `dcapy.storage.save_result`
+
+        Parameters
+        ----------
+        path : str
+            the results file, created if it doesn't exist
+        name : str, optional
+            the name to store the analysis under
+        metadata : dict, optional
+            information to store with the result, in addition to `self.metadata`
+
+        Returns
+        -------
+        str
+            the name the analysis was stored under
+        """
+        from dcapy.storage import save_result
+        return save_result(path, self, name, metadata)
+
+    @property
+    def dtype(self):
+        """The type the metrics are stored as
+        """
+        return self.net_benefit.dtype
+
+    @property
+    def nbytes(self):
+        """The number of bytes held by the result arrays
+        """
+        arrays = [self.thresholds, self.net_benefit, self.interventions_avoided,
+                  self.net_benefit_all] + list(self.smoothed.values()) + \
+            list(self.metrics.values())
+        return sum(array.nbytes for array in arrays)
+
+    def smooth(self, method='lowess', lowess_frac=0.10, **smoother_args):
+        """Smooths the net benefit and interventions avoided curves of every predictor
+
+        Both metrics are smoothed together as one (T x 2p) block, see
+        `dcapy.calc.smooth_curves` for the valid methods and arguments
+
+        Parameters
+        ----------
+        method : str
+            the smoother, valid values are 'lowess' (default), 'savgol' or 'pspline'
+        lowess_frac : float
+            the fraction of the grid used when estimating each value
+        **smoother_args :
+            arguments for the smoother
+        """
+        from dcapy.calc import smooth_curves
+        num_predictors = len(self.predictors)
+        block = np.empty((len(self.thresholds), 2*num_predictors))
+        block[:, :num_predictors] = self.net_benefit
+        block[:, num_predictors:] = self.interventions_avoided
+        smooth_curves(self.thresholds, block, method, lowess_frac, out=block,
+                      **smoother_args)
+        self.smoothed = {
+            'net_benefit' : np.ascontiguousarray(block[:, :num_predictors], dtype=self.dtype),
+            'interventions_avoided' : np.ascontiguousarray(block[:, num_predictors:],
+                                                           dtype=self.dtype)}
+        self._frames = None
+
+    def net_benefit_frame(self):
+        """The net benefit results as a dataframe
+
+        Returns
+        -------
+        pd.DataFrame
+            columns 'threshold', 'all', 'none', then one for each predictor
+            (and one '<predictor>_sm' for each predictor, if smoothed)
+        """
+        return self._cached_frame('net benefit').copy()
+
+    def interventions_avoided_frame(self):
+        """The interventions avoided results as a dataframe
+
+        Returns
+        -------
+        pd.DataFrame
+            columns 'threshold', then one for each predictor
+            (and one '<predictor>_sm' for each predictor, if smoothed)
+        """
+        return self._cached_frame('interventions avoided').copy()
+
+    def metric_frame(self, metric):
+        """A confusion matrix metric as a dataframe
+
+        Parameters
+        ----------
+        metric : str
+            one of the `metrics` the analysis computed
+
+        Returns
+        -------
+        pd.DataFrame
+            columns 'threshold', then one for each predictor
+
+        Raises
+        ------
+        KeyError
+            if the metric wasn't computed
+        """
+        import pandas as pd
+        if metric not in self.metrics:
+            raise KeyError("{0} wasn't computed, the metrics are {1}".format(
+                repr(metric), list(self.metrics)))
+        columns = {'threshold' : self.thresholds}
+        for i, predictor in enumerate(self.predictors):
+            columns[predictor] = self.metrics[metric][:, i]
+        return pd.DataFrame(columns)
+
+    @property
+    def results(self):
+        """The results as a dict of dataframes, `'net benefit'` and `'interventions avoided'`
+
+        The dataframes are built the first time they are asked for; each access
+        returns new copies of them
+        """
+        return {'net benefit' : self.net_benefit_frame(),
+                'interventions avoided' : self.interventions_avoided_frame()}
+
+    def _cached_frame(self, name):
+        """The dataframe of results `name`, built the first time it is asked for
+        """
+        if self._frames is None:
+            self._frames = {}
+        if name not in self._frames:
+            if name == 'net benefit':
+                self._frames[name] = self._frame(
+                    'net_benefit', {'all' : self.net_benefit_all,
+                                    'none' : np.zeros_like(self.net_benefit_all)})
+            else:
+                self._frames[name] = self._frame('interventions_avoided', {})
+        return self._frames[name]
+
+    def _frame(self, metric, references):
+        """Builds the dataframe for `metric`, with the given reference columns
+        """
+        import pandas as pd
+        columns = {'threshold' : self.thresholds}
+        columns.update(references)
+        values = getattr(self, metric)
+        for i, predictor in enumerate(self.predictors):
+            columns[predictor] = values[:, i]
+        if metric in self.smoothed:
+            for i, predictor in enumerate(self.predictors):
+                columns['{}_sm'.format(predictor)] = self.smoothed[metric][:, i]
+        return pd.DataFrame(columns)
+
+    def __repr__(self):
+        return "DCAResult(predictors={0}, thresholds={1}, dtype={2})".format(
+            self.predictors, len(self.thresholds), self.dtype)
+
+
+class MultiOutcomeResult:
+    """MultiOutcomeResult(outcomes, thresholds, predictors, net_benefit,
+                          interventions_avoided, net_benefit_all)
+
+    The results of a decision curve analysis of several outcomes
+
+    The metrics of every outcome are held in one array with the outcome as its
+    first dimension, and each outcome has its own treat-all curve. Indexing
+    the result with an outcome gives that outcome's `DCAResult`, whose arrays
+    are views of these
+
+    Parameters
+    ----------
+    outcomes : list(str)
+        the outcomes, one per leading row of the metric arrays
+    thresholds : np.ndarray
+        the threshold probabilities, length T
+    predictors : list(str)
+        the predictors
+    net_benefit : np.ndarray
+        net benefit of each predictor for each outcome, shape (k, T, p)
+    interventions_avoided : np.ndarray
+        interventions avoided for each predictor and outcome, shape (k, T, p)
+    net_benefit_all : np.ndarray
+        net benefit of treating all patients for each outcome, shape (k, T)
+    dtype : np.dtype
+        the type to store the metrics as, `np.float64` (default) or `np.float32`
+
+    Attributes
+    ----------
+    profile : dcapy.profiling.Profile or None
+        the timings of each phase of the analysis, if it was profiled
+    plan : dcapy.planner.ExecutionPlan or None
+        how the outcomes were counted, see `dcapy.planner.plan_analysis`
+    """
+    __slots__ = ('outcomes', 'thresholds', 'predictors', 'net_benefit',
+                 'interventions_avoided', 'net_benefit_all', 'profile', 'plan',
+                 '_results', '_frames')
+
+    def __init__(self, outcomes, thresholds, predictors, net_benefit,
+                 interventions_avoided, net_benefit_all, dtype=np.float64):
+        self.outcomes = list(outcomes)
+        self.thresholds = np.ascontiguousarray(thresholds, dtype=np.float64)
+        self.predictors = list(predictors)
+        shape = (len(self.outcomes), len(self.thresholds), len(self.predictors))
+        self.net_benefit = np.ascontiguousarray(net_benefit, dtype=dtype).reshape(shape)
+        self.interventions_avoided = np.ascontiguousarray(
+            interventions_avoided, dtype=dtype).reshape(shape)
+        self.net_benefit_all = np.ascontiguousarray(
+            net_benefit_all, dtype=dtype).reshape(shape[:2])
+        self._results = {outcome : DCAResult(self.thresholds, self.predictors,
+                                             self.net_benefit[k],
+                                             self.interventions_avoided[k],
+                                             self.net_benefit_all[k], dtype)
+                         for k, outcome in enumerate(self.outcomes)}
+        self.profile = None
+        self.plan = None
+        self._frames = None
+
+    def __getitem__(self, outcome):
+        return self._results[outcome]
+
+    def __iter__(self):
+        return iter(self.outcomes)
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def items(self):
+        """The (outcome, `DCAResult`) pairs, in order
+        """
+        return [(outcome, self._results[outcome]) for outcome in self.outcomes]
+
+    @property
+    def dtype(self):
+        """The type the metrics are stored as
+        """
+        return self.net_benefit.dtype
+
+    @property
+    def nbytes(self):
+        """The number of bytes held by the result arrays
+        """
+        return self.thresholds.nbytes + self.net_benefit.nbytes + \
+            self.interventions_avoided.nbytes + self.net_benefit_all.nbytes + \
+            sum(sum(array.nbytes for array in result.smoothed.values())
+                for result in self._results.values())
+
+    def smooth(self, method='lowess', lowess_frac=0.10, **smoother_args):
+        """Smooths the curves of every outcome, see `DCAResult.smooth`
+        """
+        for result in self._results.values():
+            result.smooth(method, lowess_frac, **smoother_args)
+
+    def save(self, path, name=None, metadata=None):
+        """Appends the result of each outcome to a binary results file, see
+        `DCAResult.save`
+
+        Each outcome is stored as its own analysis, named '<name>[<outcome>]'
+        (or with the default name, if `name` isn't given), with its 'outcome'
+        in its metadata
+
+        Returns
+        -------
+        list(str)
+            the names the outcomes were stored under
+        """
+        return [result.save(path, None if name is None else '{0}[{1}]'.format(name, outcome),
+                            dict(metadata or {}, outcome=outcome))
+                for outcome, result in self.items()]
+
+    def net_benefit_frame(self):
+        """The net benefit results of every outcome as one dataframe
+
+        Returns
+        -------
+        pd.DataFrame
+            an 'outcome' column, then the columns of `DCAResult.net_benefit_frame`,
+            with the rows of each outcome in turn
+        """
+        return self._cached_frame('net benefit').copy()
+
+    def interventions_avoided_frame(self):
+        """The interventions avoided results of every outcome as one dataframe
+
+        Returns
+        -------
+        pd.DataFrame
+            an 'outcome' column, then the columns of
+            `DCAResult.interventions_avoided_frame`
+        """
+        return self._cached_frame('interventions avoided').copy()
+
+    @property
+    def results(self):
+        """The results as a dict of dataframes, `'net benefit'` and
+        `'interventions avoided'`, each with an 'outcome' column
+
+        As for `DCAResult.results`, the dataframes are built once and each
+        access returns new copies of them
+        """
+        return {'net benefit' : self.net_benefit_frame(),
+                'interventions avoided' : self.interventions_avoided_frame()}
+
+    def _cached_frame(self, name):
+        """The dataframe of results `name` for every outcome, built the first
+        time it is asked for
+        """
+        import pandas as pd
+        if self._frames is None:
+            self._frames = {}
+        #rebuilt if an outcome's frame was, e.g. after smoothing only that outcome
+        sources = [result._cached_frame(name) for result in self._results.values()]
+        cached = self._frames.get(name)
+        if cached is None or any(a is not b for a, b in zip(cached[0], sources)):
+            parts = [frame.assign(outcome=outcome)[['outcome'] + list(frame.columns)]
+                     for outcome, frame in zip(self._results, sources)]
+            self._frames[name] = (sources, pd.concat(parts, ignore_index=True))
+        return self._frames[name][1]
+
+    def __repr__(self):
+        return "MultiOutcomeResult(outcomes={0}, predictors={1}, thresholds={2}, " \
+            "dtype={3})".format(self.outcomes, self.predictors, len(self.thresholds),
+                                self.dtype)
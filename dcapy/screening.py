@@ -0,0 +1,149 @@
+import numpy as np
+import dcapy.core as core
+from dcapy.planner import plan_analysis
+
+#the summaries predictors can be ranked by, see `summarize_curves`
+CRITERIA = ['area', 'max_net_benefit', 'beats_fraction']
+
+
+def screen(data, outcome, predictors, thresh_lo=0.01, thresh_hi=0.99, thresh_step=0.01,
+           harms=None, area_range=None, criterion='area', top_k=None,
+           predictor_chunk=256, memory_limit=None, engine=None, workers=None):
+    """Screens many predictors, keeping only summaries of their net benefit curves
+
+    The predictors are loaded and counted `predictor_chunk` at a time, each
+    chunk's curves are summarized (see `summarize_curves`) and dropped, and
+    only the `top_k` best summaries so far are kept, so memory is bounded by
+    the chunk size and `top_k` however many predictors are screened. No
+    dataframes are built
+
+    Parameters
+    ----------
+    data : pd.DataFrame or dcapy.columnar.ColumnStore
+        the data set, with a column for the outcome and each predictor
+    outcome : str
+        the outcome column, coded 0/1
+    predictors : list(str)
+        the columns of predicted probabilities to screen
+    thresh_lo, thresh_hi, thresh_step : float
+        the threshold grid, see `dcapy.algo.dca`
+    harms : float or list(float), optional
+        the harm of every predictor, or of each one, defaults to 0
+    area_range : tuple(float, float), optional
+        the thresholds to take the area under the net benefit curve over,
+        defaults to the whole grid
+    criterion : str
+        the summary to rank the predictors by, highest first, one of `CRITERIA`
+    top_k : int, optional
+        the number of predictors to keep, defaults to all of them
+    predictor_chunk : int
+        the number of predictors loaded and counted at once
+    memory_limit, engine, workers : optional
+        how to count each chunk, see `dcapy.planner.plan_analysis`
+
+    Returns
+    -------
+    dict
+        the kept 'predictors', best first, and their summaries (see
+        `summarize_curves`), the 'num_screened' predictors, and the 'plan'
+        each chunk was counted with
+
+    Raises
+    ------
+    ValueError
+        if `criterion` isn't one of `CRITERIA`, or the harms don't match the predictors
+    """
+    if criterion not in CRITERIA:
+        raise ValueError("criterion must be one of {0}".format(CRITERIA))
+    predictors = [predictors] if isinstance(predictors, str) else list(predictors)
+    harms = np.zeros(len(predictors)) if harms is None else \
+        np.broadcast_to(np.asarray(harms, dtype=np.float64), (len(predictors),))
+    predictor_chunk = max(int(predictor_chunk), 1)
+    thresholds = core.threshold_grid(thresh_lo, thresh_hi, thresh_step)
+    y = np.asarray(data[outcome])
+    net_benefit_all = core.net_benefit_all(np.mean(y), thresholds)
+    plan = plan_analysis(len(y), min(predictor_chunk, max(len(predictors), 1)),
+                         thresholds, memory_limit, engine, workers)
+
+    kept = None
+    for first in range(0, len(predictors), predictor_chunk):
+        names = predictors[first:first+predictor_chunk]
+        true_positives, false_positives = core.count_positives(
+            y, [np.asarray(data[name]) for name in names], thresholds,
+            plan.row_chunk, plan.engine, plan.workers)
+        net_benefit = core.net_benefit_from_counts(
+            true_positives, false_positives, len(y), thresholds,
+            harms[first:first+predictor_chunk])
+        summaries = summarize_curves(net_benefit, net_benefit_all, thresholds, area_range)
+        summaries['predictors'] = np.array(names, dtype=object)
+        kept = _best(summaries if kept is None else
+                     {name : np.concatenate([kept[name], summaries[name]])
+                      for name in kept}, criterion, top_k)
+    if kept is None:
+        kept = _best(summarize_curves(np.empty((len(thresholds), 0)), net_benefit_all,
+                                      thresholds, area_range), criterion, top_k)
+        kept['predictors'] = np.array([], dtype=object)
+    kept['predictors'] = list(kept['predictors'])
+    kept['num_screened'] = len(predictors)
+    kept['plan'] = plan
+    return kept
+
+
+def summarize_curves(net_benefit, net_benefit_all, thresholds, area_range=None):
+    """Summarizes net benefit curves
+
+    Parameters
+    ----------
+    net_benefit : np.ndarray
+        the net benefit of each predictor, shape (T, p)
+    net_benefit_all : np.ndarray
+        the net benefit of treating all, length T
+    thresholds : np.ndarray
+        the threshold probabilities, length T, increasing
+    area_range : tuple(float, float), optional
+        the thresholds to take the area over, defaults to all of them
+
+    Returns
+    -------
+    dict(str, np.ndarray)
+        for each predictor (length p): the 'area' under its net benefit curve
+        over `area_range` (trapezoidal), its 'max_net_benefit' and the
+        'max_threshold' it is reached at, the lowest ('beats_from') and
+        highest ('beats_to') thresholds at which it beats treating both all
+        and none (NaN if it never does), and the fraction of thresholds at
+        which it does ('beats_fraction')
+
+    Raises
+    ------
+    ValueError
+        if no thresholds are in `area_range`
+    """
+    net_benefit = np.asarray(net_benefit, dtype=np.float64)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    lo, hi = (thresholds[0], thresholds[-1]) if area_range is None else area_range
+    in_range = (thresholds >= lo) & (thresholds <= hi)
+    if not in_range.any():
+        raise ValueError("no thresholds are in the range {0}".format((lo, hi)))
+    curves, grid = net_benefit[in_range], thresholds[in_range]
+    area = np.sum((curves[1:] + curves[:-1])/2*np.diff(grid)[:, np.newaxis], axis=0)
+
+    best = np.argmax(net_benefit, axis=0) if len(thresholds) else np.zeros(0, dtype=int)
+    beats = net_benefit > np.maximum(np.asarray(net_benefit_all), 0)[:, np.newaxis]
+    any_beats = beats.any(axis=0)
+    first = np.argmax(beats, axis=0)
+    last = len(thresholds) - 1 - np.argmax(beats[::-1], axis=0)
+    columns = np.arange(net_benefit.shape[1])
+    return {'area' : area,
+            'max_net_benefit' : net_benefit[best, columns],
+            'max_threshold' : thresholds[best],
+            'beats_from' : np.where(any_beats, thresholds[first], np.nan),
+            'beats_to' : np.where(any_beats, thresholds[last], np.nan),
+            'beats_fraction' : np.count_nonzero(beats, axis=0)/len(thresholds)}
+
+
+def _best(summaries, criterion, top_k):
+    """The summaries of the `top_k` predictors by `criterion`, best first
+    """
+    #stable, so tied predictors stay in the order they were screened
+    order = np.argsort(-summaries[criterion], kind='stable')[:top_k]
+    return {name : values[order] for name, values in summaries.items()}
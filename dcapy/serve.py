@@ -0,0 +1,594 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.parse import quote, unquote
+from urllib.request import Request, urlopen
+import numpy as np
+import dcapy.core as core
+import dcapy.validate as val
+from dcapy.planner import plan_analysis
+
+#the grid used when a query doesn't give one, as for `dcapy.algo.dca`
+_DEFAULT_GRID = {'thresh_lo' : 0.01, 'thresh_hi' : 0.99, 'thresh_step' : 0.01}
+
+
+class Cohort:
+    """Cohort(name, data)
+
+    A data set held in memory between queries
+
+    The numeric columns are read into memory once; each column is checked
+    (for values between 0 and 1, and for missing values) the first time a
+    query uses it, and the complete rows of a set of columns are found once
+
+    Parameters
+    ----------
+    name : str
+        the name queries refer to the cohort by
+    data : pd.DataFrame, dcapy.columnar.ColumnStore, dict(str, np.ndarray) or str
+        the data set, or the path to columnar data (see `dcapy.columnar.open_columns`)
+    """
+
+    def __init__(self, name, data):
+        from dcapy.columnar import ColumnStore
+        if isinstance(data, str):
+            data = ColumnStore.open(data)
+        elif isinstance(data, dict):
+            data = ColumnStore({column : np.asarray(values) for column, values in data.items()})
+        self.name = name
+        #np.array copies memory-mapped columns into memory
+        self.columns = {str(column) : np.array(data[column]) for column in data.columns
+                        if np.asarray(data[column]).dtype.kind in 'biuf'}
+        lengths = set(len(values) for values in self.columns.values())
+        if len(lengths) > 1:
+            raise ValueError("all columns must have the same number of rows")
+        self.num_rows = lengths.pop() if lengths else 0
+        self._missing = {}
+        self._complete_rows = {}
+        self._lock = threading.Lock()
+
+    def check(self, columns):
+        """Checks that columns exist and hold values between 0 and 1
+
+        Parameters
+        ----------
+        columns : list(str)
+            the outcome and predictor columns of a query
+
+        Returns
+        -------
+        tuple(str)
+            the columns with missing values, sorted
+
+        Raises
+        ------
+        KeyError
+            if a column isn't in the cohort
+        ValueError
+            if a column has values outside of 0-1
+        """
+        missing = []
+        for column in columns:
+            if column not in self._missing:
+                if column not in self.columns:
+                    raise KeyError("{0} is not a column of {1}".format(
+                        repr(column), repr(self.name)))
+                values = self.columns[column]
+                missing_values = np.isnan(values) if values.dtype.kind == 'f' else None
+                if np.any((values > 1) | (values < 0)):
+                    raise ValueError("{0} must be between 0 and 1".format(repr(column)))
+                self._missing[column] = missing_values is not None and missing_values.any()
+            if self._missing[column]:
+                missing.append(column)
+        return tuple(sorted(set(missing)))
+
+    def rows(self, missing):
+        """The rows that are complete in `missing`, or `None` for every row
+        """
+        if not missing:
+            return None
+        with self._lock:
+            if missing not in self._complete_rows:
+                complete = np.ones(self.num_rows, dtype=bool)
+                for column in missing:
+                    complete &= ~np.isnan(self.columns[column])
+                self._complete_rows[missing] = np.flatnonzero(complete)
+            return self._complete_rows[missing]
+
+    def describe(self):
+        return {'rows' : self.num_rows, 'columns' : list(self.columns)}
+
+
+class CohortService:
+    """CohortService(batch_window=0.005, timeout=None)
+
+    Answers net benefit queries against cohorts held in memory
+
+    A query is a dict with the 'cohort' name, its 'outcome' (a column, or a
+    list of columns), 'predictors' (columns of probabilities), and optionally
+    'harms' (one per predictor), 'thresh_lo', 'thresh_hi', 'thresh_step' and
+    'intervention_per', as for `dcapy.algo.dca`
+
+    Queries against the same cohort and threshold grid that arrive within
+    `batch_window` seconds of the first of them are answered together: the
+    union of their predictors is counted against the union of their outcomes
+    in one pass (see `dcapy.core.count_positives`), and each query's harms
+    are applied to the shared counts. A query is answered as `dcapy.algo.dca`
+    would answer it on the cohort's columns (as a `dcapy.columnar.ColumnStore`),
+    so only the rows missing one of the query's own columns are dropped;
+    queries whose columns have missing values are batched only with queries
+    missing the same rows
+
+    Parameters
+    ----------
+    batch_window : float
+        the seconds to wait for other queries before counting
+    timeout : float, optional
+        the most seconds to wait for an answer
+    history : int, optional
+        the number of count passes kept in `batches`
+
+    Attributes
+    ----------
+    cohorts : dict(str, Cohort)
+        the cohorts held in memory
+    batches : collections.deque(dict)
+        a record of the latest `history` count passes: the number of 'queries',
+        'outcomes' and 'predictors' counted, the 'engine' and the 'seconds' it took
+    """
+
+    def __init__(self, batch_window=0.005, timeout=None, history=1000):
+        self.batch_window = batch_window
+        self.timeout = timeout
+        self.cohorts = {}
+        self.batches = deque(maxlen=history)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def load(self, name, data):
+        """Loads a cohort, replacing any cohort of the same name
+
+        Parameters
+        ----------
+        name : str
+            the name queries refer to the cohort by
+        data : pd.DataFrame, dcapy.columnar.ColumnStore, dict or str
+            the data set, see `Cohort`
+
+        Returns
+        -------
+        dict
+            the cohort's 'rows' and 'columns'
+        """
+        cohort = Cohort(name, data)
+        with self._lock:
+            self.cohorts[name] = cohort
+        return cohort.describe()
+
+    def unload(self, name):
+        """Drops a cohort from memory (queries already waiting are still answered)
+        """
+        with self._lock:
+            self._cohort(name)
+            del self.cohorts[name]
+
+    def describe(self):
+        """The 'rows' and 'columns' of each cohort, keyed by name
+        """
+        with self._lock:
+            return {name : cohort.describe() for name, cohort in self.cohorts.items()}
+
+    def net_benefit(self, query):
+        """Answers a query, waiting for the other queries in its batch
+
+        Parameters
+        ----------
+        query : dict
+            the query, see `CohortService`
+
+        Returns
+        -------
+        dict
+            the 'thresholds', 'predictors', 'net_benefit' (T x p),
+            'interventions_avoided' (T x p) and 'net_benefit_all' (T) as lists;
+            for a list of outcomes, the 'outcomes' and the curves of each, with
+            the outcome first (k x T x p and k x T); and the 'batch' it was
+            counted in
+
+        Raises
+        ------
+        KeyError
+            if the cohort or a column doesn't exist
+        ValueError
+            if the query is invalid
+        """
+        return self.submit(query).result(self.timeout)
+
+    def submit(self, query):
+        """Queues a query, see `net_benefit`
+
+        Returns
+        -------
+        concurrent.futures.Future
+            the future answer
+        """
+        query = _parse_query(query)
+        with self._lock:
+            cohort = self._cohort(query['cohort'])
+        missing = cohort.check(query['outcomes'] + query['predictors'])
+        key = (id(cohort), query['grid'], missing)
+        future = Future()
+        with self._lock:
+            first = key not in self._pending
+            if first:
+                self._pending[key] = (cohort, [])
+            self._pending[key][1].append((query, future))
+        if first:
+            timer = threading.Timer(self.batch_window, self._flush, [key])
+            timer.daemon = True
+            timer.start()
+        return future
+
+    def _cohort(self, name):
+        try:
+            return self.cohorts[name]
+        except KeyError:
+            raise KeyError("no cohort named {0}".format(repr(name)))
+
+    def _flush(self, key):
+        """Answers the queries of a batch
+        """
+        with self._lock:
+            cohort, batch = self._pending.pop(key)
+        try:
+            answers = self._answer(cohort, key[1], key[2], [query for query, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), answer in zip(batch, answers):
+            if isinstance(answer, Exception):
+                future.set_exception(answer)
+            else:
+                future.set_result(answer)
+
+    def _answer(self, cohort, grid, missing, queries):
+        """Counts the union of the queries' columns once, and answers each query;
+        a query that can't be answered gets its error rather than an answer
+        """
+        start = time.perf_counter()
+        outcomes = _union(query['outcomes'] for query in queries)
+        predictors = _union(query['predictors'] for query in queries)
+        rows = cohort.rows(missing)
+
+        def column(name):
+            values = cohort.columns[name]
+            return values if rows is None else values[rows]
+
+        thresholds = core.threshold_grid(*grid)
+        y = np.column_stack([column(outcome) for outcome in outcomes])
+        plan = plan_analysis(len(y), len(predictors), thresholds,
+                             num_outcomes=len(outcomes))
+        true_positives, false_positives = core.count_positives(
+            y, [column(predictor) for predictor in predictors], thresholds,
+            plan.row_chunk, plan.engine, plan.workers)
+        batch = {'queries' : len(queries), 'outcomes' : len(outcomes),
+                 'predictors' : len(predictors), 'engine' : plan.engine,
+                 'seconds' : time.perf_counter() - start}
+        self.batches.append(batch)
+
+        answers = []
+        for query in queries:
+            try:
+                answers.append(self._answer_query(query, outcomes, predictors, y, thresholds,
+                                                  true_positives, false_positives, batch))
+            except Exception as e:
+                answers.append(e)
+        return answers
+
+    def _answer_query(self, query, outcomes, predictors, y, thresholds, true_positives,
+                      false_positives, batch):
+        """Answers a query from the counts of its batch
+        """
+        p = [predictors.index(predictor) for predictor in query['predictors']]
+        curves = []
+        for outcome in query['outcomes']:
+            k = outcomes.index(outcome)
+            net_benefit = core.net_benefit_from_counts(
+                true_positives[:, p, k], false_positives[:, p, k], len(y),
+                thresholds, query['harms'])
+            net_benefit_all = core.net_benefit_all(np.mean(y[:, k]), thresholds)
+            curves.append((net_benefit, core.interventions_avoided(
+                net_benefit, net_benefit_all, thresholds, query['intervention_per']),
+                net_benefit_all))
+        answer = {'thresholds' : thresholds.tolist(),
+                  'predictors' : query['predictors']}
+        if query['multiple']:
+            answer['outcomes'] = query['outcomes']
+        for name, values in zip(['net_benefit', 'interventions_avoided',
+                                 'net_benefit_all'], zip(*curves)):
+            answer[name] = (np.stack(values) if query['multiple']
+                            else values[0]).tolist()
+        answer['batch'] = dict(batch)
+        return answer
+
+
+class Client:
+    """Client(url)
+
+    Queries a service started with `python -m dcapy.serve` (or `make_server`)
+
+    Parameters
+    ----------
+    url : str
+        the address of the service, e.g. 'http://127.0.0.1:8765'
+    timeout : float, optional
+        the most seconds to wait for a reply
+    """
+
+    def __init__(self, url, timeout=None):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def load(self, name, path=None, columns=None):
+        """Loads a cohort from a path on the service's machine, or from columns
+
+        Parameters
+        ----------
+        name : str
+            the name to give the cohort
+        path : str, optional
+            the path to columnar data, see `dcapy.columnar.open_columns`
+        columns : dict(str, array-like), optional
+            the columns themselves
+
+        Returns
+        -------
+        dict
+            the cohort's 'rows' and 'columns'
+        """
+        body = {'name' : name, 'path' : path}
+        if columns is not None:
+            body['columns'] = {column : np.asarray(values).tolist()
+                               for column, values in columns.items()}
+        return self._request('POST', '/cohorts', body)
+
+    def unload(self, name):
+        """Drops a cohort from the service's memory
+        """
+        return self._request('DELETE', '/cohorts/' + quote(name, safe=''))
+
+    def cohorts(self):
+        """The 'rows' and 'columns' of each cohort, keyed by name
+        """
+        return self._request('GET', '/cohorts')
+
+    def net_benefit(self, cohort, outcome, predictors, **kwargs):
+        """Queries the net benefit of predictors, see `CohortService.net_benefit`
+
+        Parameters
+        ----------
+        cohort : str
+            the cohort's name
+        outcome : str or list(str)
+            the outcome column(s)
+        predictors : str or list(str)
+            the columns of predicted probabilities
+        **kwargs :
+            'harms', 'thresh_lo', 'thresh_hi', 'thresh_step', 'intervention_per'
+        """
+        return self._request('POST', '/net_benefit',
+                             dict(kwargs, cohort=cohort, outcome=outcome,
+                                  predictors=predictors))
+
+    def _request(self, method, path, body=None):
+        data = None if body is None else json.dumps(body).encode()
+        request = Request(self.url + path, data=data, method=method,
+                          headers={'Content-Type' : 'application/json'})
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except HTTPError as e:
+            message = json.loads(e.read()).get('error', e.reason)
+            raise (KeyError if e.code == 404 else ValueError)(message)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Routes requests to the server's `CohortService`
+    """
+
+    def do_GET(self):
+        if self.path == '/cohorts':
+            self._handle(self.server.service.describe)
+        else:
+            self._reply(404, {'error' : 'not found'})
+
+    def do_POST(self):
+        if self.path == '/cohorts':
+            self._handle(lambda: self._load(self._body()))
+        elif self.path == '/net_benefit':
+            self._handle(lambda: self.server.service.net_benefit(self._body()))
+        else:
+            self._reply(404, {'error' : 'not found'})
+
+    def do_DELETE(self):
+        if self.path.startswith('/cohorts/'):
+            name = unquote(self.path[len('/cohorts/'):])
+            self._handle(lambda: self.server.service.unload(name) or {'unloaded' : name})
+        else:
+            self._reply(404, {'error' : 'not found'})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _load(self, body):
+        if 'name' not in body:
+            raise ValueError("a cohort needs a 'name'")
+        data = body.get('columns') if body.get('path') is None else body['path']
+        if data is None:
+            raise ValueError("a cohort needs a 'path' or 'columns'")
+        return self.server.service.load(body['name'], data)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            raise ValueError("the request body must be JSON")
+        if not isinstance(body, dict):
+            raise ValueError("the request body must be a JSON object")
+        return body
+
+    def _handle(self, func):
+        try:
+            self._reply(200, func())
+        except KeyError as e:
+            self._reply(404, {'error' : str(e.args[0]) if e.args else 'not found'})
+        except (ValueError, TypeError, OSError) as e:
+            self._reply(400, {'error' : str(e)})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(host='127.0.0.1', port=8765, service=None, verbose=False):
+    """Creates an HTTP server for a `CohortService`
+
+    Routes (JSON in and out):
+
+    * GET /cohorts: the loaded cohorts
+    * POST /cohorts: load a cohort, {'name', 'path'} or {'name', 'columns'}
+    * DELETE /cohorts/<name>: drop a cohort
+    * POST /net_benefit: answer a query, see `CohortService.net_benefit`
+
+    Unknown cohorts or columns are answered with status 404, invalid queries
+    with 400 and an 'error' message
+
+    Parameters
+    ----------
+    host : str
+        the address to listen on, local only by default
+    port : int
+        the port to listen on, 0 for any free port
+    service : CohortService, optional
+        the service to answer with, defaults to a new one
+    verbose : bool
+        whether to log each request to stderr
+
+    Returns
+    -------
+    http.server.ThreadingHTTPServer
+        the server, with its `service`; call `serve_forever` to start it
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = CohortService() if service is None else service
+    server.verbose = verbose
+    return server
+
+
+def _parse_query(query):
+    """Checks a query's fields, returning them with defaults filled in
+    """
+    if not isinstance(query, dict):
+        raise ValueError("a query must be a dict")
+    for field in ['cohort', 'outcome', 'predictors']:
+        if field not in query:
+            raise ValueError("a query needs {0}".format(repr(field)))
+    unknown = set(query) - set(['cohort', 'outcome', 'predictors', 'harms',
+                                'intervention_per']) - set(_DEFAULT_GRID)
+    if unknown:
+        raise ValueError("unknown query fields {0}".format(sorted(unknown)))
+    multiple = isinstance(query['outcome'], (list, tuple))
+    outcomes = list(query['outcome']) if multiple else [query['outcome']]
+    predictors = query['predictors']
+    predictors = [predictors] if isinstance(predictors, str) else list(predictors)
+    if not outcomes or not predictors:
+        raise ValueError("a query needs at least one outcome and one predictor")
+    harms = query.get('harms')
+    if harms is not None:
+        harms = core._harms_array(harms, len(predictors))
+    for name in outcomes + predictors:
+        if not isinstance(name, str):
+            raise ValueError("outcomes and predictors must be column names")
+    intervention_per = query.get('intervention_per', 100)
+    if isinstance(intervention_per, bool) or not isinstance(intervention_per, (int, float)) \
+            or not 0 < intervention_per < np.inf:
+        raise ValueError("'intervention_per' must be a positive number")
+    grid = tuple(float(query.get(name, default)) for name, default in _DEFAULT_GRID.items())
+    _validate_grid(grid)
+    return {'cohort' : query['cohort'],
+            'outcomes' : outcomes,
+            'multiple' : multiple,
+            'predictors' : predictors,
+            'harms' : harms,
+            'grid' : grid,
+            'intervention_per' : intervention_per}
+
+
+def _validate_grid(grid):
+    """Checks a query's threshold grid as `DecisionCurveAnalysis` does, and
+    that every threshold of it lies below 1
+    """
+    for name, bound, value in zip(_DEFAULT_GRID, ['lower', 'upper', 'step'], grid):
+        try:
+            val.threshold_validate(bound, value, list(grid))
+        except ValueError:
+            raise ValueError("invalid {0} {1!r} for the threshold grid".format(name, value))
+    if core.threshold_grid(*grid)[-1] >= 1:
+        raise ValueError("the threshold grid {0} reaches past 1".format(list(grid)))
+
+
+def _union(lists):
+    """The distinct items of several lists, in the order they're first seen
+    """
+    items = []
+    for values in lists:
+        items.extend(value for value in values if value not in items)
+    return items
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m dcapy.serve',
+        description="answer net benefit queries against cohorts held in memory")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--cohort', action='append', default=[], metavar='NAME=PATH',
+                        help="load columnar data at start up")
+    parser.add_argument('--batch-window', type=float, default=0.005,
+                        help="seconds to wait for queries to batch together")
+    parser.add_argument('--verbose', action='store_true', help="log each request")
+    args = parser.parse_args(args)
+
+    server = make_server(args.host, args.port, CohortService(args.batch_window),
+                         args.verbose)
+    for spec in args.cohort:
+        name, _, path = spec.partition('=')
+        if not path:
+            parser.error("cohorts are given as NAME=PATH")
+        server.service.load(name, path)
+    print("serving on http://{0}:{1}".format(*server.server_address[:2]), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+import weakref
+from collections import namedtuple
+from functools import partial
+from multiprocessing import shared_memory
+import numpy as np
+from dcapy.columnar import ColumnStore
+
+#columns start on cache line boundaries in the shared block
+_ALIGNMENT = 64
+
+#the blocks this process has attached to, kept open for the life of the process
+_attached = {}
+
+
+SharedHandle = namedtuple('SharedHandle', ['name', 'num_rows', 'columns'])
+SharedHandle.__doc__ = """SharedHandle(name, num_rows, columns)
+
+    What a worker needs to attach to shared columns: the name of the shared
+    memory block, the number of rows, and a `(column, dtype, offset)` tuple for
+    each column. It pickles to a few hundred bytes, whatever the size of the data
+    """
+
+
+class SharedColumns:
+    """SharedColumns(data, columns=None)
+
+    Columns of a data set placed in shared memory, for analyses in worker processes
+
+    The columns are copied once into one `multiprocessing.shared_memory` block,
+    after dropping the rows missing any of them (as `data_validate` would).
+    `store` is a `dcapy.columnar.ColumnStore` over the block that can be
+    passed as the data of any analysis; when it (or a `DecisionCurveAnalysis`
+    holding it) is pickled to a worker process, only its `handle` is sent, and
+    the worker maps the same memory instead of receiving a copy. This makes
+    process pools cheap for `map`, for a `dcapy.aio.AnalysisRunner` with a
+    `concurrent.futures.ProcessPoolExecutor`, and for any other pool
+
+    The block is released (unlinked) by `close`, when leaving a `with` block
+    (including on an error or `KeyboardInterrupt`), when the object is garbage
+    collected, or at exit, whichever comes first. Workers should not use the
+    columns once they are released
+
+    Only work sent to other processes is helped by sharing: `map`, a process
+    pool runner and `dcapy.batch.run_jobs`. Nothing else takes a handle: the
+    `workers` of `dcapy.core.count_positives` (and of the plans of
+    `dcapy.planner`) are threads of the calling process, and
+    `dcapy.resample.bootstrap` and `permutation_test` run in the calling
+    process on the arrays they are given (which may be columns of `store`).
+    To resample in several processes, `map` a module-level function over
+    seeds, each call resampling the shared columns
+
+    Parameters
+    ----------
+    data : pd.DataFrame, dcapy.columnar.ColumnStore or dict(str, np.ndarray)
+        the data set
+    columns : list(str), optional
+        the (numeric) columns to share, defaults to all of them
+
+    Attributes
+    ----------
+    handle : SharedHandle
+        what a worker needs to attach to the columns, see `attach`
+    store : dcapy.columnar.ColumnStore
+        the shared columns, read-only
+
+    Raises
+    ------
+    ValueError
+        if a column isn't numeric
+    """
+
+    def __init__(self, data, columns=None):
+        if not isinstance(data, ColumnStore):
+            names = list(data.columns if columns is None and hasattr(data, 'columns')
+                         else (data if columns is None else columns))
+            data = ColumnStore({name : np.asarray(data[name]) for name in names})
+        columns = data.columns if columns is None else list(columns)
+        data = data.dropna(columns)
+        arrays = []
+        for column in columns:
+            values = np.ascontiguousarray(data[column])
+            if values.dtype.kind not in 'biuf':
+                raise ValueError("{0} must be numeric to be shared".format(repr(column)))
+            arrays.append(values)
+        offsets, size = [], 0
+        for values in arrays:
+            size = -(-size//_ALIGNMENT)*_ALIGNMENT
+            offsets.append(size)
+            size += values.nbytes
+        self._memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._finalizer = weakref.finalize(self, _release, self._memory)
+        try:
+            for values, offset in zip(arrays, offsets):
+                np.ndarray(values.shape, values.dtype, self._memory.buf, offset)[:] = values
+        except BaseException:
+            self.close()
+            raise
+        self.handle = SharedHandle(self._memory.name, len(data),
+                                   tuple((column, values.dtype.str, offset) for
+                                         column, values, offset in zip(columns, arrays, offsets)))
+        self.store = SharedColumnStore(self.handle, self._memory)
+
+    @property
+    def nbytes(self):
+        """The size of the shared block
+        """
+        return self._memory.size
+
+    @property
+    def closed(self):
+        """Whether the shared block has been released
+        """
+        return not self._finalizer.alive
+
+    def close(self):
+        """Releases the shared block; this may be called more than once
+        """
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return "SharedColumns(name={0}, columns={1}, closed={2})".format(
+            repr(self.handle.name), [column for column, _, _ in self.handle.columns],
+            self.closed)
+
+    def map(self, func, items, workers=None, executor=None):
+        """Calls `func(store, item)` for each item in worker processes
+
+        Each worker attaches to the shared columns once; only the handle and
+        the items are sent to it. If a call fails (or the caller is
+        interrupted) the calls that haven't started are cancelled
+
+        Parameters
+        ----------
+        func : callable
+            a module-level function (so it can be pickled) of the shared
+            `dcapy.columnar.ColumnStore` and an item
+        items : iterable
+            the items
+        workers : int, optional
+            the number of worker processes, defaults to the number of cores
+        executor : concurrent.futures.Executor, optional
+            an executor to use instead of a new process pool
+
+        Returns
+        -------
+        list
+            the result of each call, in order
+        """
+        if self.closed:
+            raise ValueError("the shared columns have been released")
+        call = partial(_call, func, self.handle)
+        if executor is not None:
+            futures = [executor.submit(call, item) for item in items]
+            try:
+                return [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(workers, initializer=attach, initargs=(self.handle,))
+        try:
+            results = list(pool.map(call, items))
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+        pool.shutdown(wait=True)
+        return results
+
+
+class SharedColumnStore(ColumnStore):
+    """SharedColumnStore(handle, memory)
+
+    A `dcapy.columnar.ColumnStore` over shared memory, which pickles to its handle
+
+    Columns assigned after it is created are held (and pickled) as usual
+
+    Parameters
+    ----------
+    handle : SharedHandle
+        the layout of the shared block
+    memory : multiprocessing.shared_memory.SharedMemory
+        the shared block
+    """
+
+    def __init__(self, handle, memory):
+        columns = {}
+        for column, dtype, offset in handle.columns:
+            values = np.ndarray((handle.num_rows,), np.dtype(dtype), memory.buf, offset)
+            values.flags.writeable = False
+            columns[column] = values
+        super().__init__(columns, handle.num_rows)
+        self._shared = dict(columns)
+        self.handle = handle
+        self._memory = memory  #after the arrays, so they are freed first
+
+    def __reduce__(self):
+        assigned = {name : values for name, values in self._columns.items()
+                    if self._shared.get(name) is not values}
+        return _restore, (self.handle, assigned)
+
+    def __repr__(self):
+        return "SharedColumnStore(name={0}, columns={1})".format(
+            repr(self.handle.name), self.columns)
+
+
+def share(data, columns=None):
+    """Places columns of a data set in shared memory, see `SharedColumns`
+
+    Returns
+    -------
+    SharedColumns
+    """
+    return SharedColumns(data, columns)
+
+
+def attach(handle):
+    """Attaches to shared columns, e.g. in a worker process
+
+    The block is opened once per process, and stays open until the process exits
+
+    Parameters
+    ----------
+    handle : SharedHandle
+        the handle of the columns (`SharedColumns.handle`)
+
+    Returns
+    -------
+    SharedColumnStore
+        the columns, read-only
+
+    Raises
+    ------
+    ValueError
+        if the columns have been released
+    """
+    memory = _attached.get(handle.name)
+    if memory is None:
+        try:
+            memory = _open(handle.name)
+        except FileNotFoundError:
+            raise ValueError("the shared columns {0} have been released"
+                             .format(repr(handle.name)))
+        _attached[handle.name] = memory
+    return SharedColumnStore(handle, memory)
+
+
+def _open(name):
+    """Opens an existing block without making this process responsible for it
+    """
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:  # `track` is new in Python 3.13
+        return shared_memory.SharedMemory(name)
+
+
+def _restore(handle, assigned):
+    store = attach(handle)
+    for name, values in assigned.items():
+        store[name] = values
+    return store
+
+
+def _call(func, handle, item):
+    return func(attach(handle), item)
+
+
+def _release(memory):
+    """Unlinks a block, and unmaps it unless arrays over it are still alive
+    (it is then unmapped when they are collected)
+    """
+    _attached.pop(memory.name, None)
+    try:
+        memory.close()
+    except BufferError:
+        pass
+    try:
+        memory.unlink()
+    except FileNotFoundError:
+        pass
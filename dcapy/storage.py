@@ -0,0 +1,231 @@
+import json
+import zipfile
+import numpy as np
+
+#version of the layout written by `save_result`
+FORMAT_VERSION = 1
+
+
+def save_result(path, result, name=None, metadata=None):
+    """Appends a result to a binary results file
+
+    Results files are uncompressed `.npz` archives, so they can also be read with
+    `np.load`. Each analysis is stored under its own name, with every curve
+    (one per predictor and metric) as a separate `.npy` member next to a JSON
+    description of the analysis::
+
+        <name>/meta.json
+        <name>/thresholds.npy
+        <name>/net_benefit_all.npy
+        <name>/net_benefit/<i>.npy
+        <name>/interventions_avoided/<i>.npy
+        <name>/smoothed/<metric>/<i>.npy
+        <name>/metrics/<metric>/<i>.npy
+
+    where `<i>` is the position of the predictor. Values are written in their
+    binary form, so they round-trip exactly
+
+    Parameters
+    ----------
+    path : str
+        the file to write to; created if it doesn't exist, appended to if it does
+    result : dcapy.result.DCAResult
+        the result to save
+    name : str, optional
+        the name to store the analysis under, defaults to 'analysis_<n>'
+    metadata : dict, optional
+        JSON-serializable information about the analysis (e.g. harms, the
+        threshold grid, a fingerprint of the data) to store with the result
+
+    Returns
+    -------
+    str
+        the name the analysis was stored under
+
+    Raises
+    ------
+    ValueError
+        if the file already has an analysis called `name`
+    """
+    with zipfile.ZipFile(path, 'a', zipfile.ZIP_STORED, allowZip64=True) as archive:
+        existing = _analysis_names(archive)
+        if name is None:
+            name = 'analysis_{0}'.format(len(existing))
+            while name in existing:
+                name += '_'
+        if '/' in name or not name:
+            raise ValueError("analysis names must be non-empty and cannot contain '/'")
+        if name in existing:
+            raise ValueError("{name} is already in {path}".format(name=repr(name),
+                                                                  path=repr(path)))
+        meta = {'format_version' : FORMAT_VERSION,
+                'predictors' : result.predictors,
+                'dtype' : str(result.dtype),
+                'smoothed' : sorted(result.smoothed),
+                'metrics' : sorted(result.metrics),
+                'metadata' : dict(result.metadata, **(metadata or {}))}
+        archive.writestr('{0}/meta.json'.format(name), json.dumps(meta))
+        _write_array(archive, '{0}/thresholds'.format(name), result.thresholds)
+        _write_array(archive, '{0}/net_benefit_all'.format(name), result.net_benefit_all)
+        for metric in ['net_benefit', 'interventions_avoided']:
+            values = getattr(result, metric)
+            for i in range(len(result.predictors)):
+                _write_array(archive, '{0}/{1}/{2}'.format(name, metric, i), values[:, i])
+        for group in ['smoothed', 'metrics']:
+            for metric, values in getattr(result, group).items():
+                for i in range(len(result.predictors)):
+                    _write_array(archive, '{0}/{1}/{2}/{3}'.format(name, group, metric, i),
+                                 values[:, i])
+    return name
+
+
+def load_result(path, name=None, predictors=None):
+    """Loads a result from a binary results file
+
+    Only the members needed for the requested predictors are read
+
+    Parameters
+    ----------
+    path : str
+        the file to read from
+    name : str, optional
+        the analysis to load, may be omitted if the file holds only one
+    predictors : list(str), optional
+        the predictors to load, defaults to all of them
+
+    Returns
+    -------
+    dcapy.result.DCAResult
+        the result, with the stored information in its `metadata`
+
+    Raises
+    ------
+    KeyError
+        if the file doesn't have the analysis or one of the predictors
+    """
+    from dcapy.result import DCAResult
+    with zipfile.ZipFile(path, 'r') as archive:
+        if name is None:
+            names = _analysis_names(archive)
+            if len(names) != 1:
+                raise KeyError("{path} holds {n} analyses, specify one of {names}"
+                               .format(path=repr(path), n=len(names), names=names))
+            name = names[0]
+        meta = read_metadata(path, name, archive)
+        stored = meta['predictors']
+        if predictors is None:
+            predictors = stored
+        elif isinstance(predictors, str):
+            predictors = [predictors]
+        try:
+            positions = [stored.index(predictor) for predictor in predictors]
+        except ValueError:
+            raise KeyError("predictors must be in {names}".format(names=stored))
+        thresholds = _read_array(archive, '{0}/thresholds'.format(name))
+
+        def read_metric(prefix):
+            if not positions:
+                return np.empty((len(thresholds), 0), dtype=meta['dtype'])
+            return np.column_stack([_read_array(archive, '{0}/{1}'.format(prefix, i))
+                                    for i in positions])
+
+        result = DCAResult(thresholds, predictors,
+                           read_metric('{0}/net_benefit'.format(name)),
+                           read_metric('{0}/interventions_avoided'.format(name)),
+                           _read_array(archive, '{0}/net_benefit_all'.format(name)),
+                           dtype=meta['dtype'])
+        for metric in meta['smoothed']:
+            result.smoothed[metric] = read_metric('{0}/smoothed/{1}'.format(name, metric))
+        #files written before the metrics were stored have none
+        for metric in meta.get('metrics', []):
+            result.metrics[metric] = read_metric('{0}/metrics/{1}'.format(name, metric))
+    result.metadata.update(meta['metadata'])
+    return result
+
+
+def list_results(path):
+    """Lists the analyses in a results file
+
+    Parameters
+    ----------
+    path : str
+        the results file
+
+    Returns
+    -------
+    list(str)
+        the name of each analysis, in the order they were saved
+    """
+    with zipfile.ZipFile(path, 'r') as archive:
+        return _analysis_names(archive)
+
+
+def read_metadata(path, name, archive=None):
+    """Reads the stored description of an analysis without loading any results
+
+    Parameters
+    ----------
+    path : str
+        the results file
+    name : str
+        the analysis
+    archive : zipfile.ZipFile, optional
+        the already open results file
+
+    Returns
+    -------
+    dict
+        'predictors', 'dtype', 'smoothed', 'metrics', and the analysis' 'metadata'
+    """
+    if archive is None:
+        with zipfile.ZipFile(path, 'r') as archive:
+            return read_metadata(path, name, archive)
+    try:
+        return json.loads(archive.read('{0}/meta.json'.format(name)).decode('utf-8'))
+    except KeyError:
+        raise KeyError("{name} is not in {path}".format(name=repr(name), path=repr(path)))
+
+
+def data_fingerprint(data, columns):
+    """Computes a fingerprint of the columns of a data set used in an analysis
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        the data set
+    columns : list(str)
+        the columns to include, in order
+
+    Returns
+    -------
+    str
+        a hex digest identifying the values of the columns
+    """
+    import hashlib
+    from dcapy.logistic import column_fingerprint
+    digest = hashlib.blake2b(digest_size=16)
+    for column in columns:
+        digest.update(str(column).encode())
+        digest.update(column_fingerprint(np.asarray(data[column])).encode())
+    return digest.hexdigest()
+
+
+def _analysis_names(archive):
+    """The names of the analyses in an open results file
+    """
+    return [member[:-len('/meta.json')] for member in archive.namelist()
+            if member.endswith('/meta.json') and member.count('/') == 1]
+
+
+def _write_array(archive, member, values):
+    """Writes an array to the archive as `<member>.npy`
+    """
+    with archive.open(member + '.npy', 'w', force_zip64=True) as f:
+        np.lib.format.write_array(f, np.ascontiguousarray(values), allow_pickle=False)
+
+
+def _read_array(archive, member):
+    """Reads the array `<member>.npy` from the archive
+    """
+    with archive.open(member + '.npy', 'r') as f:
+        return np.lib.format.read_array(f, allow_pickle=False)
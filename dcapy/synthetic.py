@@ -0,0 +1,255 @@
+import math
+import numpy as np
+import dcapy.core as core
+from dcapy.logistic import expit
+
+
+class SyntheticCohort:
+    """SyntheticCohort(predictors, risk_shape=(2, 5), survival=False, time_point=1.,
+                       censoring_rate=0., seed=None)
+
+    A model of a cohort whose decision curves are known in closed form
+
+    Each patient's true risk of the outcome, `r`, is drawn from a
+    Beta(a, b) distribution with integer shape parameters. A predictor reports
+    `expit(intercept + slope*logit(r))`, so it is calibrated with the defaults
+    (`intercept=0`, `slope=1`) and miscalibrated otherwise, and may be rounded
+    to `decimals` places to create ties. The outcome happens with probability
+    `r`; for survival cohorts it happens by `time_point` with probability `r`
+    (exponential event times), and observations may be censored at independent
+    exponential times
+
+    Cohorts of any size can be drawn in chunks with `chunks`, so they never
+    have to be held in memory, and `expected_curves` gives the decision curves
+    they converge to
+
+    Parameters
+    ----------
+    predictors : dict(str, dict)
+        the predictors, keyed by column name, each with optional 'intercept',
+        'slope' (> 0) and 'decimals'
+    risk_shape : tuple(int, int)
+        the shape parameters of the distribution of risk, positive integers
+    survival : bool
+        whether to draw times to the outcome, with censoring
+    time_point : float
+        the time point the risk is the risk by, for survival cohorts
+    censoring_rate : float
+        the rate of the exponential censoring times (0 for no censoring)
+    seed : int, optional
+        seed for the random number generator
+
+    Raises
+    ------
+    ValueError
+        if the shape parameters aren't positive integers, or a slope isn't positive
+    """
+
+    def __init__(self, predictors, risk_shape=(2, 5), survival=False, time_point=1.,
+                 censoring_rate=0., seed=None):
+        if any(int(shape) != shape or shape < 1 for shape in risk_shape):
+            raise ValueError("the shape parameters of the risk must be positive integers")
+        self.risk_shape = tuple(int(shape) for shape in risk_shape)
+        self.predictors = {}
+        for name, spec in predictors.items():
+            spec = dict({'intercept' : 0., 'slope' : 1., 'decimals' : None}, **spec)
+            if spec['slope'] <= 0:
+                raise ValueError("the slope of {name} must be positive"
+                                 .format(name=repr(name)))
+            self.predictors[name] = spec
+        self.survival = survival
+        self.time_point = time_point
+        self.censoring_rate = censoring_rate
+        self.seed = seed
+
+    @property
+    def event_rate(self):
+        """The expected rate of the outcome (by `time_point`, for survival cohorts)
+        """
+        a, b = self.risk_shape
+        return a/(a + b)
+
+    def chunks(self, num_rows, chunk_size=1000000):
+        """Draws the cohort in chunks
+
+        Parameters
+        ----------
+        num_rows : int
+            the size of the cohort
+        chunk_size : int
+            the largest number of rows to draw at once
+
+        Yields
+        ------
+        dict(str, np.ndarray)
+            the columns of the next chunk of rows: 'outcome', 'time' (survival
+            cohorts only) and each predictor
+        """
+        rng = np.random.default_rng(self.seed)
+        for start in range(0, num_rows, chunk_size):
+            yield self._draw(rng, min(chunk_size, num_rows - start))
+
+    def sample(self, num_rows):
+        """Draws a cohort that fits in memory
+
+        Parameters
+        ----------
+        num_rows : int
+            the size of the cohort
+
+        Returns
+        -------
+        dcapy.columnar.ColumnStore
+            the cohort, which can be analyzed like a DataFrame
+        """
+        from dcapy.columnar import ColumnStore
+        return ColumnStore(next(self.chunks(num_rows, max(num_rows, 1))))
+
+    def expected_net_benefit(self, thresholds, harms=None):
+        """The net benefit each predictor converges to as the cohort grows
+
+        Parameters
+        ----------
+        thresholds : np.ndarray
+            the threshold probabilities, length T
+        harms : list(float), optional
+            the harm associated with each predictor, defaults to 0
+
+        Returns
+        -------
+        np.ndarray
+            the expected net benefit, shape (T, p)
+        """
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        harms = core._harms_array(harms, len(self.predictors))
+        a, b = self.risk_shape
+        odds = (thresholds/(1 - thresholds))[:, np.newaxis]
+        cutoffs = np.column_stack([self._risk_cutoffs(spec, thresholds)
+                                   for spec in self.predictors.values()])
+        #P(positive), and P(positive and the outcome) = E[r; r >= cutoff]
+        positives = 1 - _beta_cdf(cutoffs, a, b)
+        true_positives = self.event_rate*(1 - _beta_cdf(cutoffs, a + 1, b))
+        return true_positives - (positives - true_positives)*odds - harms
+
+    def expected_curves(self, thresholds, harms=None, intervention_per=100):
+        """The decision curves the cohort converges to, as returned by
+        `dcapy.core.decision_curves`
+
+        Returns
+        -------
+        tuple(np.ndarray, np.ndarray, np.ndarray)
+            expected net benefit (T, p), interventions avoided (T, p), and net
+            benefit of treating all (T,)
+        """
+        net_benefit = self.expected_net_benefit(thresholds, harms)
+        net_benefit_all = core.net_benefit_all(self.event_rate, thresholds)
+        return net_benefit, core.interventions_avoided(
+            net_benefit, net_benefit_all, thresholds, intervention_per), net_benefit_all
+
+    def _draw(self, rng, num_rows):
+        """Draws `num_rows` rows
+        """
+        risk = rng.beta(*self.risk_shape, size=num_rows)
+        columns = {}
+        if self.survival:
+            #exponential event times, with P(time <= time_point) = risk
+            with np.errstate(divide='ignore'):
+                time = rng.standard_exponential(num_rows)*self.time_point/-np.log1p(-risk)
+            outcome = np.ones(num_rows, dtype=np.int8)
+            if self.censoring_rate > 0:
+                censored_at = rng.standard_exponential(num_rows)/self.censoring_rate
+                outcome[censored_at < time] = 0
+                time = np.minimum(time, censored_at)
+            columns['outcome'], columns['time'] = outcome, time
+        else:
+            columns['outcome'] = (rng.random(num_rows) < risk).astype(np.int8)
+        for name, spec in self.predictors.items():
+            columns[name] = self._predict(spec, risk)
+        return columns
+
+    @staticmethod
+    def _predict(spec, risk):
+        """The predictor's value for each risk
+        """
+        if spec['intercept'] == 0 and spec['slope'] == 1:
+            values = risk
+        else:
+            with np.errstate(divide='ignore'):
+                values = expit(spec['intercept'] + spec['slope']*np.log(risk/(1 - risk)))
+        if spec['decimals'] is not None:
+            values = np.round(values, spec['decimals'])
+        return values
+
+    @staticmethod
+    def _risk_cutoffs(spec, thresholds):
+        """The risk above which the predictor is positive at each threshold
+        """
+        cutoffs = thresholds
+        if spec['decimals'] is not None:
+            #rounded values are positive if the first level >= threshold is;
+            #the levels are computed as `np.round` computes them
+            scale = 10.**spec['decimals']
+            levels = np.arange(0, scale + 1)/scale
+            first = np.searchsorted(levels, thresholds, side='left')
+            cutoffs = np.clip((first - 0.5)/scale, 0, 1)
+        if spec['intercept'] != 0 or spec['slope'] != 1:
+            with np.errstate(divide='ignore'):
+                cutoffs = expit((np.log(cutoffs/(1 - cutoffs)) - spec['intercept'])
+                                / spec['slope'])
+        return cutoffs
+
+
+def streamed_decision_curves(cohort, num_rows, thresholds, harms=None,
+                             intervention_per=100, chunk_size=1000000):
+    """The decision curves of a synthetic cohort, counted chunk by chunk so the
+    cohort is never held in memory
+
+    Parameters
+    ----------
+    cohort : SyntheticCohort
+        a cohort with a binary outcome
+    num_rows : int
+        the size of the cohort
+    thresholds : np.ndarray
+        the threshold probabilities, length T
+    harms : list(float), optional
+        the harm associated with each predictor, defaults to 0
+    intervention_per : int
+        interventions per `intervention_per` patients
+    chunk_size : int
+        the largest number of rows to draw at once
+
+    Returns
+    -------
+    tuple(np.ndarray, np.ndarray, np.ndarray)
+        net benefit (T, p), interventions avoided (T, p), and net benefit of
+        treating all (T,), as returned by `dcapy.core.decision_curves`
+    """
+    if cohort.survival:
+        raise ValueError("only cohorts with a binary outcome can be streamed")
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    true_positives = false_positives = 0
+    num_events = 0
+    for chunk in cohort.chunks(num_rows, chunk_size):
+        tp, fp = core.count_positives(chunk['outcome'],
+                                      [chunk[name] for name in cohort.predictors],
+                                      thresholds)
+        true_positives = true_positives + tp
+        false_positives = false_positives + fp
+        num_events += np.count_nonzero(chunk['outcome'])
+    net_benefit = core.net_benefit_from_counts(true_positives, false_positives,
+                                               num_rows, thresholds, harms)
+    net_benefit_all = core.net_benefit_all(num_events/num_rows, thresholds)
+    return net_benefit, core.interventions_avoided(
+        net_benefit, net_benefit_all, thresholds, intervention_per), net_benefit_all
+
+
+def _beta_cdf(x, a, b):
+    """The Beta(a, b) distribution function for integer `a`, `b`, as a binomial tail
+    """
+    x = np.clip(np.asarray(x, dtype=np.float64), 0, 1)
+    m = a + b - 1
+    cdf = np.zeros_like(x)
+    for j in range(a, m + 1):
+        cdf += math.comb(m, j) * x**j * (1 - x)**(m - j)
+    return cdf
@@ -1,27 +1,43 @@
 import operator as opr
+import numpy as np
 import pandas as pd
-import statsmodels.api as sm
 
-def data_validate(data):
+def data_validate(data, columns=None):
     """Validates the input data by dropping any incomplete cases
 
+    Notes
+    -----
+    Columnar data (a `ColumnStore`, or a path to a directory of `.npy` columns
+    or a `.npz` file) is memory-mapped rather than loaded, and only `columns`
+    are checked for incomplete cases
+
     Parameters
     ----------
-    data : pd.DataFrame
-        the data set under analysis
+    data : pd.DataFrame, dcapy.columnar.ColumnStore or str
+        the data set under analysis, or the path to columnar data
+    columns : list(str), optional
+        the columns used in the analysis (for columnar data); defaults to all columns
 
     Returns
     -------
-    pd.DataFrame
+    pd.DataFrame or dcapy.columnar.ColumnStore
         the passed in data where any rows with a NaN value are dropped
 
     Raises
     ------
     TypeError
-        if `data` is not a pandas DataFrame
+        if `data` is not a pandas DataFrame, a ColumnStore or a path
     """
+    from dcapy.columnar import ColumnStore
+    if isinstance(data, str):
+        data = ColumnStore.open(data)
+    if isinstance(data, ColumnStore):
+        if columns is not None:
+            columns = [column for column in columns if column in data]
+        return data.dropna(columns)
     if not isinstance(data, pd.DataFrame):
-        raise TypeError("data must be a pandas DataFrame")
+        raise TypeError("data must be a pandas DataFrame, a ColumnStore or a path "
+                        "to columnar data")
     return data.dropna(axis=0)
 
 
@@ -33,13 +49,13 @@ def outcome_validate(data, outcome):
     ----------
     data : pd.DataFrame
         the data set under analysis
-    outcome : str
-        the column of the data set to use as the outcome
+    outcome : str or list(str)
+        the column of the data set to use as the outcome, or several columns
 
     Returns
     -------
-    str
-        the outcome string passed in
+    str or list(str)
+        the outcome string passed in (as a list, if several were given)
 
     Raises
     ------
@@ -48,8 +64,13 @@ def outcome_validate(data, outcome):
     DCAError
         if a the specified `outcome` is not in `data`
     """
+    if isinstance(outcome, (list, tuple)):
+        if not outcome:
+            raise DCAError("must specify at least one outcome")
+        return [outcome_validate(data, column) for column in outcome]
     try:
-        if (max(data[outcome]) > 1) or (min(data[outcome]) < 0):
+        values = np.asarray(data[outcome])
+        if (values.max() > 1) or (values.min() < 0):
             raise ValueError("all outcome values must be in range 0-1")
     except KeyError:
         raise DCAError("outcome must be a column in the dataframe")
@@ -57,6 +78,40 @@ def outcome_validate(data, outcome):
     return outcome
 
 
+def weights_validate(data, weights):
+    """Validates that the weights column has a finite, non-negative weight
+    for each observation
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        the data set under analysis
+    weights : str or None
+        the column of frequency (or survey/sampling) weights, if any
+
+    Returns
+    -------
+    str or None
+        the weights column passed in
+
+    Raises
+    ------
+    ValueError
+        if a weight is negative or not finite
+    DCAError
+        if the specified `weights` is not in `data`
+    """
+    if weights is None:
+        return None
+    try:
+        values = np.asarray(data[weights], dtype=float)
+    except KeyError:
+        raise DCAError("weights must be a column in the dataframe")
+    if not np.all(np.isfinite(values)) or np.any(values < 0):
+        raise ValueError("all weights must be finite and non-negative")
+    return weights
+
+
 def predictors_validate(predictors, data=None):
     """Validates the predictors and ensures that they are type list(str)
 
@@ -328,13 +383,16 @@ def dca_input_validation(data, outcome, predictors,
     return data, predictors, probability, harm  # return any mutated objects
 
 
-def validate_data_predictors(data, outcome, predictors, probabilities, survival_time=False):
+def validate_data_predictors(data, outcome, predictors, probabilities, survival_time=False,
+                             return_coefficients=False, weights=None):
     """Validates that for each predictor column, all values are within the range 0-1
 
     Notes
     -----
     If a predictor has probability `True`, checks that the column `data[predictor]` has all values in the appropriate range.
-    If a predictor has probability `False`, converts all values in that column with logistic regression
+    If a predictor has probability `False`, converts all values in that column with logistic regression.
+    All of the predictors to convert are fit in a single batch, and fitted coefficients are
+    cached so converting the same columns again skips the fit
 
     Parameters
     ----------
@@ -348,11 +406,23 @@ def validate_data_predictors(data, outcome, predictors, probabilities, survival_
         list marking whether a predictor is a probability
     survival_time : bool
         if the analysis is a survival time analysis
+    return_coefficients : bool
+        if `True`, also return the logistic regression coefficients of each converted predictor
+    weights : str, optional
+        the column of observation weights to fit the logistic regressions with
+
+    Returns
+    -------
+    pd.DataFrame or tuple(pd.DataFrame, dict(str, np.ndarray))
+        the data, with converted predictor columns, and (if `return_coefficients=True`)
+        the `[intercept, slope]` coefficients for each converted predictor
     """
+    to_convert = []
     for i in range(0, len(predictors)):
         if probabilities[i]:
             #validate that any predictors with probability TRUE are b/t 0 and 1
-            if (max(data[predictors[i]]) > 1) or (min(data[predictors[i]]) < 0):
+            values = np.asarray(data[predictors[i]])
+            if (values.max() > 1) or (values.min() < 0):
                 raise ValueError("{val} must be between 0 and 1"
                                  .format(val=repr(predictors[i])))
         else:
@@ -360,10 +430,135 @@ def validate_data_predictors(data, outcome, predictors, probabilities, survival_
                 from statsmodels.sandbox.cox import CoxPH
                 #TODO
             else:
-                from statsmodels.api import Logit 
-                #predictor is not a probability, convert with logistic regression
-                model = Logit(data[outcome], data[predictors[i]])
-                data[predictors[i]] = model.fit().y_pred
+                to_convert.append(predictors[i])
+
+    coefficients = {}
+    if to_convert and not isinstance(outcome, str):
+        raise ValueError("predictors can only be converted to probabilities "
+                         "for a single outcome")
+    if to_convert:
+        from dcapy.logistic import convert_to_probabilities
+        #predictors are not probabilities, convert with logistic regression
+        converted, coefficients = convert_to_probabilities(
+            np.asarray(data[outcome]), {predictor: np.asarray(data[predictor])
+                                        for predictor in to_convert},
+            weights=None if weights is None else np.asarray(data[weights]))
+        for predictor in to_convert:
+            data[predictor] = converted[predictor]
+
+    if return_coefficients:
+        return data, coefficients
+    return data
+
+
+def composites_validate(composites, data=None, outcome=None):
+    """Validates composite (multivariable) predictor declarations
+
+    A composite predictor is declared by name, either as a list of columns or as
+    an additive formula of columns (e.g. `'marker + age + famhistory'`, optionally
+    with the outcome on the left hand side, `'cancer ~ marker + age'`)
+
+    Parameters
+    ----------
+    composites : dict(str, list(str) or str) or None
+        the composite predictors, keyed by the name to give each one
+    data : pd.DataFrame or None, optional
+        the data set the columns must be in
+    outcome : str or None, optional
+        the outcome of the analysis
+
+    Returns
+    -------
+    dict(str, list(str))
+        the columns of each composite predictor
+
+    Raises
+    ------
+    ValueError
+        if a composite is named 'all', 'none' or after a column in the data set
+        if a formula isn't an additive formula of columns in the data set
+
+    Examples
+    --------
+    >>> composites_validate({'joint' : 'marker + age'})
+    {'joint': ['marker', 'age']}
+    >>> composites_validate({'joint' : 'cancer ~ marker + age'}, outcome='cancer')
+    {'joint': ['marker', 'age']}
+    >>> composites_validate({'joint' : 'marker * age'})
+    Traceback (most recent call last):
+      ...
+    ValueError: composite formulas can only add columns, e.g. 'a + b'
+    """
+    if composites is None:
+        return {}
+
+    validated = {}
+    for name, columns in composites.items():
+        if name in ['all', 'none']:
+            raise ValueError("predictor cannot be named 'all' or 'none'")
+        if isinstance(columns, str):
+            formula = columns
+            if '~' in formula:
+                lhs, formula = formula.split('~', 1)
+                if outcome is not None and lhs.strip() != outcome:
+                    raise ValueError("the left hand side of {name} must be the outcome"
+                                     .format(name=repr(name)))
+            columns = [term.strip() for term in formula.split('+')]
+            for term in columns:
+                if not term or any(op in term for op in '*:-/()~'):
+                    raise ValueError("composite formulas can only add columns, e.g. 'a + b'")
+        columns = list(columns)
+        if len(columns) == 0:
+            raise ValueError("{name} must have at least one column".format(name=repr(name)))
+        if data is not None:
+            if name in data.columns:
+                raise ValueError("{name} is already a column in the dataframe"
+                                 .format(name=repr(name)))
+            for column in columns:
+                if column not in data.columns:
+                    raise ValueError("composite predictor columns must be in the dataframe")
+        validated[name] = columns
+
+    return validated
+
+
+def materialize_composites(data, outcome, composites, return_coefficients=False,
+                           weights=None):
+    """Fits each composite predictor and adds its predicted probabilities to a
+    shallow copy of the data set as a new column
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        the data set
+    outcome : str
+        the column to use as 'outcome'
+    composites : dict(str, list(str))
+        validated composite predictors (see `composites_validate`)
+    return_coefficients : bool
+        if `True`, also return the logistic regression coefficients of each composite
+    weights : str, optional
+        the column of observation weights to fit the composites with
+
+    Returns
+    -------
+    pd.DataFrame or tuple(pd.DataFrame, dict(str, np.ndarray))
+        a copy of the data, with a column for each composite, and (if `return_coefficients=True`)
+        the `[intercept, b1, ..., bk]` coefficients for each composite
+    """
+    coefficients = {}
+    if composites:
+        from dcapy.logistic import convert_composite
+        y = np.asarray(data[outcome])
+        w = None if weights is None else np.asarray(data[weights])
+        #leave the caller's data as it was, so the same call can be made again
+        data = data.copy(deep=False) if hasattr(data, 'iloc') else data.copy()
+        for name, columns in composites.items():
+            data[name], coefficients[name] = convert_composite(
+                y, [np.asarray(data[column]) for column in columns], weights=w)
+
+    if return_coefficients:
+        return data, coefficients
     return data
 
 
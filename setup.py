@@ -29,7 +29,7 @@ setup(name='dcapy',
       author_email='matt.black7@gmail.com',
       url='http://matt-black.github.io',
 
-      packages=find_packages(exclude=['test']),
+      packages=find_packages(exclude=['test', 'benchmark']),
 
       keywords='statistics analysis',
       classifiers=[
@@ -0,0 +1,168 @@
+"""
+Decision Curve Analysis
+
+Tests for running analyses from asyncio code
+
+Author: Matthew Black
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from dcapy import DecisionCurveAnalysis
+import numpy as np
+from dcapy.aio import AnalysisRunner, request_key
+from test import load_default_data
+
+
+class SlowExecutor(ThreadPoolExecutor):
+    """Counts the analyses it runs, and makes each take `delay` seconds
+    """
+
+    def __init__(self, delay=0., max_workers=4):
+        super().__init__(max_workers=max_workers)
+        self.delay = delay
+        self.analyses = 0
+        self.running = 0
+        self.most_running = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        def slow():
+            with self._lock:
+                self.analyses += 1
+                self.running += 1
+                self.most_running = max(self.most_running, self.running)
+            try:
+                time.sleep(self.delay)
+                return fn()
+            finally:
+                with self._lock:
+                    self.running -= 1
+        return super().submit(slow)
+
+
+class AnalysisRunnerTest(unittest.TestCase):
+
+    data = load_default_data()
+
+    def analysis(self, predictors='famhistory', **kwargs):
+        return DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                     predictors=predictors, **kwargs)
+
+    def test_arun(self):
+        expected = self.analysis()
+        expected.run()
+        analysis = self.analysis()
+        asyncio.run(analysis.arun(runner=AnalysisRunner()))
+        self.assertTrue(expected.results['net benefit'].equals(
+            analysis.results['net benefit']))
+        net_benefit, _ = asyncio.run(self.analysis().arun(return_results=True))
+        self.assertTrue(net_benefit.equals(expected.results['net benefit']))
+
+    def test_coalescing(self):
+        executor = SlowExecutor(0.1)
+        runner = AnalysisRunner(executor)
+
+        async def main():
+            return await asyncio.gather(runner.run(self.analysis()),
+                                        runner.run(self.analysis()),
+                                        runner.run(self.analysis('cancerpredmarker')))
+        first, second, other = asyncio.run(main())
+        self.assertEqual(executor.analyses, 2)
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(runner.in_flight, 0)
+        #a request after the first finished is computed again
+        asyncio.run(runner.run(self.analysis()))
+        self.assertEqual(executor.analyses, 3)
+
+    def test_different_arguments(self):
+        executor = SlowExecutor(0.05)
+        runner = AnalysisRunner(executor)
+
+        async def main():
+            return await asyncio.gather(runner.run(self.analysis()),
+                                        runner.run(self.analysis(), dtype='float32'))
+        asyncio.run(main())
+        self.assertEqual(executor.analyses, 2)
+
+    def test_different_composites(self):
+        """Composites of the same name fit to different columns aren't shared
+        """
+        runner = AnalysisRunner(SlowExecutor(0.05))
+        analyses = [self.analysis([], composites={'joint' : columns})
+                    for columns in ['marker + age', 'marker + famhistory']]
+        first, second = asyncio.run(runner.run_many(analyses))
+        self.assertIsNot(first, second)
+        self.assertFalse((first.net_benefit == second.net_benefit).all())
+
+    def test_request_key(self):
+        """The key doesn't validate the analysis, and large arrays that print
+        alike are told apart
+        """
+        harms = [np.zeros(2000) for _ in range(2)]
+        harms[1][1000] = 0.01
+        self.assertEqual(repr(harms[0]), repr(harms[1]))
+        analyses = [self.analysis(harms=values) for values in harms]
+        keys = [request_key(analysis, {}) for analysis in analyses]
+        self.assertNotEqual(keys[0], keys[1])
+        self.assertEqual(analyses[0].dirty_stages[0], 'validation')
+        self.assertEqual(keys[0], request_key(self.analysis(harms=harms[0].copy()), {}))
+
+    def test_max_concurrency(self):
+        executor = SlowExecutor(0.05)
+        runner = AnalysisRunner(executor, max_concurrency=2)
+        steps = [0.01, 0.02, 0.05, 0.1]
+        results = asyncio.run(runner.run_many(
+            [self.analysis(thresh_step=step) for step in steps]))
+        self.assertEqual(len(results), 4)
+        self.assertEqual(executor.analyses, 4)
+        self.assertLessEqual(executor.most_running, 2)
+
+    def test_timeout(self):
+        executor = SlowExecutor(0.5, max_workers=1)
+        runner = AnalysisRunner(executor, max_concurrency=1)
+
+        async def main():
+            slow = runner.run(self.analysis(), timeout=0.01)
+            queued = runner.run(self.analysis('cancerpredmarker'), timeout=0.01)
+            return await asyncio.gather(slow, queued, return_exceptions=True)
+        outcomes = asyncio.run(main())
+        self.assertTrue(all(isinstance(outcome, asyncio.TimeoutError)
+                            for outcome in outcomes))
+        executor.shutdown(wait=True)
+        #the queued analysis never started
+        self.assertEqual(executor.analyses, 1)
+        self.assertEqual(runner.in_flight, 0)
+
+    def test_cancellation(self):
+        executor = SlowExecutor(0.2)
+        runner = AnalysisRunner(executor)
+
+        async def main():
+            cancelled = asyncio.ensure_future(runner.run(self.analysis()))
+            waiting = asyncio.ensure_future(runner.run(self.analysis()))
+            await asyncio.sleep(0.05)
+            cancelled.cancel()
+            #the other request for the same analysis still gets its result
+            result = await waiting
+            with self.assertRaises(asyncio.CancelledError):
+                await cancelled
+            return result
+        self.assertIsNotNone(asyncio.run(main()))
+        self.assertEqual(executor.analyses, 1)
+
+    def test_errors(self):
+        runner = AnalysisRunner()
+        with self.assertRaises(ValueError):
+            asyncio.run(runner.run(self.analysis(), engine='unknown'))
+        outcomes = asyncio.run(runner.run_many([self.analysis()], engine='unknown',
+                                               return_exceptions=True))
+        self.assertIsInstance(outcomes[0], ValueError)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Decision Curve Analysis
+
+Tests for the batch runner and its command line
+
+Author: Matthew Black
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from dcapy import DecisionCurveAnalysis
+from dcapy.__main__ import main
+from dcapy.batch import load_jobs, make_job, run_jobs
+from dcapy.columnar import ColumnStore, save_columns
+from dcapy.storage import list_results, load_result
+from test import load_default_data, resources_dir
+
+
+class BatchTest(unittest.TestCase):
+
+    data = load_default_data()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.csv = os.path.join(resources_dir, 'dca.csv')
+        self.output = os.path.join(self.tmp_dir, 'results.npz')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def expected(self, algorithm='dca', data=None, **kwargs):
+        analysis = DecisionCurveAnalysis(algorithm, data=self.data if data is None else data,
+                                         **kwargs)
+        analysis.run()
+        return analysis.result
+
+    def jobs(self):
+        return [{'name' : 'family', 'data' : self.csv, 'outcome' : 'cancer',
+                 'predictors' : ['famhistory', 'cancerpredmarker']},
+                {'name' : 'family_harms', 'data' : self.csv, 'outcome' : 'cancer',
+                 'predictors' : ['famhistory', 'cancerpredmarker'],
+                 'harms' : [0.01, 0.02], 'thresh_step' : 0.05, 'intervention_per' : 10},
+                {'name' : 'marker', 'data' : self.csv, 'outcome' : 'cancer',
+                 'predictors' : 'marker', 'probabilities' : [False]},
+                {'name' : 'survival', 'algorithm' : 'stdca', 'data' : self.csv,
+                 'outcome' : 'cancer', 'tt_outcome' : 'ttcancer', 'time_point' : 1.5,
+                 'predictors' : 'cancerpredmarker'}]
+
+    def check(self, records):
+        self.assertEqual([record['status'] for record in records], ['ok']*4)
+        self.assertEqual([record['load_shared'] for record in records], [4]*4)
+        self.assertEqual([record['count_shared'] for record in records], [2, 2, 1, 1])
+        self.assertEqual(sorted(list_results(self.output)),
+                         ['family', 'family_harms', 'marker', 'survival'])
+        expected = [self.expected(outcome='cancer', predictors=['famhistory', 'cancerpredmarker']),
+                    self.expected(outcome='cancer', predictors=['famhistory', 'cancerpredmarker'],
+                                  harms=[0.01, 0.02], thresh_step=0.05, intervention_per=10),
+                    self.expected(outcome='cancer', predictors='marker',
+                                  probabilities=[False]),
+                    self.expected('stdca', outcome='cancer', tt_outcome='ttcancer',
+                                  time_point=1.5, predictors='cancerpredmarker')]
+        for record, result in zip(records, expected):
+            loaded = load_result(self.output, record['job'])
+            np.testing.assert_allclose(loaded.thresholds, result.thresholds)
+            np.testing.assert_allclose(loaded.net_benefit, result.net_benefit, atol=1e-12)
+            np.testing.assert_allclose(loaded.interventions_avoided,
+                                       result.interventions_avoided, atol=1e-10)
+
+    def test_run_jobs(self):
+        jobs = [make_job(job, i) for i, job in enumerate(self.jobs())]
+        self.check(run_jobs(jobs, self.output))
+
+    def test_workers(self):
+        jobs = [make_job(job, i) for i, job in enumerate(self.jobs())]
+        self.check(run_jobs(jobs, self.output, workers=2))
+
+    def test_columnar_missing_values(self):
+        columns = {'cancer' : np.asarray(self.data['cancer']),
+                   'famhistory' : np.asarray(self.data['famhistory'], dtype=float),
+                   'partial' : np.asarray(self.data['cancerpredmarker']).copy()}
+        columns['partial'][::5] = np.nan
+        path = os.path.join(self.tmp_dir, 'cohort.npz')
+        save_columns(path, ColumnStore(columns))
+        records = run_jobs([make_job({'name' : 'complete', 'data' : path,
+                                      'outcome' : 'cancer', 'predictors' : 'famhistory'}),
+                            make_job({'name' : 'partial', 'data' : path,
+                                      'outcome' : 'cancer', 'predictors' : 'partial'})],
+                           self.output)
+        self.assertEqual([record['rows'] for record in records], [750, 600])
+        np.testing.assert_array_equal(
+            load_result(self.output, 'partial').net_benefit,
+            self.expected(data=path, outcome='cancer', predictors='partial').net_benefit)
+
+    def test_failures(self):
+        records = run_jobs([make_job({'name' : 'missing', 'data' : 'missing.csv',
+                                      'outcome' : 'cancer', 'predictors' : 'famhistory'}),
+                            make_job({'name' : 'range', 'data' : self.csv,
+                                      'outcome' : 'cancer', 'predictors' : 'marker'}),
+                            make_job({'name' : 'grid', 'data' : self.csv,
+                                      'outcome' : 'cancer',
+                                      'predictors' : 'cancerpredmarker',
+                                      'thresh_step' : 0}),
+                            make_job({'name' : 'ok', 'data' : self.csv,
+                                      'outcome' : 'cancer', 'predictors' : 'famhistory'})],
+                           self.output)
+        self.assertEqual([record['status'] for record in records],
+                         ['error', 'error', 'error', 'ok'])
+        self.assertIn('must be between 0 and 1', records[1]['error'])
+        self.assertIn("job 'grid' has an invalid thresh_step: 0", records[2]['error'])
+        with self.assertRaises(ValueError):
+            make_job({'data' : self.csv, 'outcome' : 'cancer', 'predictors' : 'x',
+                      'unknown' : 1})
+        with self.assertRaises(ValueError):
+            make_job({'algorithm' : 'stdca', 'data' : self.csv, 'outcome' : 'cancer',
+                      'predictors' : 'x', 'tt_outcome' : 'ttcancer', 'time_point' : 1.5,
+                      'cmp_risk' : True})
+        with self.assertRaises(ValueError):
+            run_jobs([make_job({'data' : self.csv, 'outcome' : 'cancer',
+                                'predictors' : 'famhistory'})])
+
+    def test_command_line(self):
+        jobs_path = os.path.join(self.tmp_dir, 'jobs.json')
+        with open(jobs_path, 'w') as f:
+            json.dump({'output' : 'results.npz',
+                       'defaults' : {'data' : self.csv, 'outcome' : 'cancer'},
+                       'jobs' : [{'predictors' : 'famhistory'},
+                                 {'predictors' : 'famhistory', 'harms' : [0.1]}]}, f)
+        spec = load_jobs(jobs_path)
+        self.assertEqual([job['name'] for job in spec['jobs']], ['job_0', 'job_1'])
+        report = os.path.join(self.tmp_dir, 'report.json')
+        self.assertEqual(main(['batch', jobs_path, '--report', report, '--quiet']), 0)
+        self.assertEqual(sorted(list_results(self.output)), ['job_0', 'job_1'])
+        with open(report) as f:
+            self.assertEqual([record['count_shared'] for record in json.load(f)], [2, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
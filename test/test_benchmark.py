@@ -0,0 +1,44 @@
+"""
+Decision Curve Analysis
+
+Tests for the benchmark suite and its regression comparison
+
+Author: Matthew Black
+"""
+
+import unittest
+from benchmark import compare, suite
+
+
+class BenchmarkSuiteTest(unittest.TestCase):
+
+    def test_run(self):
+        sweeps = {'dca' : {'base' : (200, 1, 99), 'p' : [1, 3]},
+                  'stdca' : {'base' : (200, 1, 11)}}
+        results = suite.run(sweeps, repeat=1)
+        points = [(r['case'], r['n'], r['p'], r['T']) for r in results['records']]
+        self.assertEqual(points, [('dca', 200, 1, 99), ('dca', 200, 3, 99),
+                                  ('stdca', 200, 1, 11)])
+        for record in results['records']:
+            self.assertGreater(record['best'], 0)
+            self.assertGreater(record['peak_bytes'], 0)
+        self.assertIn('numpy', results['environment'])
+
+    def test_compare(self):
+        def record(case, best, peak_bytes):
+            return {'case' : case, 'n' : 10, 'p' : 1, 'T' : 99, 'best' : best,
+                    'peak_bytes' : peak_bytes}
+        baseline = {'records' : [record('dca', 1.0, 100), record('run', 1.0, 100),
+                                 record('smooth', 1.0, None)]}
+        candidate = {'records' : [record('dca', 1.05, 100), record('run', 2.0, 200),
+                                  record('smooth', 0.5, None),
+                                  record('stdca', 1.0, 100)]}
+        comparisons = compare.compare(baseline, candidate, time_tolerance=0.10)
+        self.assertEqual([c['regressions'] for c in comparisons],
+                         [[], ['time', 'memory'], []])
+        self.assertIsNone(comparisons[2]['memory_ratio'])
+        self.assertIn('time, memory', compare.format_comparison(comparisons))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,9 +7,11 @@ Author: Matthew Black
 """
 
 import unittest
+import numpy as np
 import pandas as pd
 from os import path
 import dcapy.calc as calc
+from dcapy.algo import dca
 from test import resources_dir
 
 
@@ -32,6 +34,87 @@ class CalcTfPositivesTest(unittest.TestCase):
         self.assertEqual(false_pos, 91)
 
 
+class LowessSmoothResultsTest(unittest.TestCase):
+    """Tests the lowess_smooth_results() function against statsmodels' lowess
+    """
+
+    data = pd.read_csv(path.join(resources_dir, "dca.csv"))
+
+    def test_matches_statsmodels(self):
+        from statsmodels.nonparametric.smoothers_lowess import lowess
+        predictors = ['famhistory', 'cancerpredmarker']
+        net_benefit, interventions_avoided = dca(self.data, 'cancer', predictors,
+                                                 harms=[0, 0])
+        nb_sm, ia_sm = calc.lowess_smooth_results(predictors, net_benefit,
+                                                  interventions_avoided, 0.10)
+        for predictor in predictors:
+            for result, smoothed in [(net_benefit, nb_sm), (interventions_avoided, ia_sm)]:
+                expected = lowess(result[predictor], result['threshold'],
+                                  frac=0.10, return_sorted=False)
+                np.testing.assert_allclose(smoothed[predictor + '_sm'].values,
+                                           expected, rtol=1e-8, atol=1e-10)
+
+    def test_windowed_weights(self):
+        from unittest import mock
+        rng = np.random.RandomState(0)
+        x = np.sort(rng.uniform(size=500))
+        x[40:60] = x[40]
+        Y = np.sin(6*x)[:, np.newaxis] + rng.normal(0, .1, (500, 3))
+        Y[3, 1] = np.nan
+        order = rng.permutation(500)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dense = calc.lowess_smooth(x, Y, 0.05)
+        #large grids only weigh each point's window, a few rows at a time
+        with mock.patch.object(calc, '_DENSE_LOWESS_POINTS', 0), \
+                mock.patch.object(calc, '_LOWESS_CHUNK_VALUES', 5000):
+            windowed = calc.lowess_smooth(x[order], Y[order], 0.05)
+        np.testing.assert_allclose(windowed, dense[order], rtol=1e-8, atol=1e-10)
+        x = np.linspace(0.01, 0.99, 20000)
+        np.testing.assert_allclose(calc.lowess_smooth(x, np.sin(6*x), 0.01),
+                                   np.sin(6*x), atol=1e-3)
+
+
+class LinearSmootherTest(unittest.TestCase):
+    """Tests the precomputed linear smoothing matrices
+    """
+
+    thresholds = np.array(list(calc.frange(0.01, 1.0, 0.01)))
+
+    def test_savgol_matches_scipy(self):
+        from scipy.signal import savgol_filter
+        rng = np.random.RandomState(0)
+        curve = np.sin(6*self.thresholds) + rng.normal(0, 0.1, len(self.thresholds))
+        matrix = calc.smoother_matrix(self.thresholds, 'savgol', window=11, polyorder=3)
+        np.testing.assert_allclose(calc.linear_smooth(matrix, curve),
+                                   savgol_filter(curve, 11, 3, mode='interp'), atol=1e-10)
+
+    def test_savgol_short_grids(self):
+        """The default window is clipped to the grid, e.g. a step of 0.2
+        """
+        for step in [0.2, 0.45]:
+            x = np.array(list(calc.frange(0.01, 1.0, step)))
+            curve = 0.3 - 0.5*x + 0.2*x**2
+            np.testing.assert_allclose(
+                calc.smooth_curves(x, curve, 'savgol', lowess_frac=1.), curve, atol=1e-10)
+        x = np.array([0.1, 0.3])
+        np.testing.assert_allclose(calc.smooth_curves(x, x, 'savgol'), x)
+
+    def test_pspline_keeps_lines(self):
+        matrix = calc.smoother_matrix(self.thresholds, 'pspline', penalty=100.)
+        line = 0.2 - 0.3*self.thresholds
+        np.testing.assert_allclose(calc.linear_smooth(matrix, line), line, atol=1e-10)
+
+    def test_cached_and_batched(self):
+        """The matrix is built once per grid, and smooths replicates in one product
+        """
+        matrix = calc.smoother_matrix(self.thresholds, 'pspline', penalty=5.)
+        self.assertIs(matrix, calc.smoother_matrix(self.thresholds.copy(), 'pspline',
+                                                   penalty=5.))
+        curves = np.random.RandomState(1).normal(size=(len(self.thresholds), 3, 4))
+        smoothed = calc.linear_smooth(matrix, curves)
+        np.testing.assert_allclose(smoothed[:, 1, 2], matrix.dot(curves[:, 1, 2]))
+
+
 class CalcNetBenefitTest(unittest.TestCase):
     """Tests the accuracy of the calculate_net_benefit() function
     """
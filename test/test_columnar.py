@@ -0,0 +1,71 @@
+"""
+Decision Curve Analysis
+
+Tests for analyzing memory-mapped columnar data
+
+Author: Matthew Black
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from dcapy import DecisionCurveAnalysis
+from dcapy.columnar import ColumnStore, open_columns, save_columns
+from test import load_default_data
+
+
+class ColumnarDataTest(unittest.TestCase):
+
+    data = load_default_data()
+    predictors = ['famhistory', 'cancerpredmarker']
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        expected = DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                         predictors=self.predictors)
+        expected.run()
+        self.expected = expected.result
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _check_path(self, path):
+        analysis = DecisionCurveAnalysis('dca', data=path, outcome='cancer',
+                                         predictors=self.predictors)
+        analysis.run()
+        np.testing.assert_array_equal(analysis.result.net_benefit,
+                                      self.expected.net_benefit)
+        np.testing.assert_array_equal(analysis.result.interventions_avoided,
+                                      self.expected.interventions_avoided)
+        #only the columns of the analysis were opened, and they are memory-mapped
+        opened = [name for name in analysis.data.columns
+                  if not callable(analysis.data._columns[name])]
+        self.assertEqual(sorted(opened), sorted(['cancer'] + self.predictors))
+        self.assertIsInstance(analysis.data['famhistory'], np.memmap)
+
+    def test_npy_directory(self):
+        path = os.path.join(self.tmp_dir, 'cohort')
+        save_columns(path, self.data)
+        self._check_path(path)
+
+    def test_npz_file(self):
+        path = os.path.join(self.tmp_dir, 'cohort.npz')
+        save_columns(path, self.data)
+        self.assertIn('risk_group', self.data.columns)
+        self.assertNotIn('risk_group', open_columns(path).columns)
+        self._check_path(path)
+
+    def test_dropna_only_needed_columns(self):
+        store = ColumnStore({'y' : np.array([0, 1, 1, 0]),
+                             'x' : np.array([0.1, np.nan, 0.5, 0.7]),
+                             'other' : np.array([np.nan, 1., 2., 3.])})
+        self.assertIs(store.dropna(['y']), store)
+        complete = store.dropna(['y', 'x'])
+        self.assertEqual(complete.columns, ['y', 'x'])
+        np.testing.assert_array_equal(complete['x'], [0.1, 0.5, 0.7])
+
+
+if __name__ == '__main__':
+    unittest.main()
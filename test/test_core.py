@@ -0,0 +1,260 @@
+"""
+Decision Curve Analysis
+
+Tests for the array (pandas-free) core API
+
+Author: Matthew Black
+"""
+
+import subprocess
+import sys
+import unittest
+import numpy as np
+import dcapy.core as core
+from dcapy.algo import dca
+from test import load_default_data
+
+
+class NetBenefitTest(unittest.TestCase):
+
+    data = load_default_data()
+    predictors = ['famhistory', 'cancerpredmarker']
+
+    def test_matches_dataframe_analysis(self):
+        nb, ia = dca(self.data, 'cancer', self.predictors, harms=[0.01, 0.02])
+        thresholds = core.threshold_grid()
+        np.testing.assert_array_equal(thresholds, nb['threshold'].values)
+        P = self.data[self.predictors].values
+        net_benefit, interventions_avoided, net_benefit_all = core.decision_curves(
+            self.data['cancer'].values, P, thresholds, [0.01, 0.02])
+        np.testing.assert_array_equal(net_benefit, nb[self.predictors].values)
+        np.testing.assert_array_equal(interventions_avoided, ia[self.predictors].values)
+        np.testing.assert_array_equal(net_benefit_all, nb['all'].values)
+
+    def test_counts(self):
+        """Counts match direct comparison, for unsorted thresholds and missing values
+        """
+        rng = np.random.RandomState(5)
+        y = rng.randint(0, 2, 200)
+        x = rng.choice([0., 0.2, 0.25, 0.5, 0.9, np.nan], 200)
+        thresholds = np.array([0.5, 0.2, 0.75, 0.25, 0.])
+        true_positives, false_positives = core.count_positives(y, [x], thresholds)
+        for j, threshold in enumerate(thresholds):
+            positive = x >= threshold
+            self.assertEqual(true_positives[j, 0], np.sum(y[positive]))
+            self.assertEqual(false_positives[j, 0], np.sum(1 - y[positive]))
+
+    def test_engines(self):
+        """Every engine gives the same counts, in chunks and on several threads
+        """
+        rng = np.random.RandomState(3)
+        y = rng.randint(0, 2, 1000)
+        thresholds = core.threshold_grid()
+        x = np.round(rng.rand(1000), 2)
+        x[:10] = np.nan
+        x[10:20] = thresholds[:10]  # values on a threshold are positive at it
+        x[20:30] = np.nextafter(thresholds[:10], 0)
+        P = [x, rng.rand(1000), x.astype(np.float32), rng.randint(0, 2, 1000)]
+        for grid in [thresholds, thresholds[::-1], np.array([0.5]), rng.rand(50)]:
+            expected = core.count_positives(y, P, grid, engine='loop')
+            for engine in core.ENGINES:
+                for row_chunk, workers in [(None, 1), (300, 2)]:
+                    counts = core.count_positives(y, P, grid, row_chunk, engine, workers)
+                    np.testing.assert_array_equal(counts[0], expected[0])
+                    np.testing.assert_array_equal(counts[1], expected[1])
+        with self.assertRaises(ValueError):
+            core.count_positives(y, P, thresholds, engine='magic')
+
+    def test_outcome_matrix(self):
+        """Counting an outcome matrix counts each outcome as if alone
+        """
+        rng = np.random.RandomState(4)
+        Y = rng.randint(0, 2, (500, 3))
+        P = [rng.rand(500), np.round(rng.rand(500), 1)]
+        thresholds = core.threshold_grid()
+        for engine in core.ENGINES:
+            true_positives, false_positives = core.count_positives(
+                Y, P, thresholds, 200, engine)
+            self.assertEqual(true_positives.shape, (99, 2, 3))
+            for k in range(3):
+                expected = core.count_positives(Y[:, k], P, thresholds)
+                np.testing.assert_array_equal(true_positives[:, :, k], expected[0])
+                np.testing.assert_array_equal(false_positives[:, :, k], expected[1])
+
+    def test_grid_step(self):
+        self.assertAlmostEqual(core.grid_step(core.threshold_grid()), 0.01)
+        self.assertIsNotNone(core.grid_step(core.threshold_grid(0.01, 0.99, 0.98/99999)))
+        self.assertIsNone(core.grid_step([0.1, 0.2, 0.4]))
+        self.assertIsNone(core.grid_step([0.5]))
+
+    def test_confusion_metrics(self):
+        """The metrics match the confusion matrix counted directly
+        """
+        rng = np.random.RandomState(6)
+        y = rng.randint(0, 2, 300)
+        x = np.round(rng.rand(300), 1)
+        thresholds = core.threshold_grid(0.05, 0.95, 0.05)
+        true_positives, false_positives = core.count_positives(y, x, thresholds)
+        metrics = core.confusion_metrics(true_positives, false_positives, y.sum(), 300,
+                                         thresholds, harms=[0.01])
+        self.assertEqual(list(metrics), core.METRICS)
+        for j, threshold in enumerate(thresholds):
+            positive = x >= threshold
+            tp, fp = np.sum(positive & (y == 1)), np.sum(positive & (y == 0))
+            tn, fn = np.sum(~positive & (y == 0)), np.sum(~positive & (y == 1))
+            self.assertEqual(metrics['true_negatives'][j, 0], tn)
+            self.assertEqual(metrics['false_negatives'][j, 0], fn)
+            self.assertAlmostEqual(metrics['sensitivity'][j, 0], tp/(tp + fn))
+            self.assertAlmostEqual(metrics['specificity'][j, 0], tn/(tn + fp))
+            if tp + fp:
+                self.assertAlmostEqual(metrics['ppv'][j, 0], tp/(tp + fp))
+            else:
+                self.assertTrue(np.isnan(metrics['ppv'][j, 0]))
+            net_benefit = tp/300 - fp/300*threshold/(1 - threshold) - 0.01
+            self.assertAlmostEqual(metrics['standardized_net_benefit'][j, 0],
+                                   net_benefit/y.mean())
+        nb, ia, nb_all = core.decision_curves(y, x, thresholds, [0.01], intervention_per=1)
+        np.testing.assert_allclose(metrics['net_reduction'], ia)
+        self.assertEqual(list(core.confusion_metrics(true_positives, false_positives,
+                                                     y.sum(), 300, thresholds, ['npv'])),
+                         ['npv'])
+        with self.assertRaises(ValueError):
+            core.confusion_metrics(true_positives, false_positives, y.sum(), 300,
+                                   thresholds, ['auc'])
+
+    def test_weights(self):
+        """Weighted counts and curves match repeating each row by its weight
+        """
+        rng = np.random.RandomState(7)
+        y = rng.randint(0, 2, 300)
+        P = [np.round(rng.rand(300), 2), rng.randint(0, 2, 300)]
+        weights = rng.randint(0, 5, 300)
+        rows = np.repeat(np.arange(300), weights)
+        thresholds = core.threshold_grid()
+        expected = core.count_positives(y[rows], [x[rows] for x in P], thresholds)
+        for engine in core.ENGINES:
+            counts = core.count_positives(y, P, thresholds, 70, engine, weights=weights)
+            np.testing.assert_allclose(counts[0], expected[0])
+            np.testing.assert_allclose(counts[1], expected[1])
+        for curve, expected_curve in zip(
+                core.decision_curves(y, P, thresholds, weights=weights),
+                core.decision_curves(y[rows], [x[rows] for x in P], thresholds)):
+            np.testing.assert_allclose(curve, expected_curve, atol=1e-12)
+        with self.assertRaises(ValueError):
+            core.count_positives(y, P, thresholds, weights=-weights)
+        with self.assertRaises(ValueError):
+            core.count_positives(y, P, thresholds, weights=weights[1:])
+
+    def test_bad_shapes(self):
+        with self.assertRaises(ValueError):
+            core.net_benefit(np.zeros(3), np.zeros((4, 2)), [0.5])
+        with self.assertRaises(ValueError):
+            core.net_benefit(np.zeros(3), np.zeros((3, 2)), [0.5], harms=[0.])
+
+    def test_no_pandas_import(self):
+        code = ("import sys, numpy as np, dcapy.core as core\n"
+                "core.decision_curves(np.array([0, 1]), np.array([0.2, 0.7]), [0.5])\n"
+                "assert 'pandas' not in sys.modules")
+        subprocess.check_call([sys.executable, '-c', code])
+
+
+class SurvivalNetBenefitTest(unittest.TestCase):
+
+    def test_kaplan_meier(self):
+        """Risks match the Kaplan-Meier estimates of statsmodels
+        """
+        from statsmodels.duration.survfunc import SurvfuncRight
+        rng = np.random.RandomState(3)
+        n, time_point = 300, 1.5
+        x = rng.uniform(size=n)
+        time = np.round(rng.exponential(1/(0.2 + x)), 1)  # rounded, so times are tied
+        y = (rng.uniform(size=n) < 0.7).astype(int)
+        thresholds = np.array([0.1, 0.4, 0.8])
+        nb, nb_all = core.survival_net_benefit(y, time, x, thresholds, time_point)
+
+        def risk(mask):
+            km = SurvfuncRight(time[mask], y[mask])
+            at = np.searchsorted(km.surv_times, time_point, side='right')
+            return 1 - (km.surv_prob[at-1] if at > 0 else 1.)
+
+        odds = thresholds/(1 - thresholds)
+        risk_all = risk(np.ones(n, dtype=bool))
+        np.testing.assert_allclose(nb_all, risk_all - (1 - risk_all)*odds)
+        for j, threshold in enumerate(thresholds):
+            positive = x > threshold
+            p_x, risk_x = positive.mean(), risk(positive)
+            self.assertAlmostEqual(nb[j, 0], risk_x*p_x - (1 - risk_x)*p_x*odds[j])
+
+    def test_known_risk(self):
+        """A worked product-limit estimate, with a censoring tied to an event
+        """
+        time = np.array([1., 2., 2., 3., 4., 5.])
+        y = np.array([1, 0, 1, 1, 0, 1])
+        #S(3.5) = 5/6 * 4/5 * 2/3, with the censoring at 2 still at risk at 2
+        risk = 1 - 4/9
+        nb, nb_all = core.survival_net_benefit(y, time, np.ones(6), [0.25, 0.5], 3.5)
+        np.testing.assert_allclose(nb_all, [risk - (1 - risk)/3, risk - (1 - risk)])
+        np.testing.assert_allclose(nb[:, 0], nb_all)
+        #as in R, a value equal to the threshold isn't positive
+        with self.assertWarns(RuntimeWarning):
+            nb, _ = core.survival_net_benefit(y, time, np.full(6, 0.5), [0.25, 0.5], 3.5)
+        np.testing.assert_allclose(nb[:, 0], [risk - (1 - risk)/3, 0])
+
+    def test_stdca_reference(self):
+        """Matches the steps of the R stdca function (test/resource/stdca.R) on
+        the example data, wherever R can estimate the risk
+        """
+        from statsmodels.duration.survfunc import SurvfuncRight
+        data = load_default_data()
+        y, time = data['cancer'].values, data['ttcancer'].values
+        thresholds, time_point = np.round(core.threshold_grid(), 2), 1.5
+        #rounded, many values are tied with a threshold
+        x = np.round(data['cancerpredmarker'].values, 2)
+        self.assertGreater(np.isin(x, thresholds).sum(), 100)
+        with self.assertWarns(RuntimeWarning):  # R stops where the follow-up ends
+            nb, nb_all = core.survival_net_benefit(y, time, x, thresholds, time_point)
+
+        def risk(mask):
+            #R's summary(survfit(...), times=timepoint) is empty past the follow-up
+            if time[mask].max() < time_point:
+                return None
+            km = SurvfuncRight(time[mask], y[mask])
+            at = np.searchsorted(km.surv_times, time_point, side='right')
+            return 1 - km.surv_prob[at-1]
+
+        odds = thresholds/(1 - thresholds)
+        pd_all = risk(np.ones(len(y), dtype=bool))
+        np.testing.assert_allclose(nb_all, pd_all - (1 - pd_all)*odds)
+        compared = 0
+        for j, threshold in enumerate(thresholds):
+            positive = x > threshold
+            pd_x = risk(positive) if positive.any() else None
+            if pd_x is None:
+                break  # as R does, the rest of the curve is not calculable
+            p_x = positive.mean()
+            self.assertAlmostEqual(nb[j, 0], pd_x*p_x - (1 - pd_x)*p_x*odds[j])
+            compared += 1
+        self.assertGreater(compared, len(thresholds)//2)
+
+    def test_weights(self):
+        """Weighted Kaplan-Meier estimates match repeating each row by its weight
+        """
+        rng = np.random.RandomState(4)
+        x = rng.uniform(size=200)
+        time = np.round(rng.exponential(1/(0.2 + x)), 1)
+        y = (rng.uniform(size=200) < 0.7).astype(int)
+        weights = rng.randint(0, 4, 200)
+        rows = np.repeat(np.arange(200), weights)
+        thresholds = np.array([0.1, 0.4, 0.8])
+        for curve, expected in zip(
+                core.survival_net_benefit(y, time, x, thresholds, 1.5, weights=weights),
+                core.survival_net_benefit(y[rows], time[rows], x[rows], thresholds, 1.5)):
+            np.testing.assert_allclose(curve, expected, atol=1e-12)
+
+    def test_requires_time_point(self):
+        with self.assertRaises(ValueError):
+            core.survival_net_benefit([0, 1], [1., 2.], [0.2, 0.7], [0.5], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
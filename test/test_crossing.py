@@ -0,0 +1,83 @@
+"""
+Decision Curve Analysis
+
+Tests for the exact crossing points and optimal intervals of the curves
+
+Author: Matthew Black
+"""
+
+import unittest
+import numpy as np
+from dcapy import DecisionCurveAnalysis
+from dcapy.crossing import crossing_points, optimal_intervals
+from test import load_default_data
+
+
+class CrossingTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(2)
+        risk = rng.beta(2, 5, 400)
+        self.y = (rng.rand(400) < risk).astype(int)
+        self.P = [np.round(risk, 2),
+                  np.round(np.clip(risk + rng.normal(0, 0.1, 400), 0, 1), 3)]
+        self.P[1][:5] = np.nan
+        self.harms = [0., 0.005]
+        self.names = ['a', 'b']
+
+    def net_benefits(self, threshold):
+        """The net benefit of every strategy at a threshold, directly
+        """
+        odds = threshold/(1 - threshold)
+        net_benefit = {'none' : 0., 'all' : self.y.mean() - (1 - self.y.mean())*odds}
+        for name, x, harm in zip(self.names, self.P, self.harms):
+            positive = x >= threshold
+            net_benefit[name] = (np.sum(positive & (self.y == 1))
+                                 - np.sum(positive & (self.y == 0))*odds)/len(self.y) - harm
+        return net_benefit
+
+    def test_optimal_intervals(self):
+        """The strategy of each interval is the best at thresholds off any grid
+        """
+        intervals = optimal_intervals(self.y, self.P, self.names, self.harms)
+        self.assertEqual((intervals[0][0], intervals[-1][1]), (0.01, 0.99))
+        for (_, stop, _), (start, _, _) in zip(intervals[:-1], intervals[1:]):
+            self.assertEqual(stop, start)
+        for threshold in np.random.RandomState(0).uniform(0.01, 0.99, 500):
+            net_benefit = self.net_benefits(threshold)
+            best = [name for start, stop, name in intervals if start < threshold <= stop][0]
+            self.assertAlmostEqual(net_benefit[best], max(net_benefit.values()), places=12)
+
+    def test_crossing_points(self):
+        """The better of each pair changes at each crossing, and nowhere else
+        """
+        crossings = crossing_points(self.y, self.P, self.names, self.harms)
+        self.assertEqual(set(crossings), {('a', 'none'), ('a', 'all'), ('b', 'none'),
+                                          ('b', 'all'), ('b', 'a')})
+
+        def sign(pair, threshold):
+            net_benefit = self.net_benefits(threshold)
+            return np.sign(round(net_benefit[pair[0]] - net_benefit[pair[1]], 12))
+
+        for pair, thresholds in crossings.items():
+            for threshold in thresholds:
+                self.assertNotEqual(sign(pair, threshold - 1e-9), sign(pair, threshold + 1e-9))
+            #every change on a fine grid (ignoring ties) has a crossing
+            grid = np.linspace(0.0101, 0.99, 2000)
+            signs = np.array([sign(pair, threshold) for threshold in grid])
+            grid, signs = grid[signs != 0], signs[signs != 0]
+            for change in np.flatnonzero(signs[1:] != signs[:-1]):
+                self.assertTrue(np.any((thresholds > grid[change] - 1e-12)
+                                       & (thresholds <= grid[change + 1])))
+
+    def test_class(self):
+        data = load_default_data()
+        analysis = DecisionCurveAnalysis('dca', data=data, outcome='cancer',
+                                         predictors=['famhistory', 'cancerpredmarker'])
+        intervals = analysis.optimal_intervals()
+        self.assertEqual(intervals[0][0], analysis.threshold_bound('lower'))
+        self.assertIn(('cancerpredmarker', 'all'), analysis.crossing_points())
+
+
+if __name__ == '__main__':
+    unittest.main()
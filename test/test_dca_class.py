@@ -7,8 +7,11 @@ Author: Matthew Black
 """
 
 import unittest
+import numpy as np
 from dcapy import DecisionCurveAnalysis
-from dcapy.algo import dca
+from dcapy.algo import dca, dca_result, stdca
+from dcapy.analysis import STAGES
+from dcapy.validate import DCAError
 from test import load_r_results, load_default_data
 
 class UnivCancerFamHistTest(unittest.TestCase):
@@ -52,5 +55,209 @@ class UnivCancerFamHistTest(unittest.TestCase):
                 e.args += (msg_string)
                 raise
 
+
+class SurvivalTimeTest(unittest.TestCase):
+    """Test that the class runs survival-time analyses
+    """
+
+    data = load_default_data()
+
+    def test_compare_net_benefit(self):
+        analysis = DecisionCurveAnalysis('stdca', data=self.data, outcome='cancer',
+                                         predictors=['cancerpredmarker'],
+                                         tt_outcome='ttcancer', time_point=1.5)
+        analysis.run()
+        p_nb, p_ia = stdca(self.data, 'cancer', 'ttcancer', 1.5, ['cancerpredmarker'])
+        cls_nb = analysis.results['net benefit']
+        self.assertTrue((cls_nb['cancerpredmarker'] == p_nb['cancerpredmarker']).all())
+        self.assertTrue((cls_nb['all'] == p_nb['all']).all())
+        self.assertTrue(p_ia['cancerpredmarker'].notnull().all())
+
+    def test_competing_risk(self):
+        """Competing risk analysis isn't supported, so it can't be asked for
+        """
+        args = dict(data=self.data, outcome='cancer', predictors=['cancerpredmarker'],
+                    tt_outcome='ttcancer', time_point=1.5)
+        with self.assertRaises(ValueError):
+            DecisionCurveAnalysis('stdca', cmp_risk=True, **args)
+        analysis = DecisionCurveAnalysis('stdca', **args)
+        with self.assertRaises(ValueError):
+            analysis.competing_risk = True
+        self.assertFalse(analysis.competing_risk)
+        with self.assertRaises(ValueError):
+            stdca(self.data, 'cancer', 'ttcancer', 1.5, ['cancerpredmarker'], cmp_risk=True)
+
+
+class HarmSensitivityTest(unittest.TestCase):
+    """Test that the harm sensitivity surface matches rerunning with each harm
+    """
+
+    data = load_default_data()
+    predictors = ['famhistory', 'cancerpredmarker']
+
+    def test_surface(self):
+        analysis = DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                         predictors=self.predictors)
+        harms = [0., 0.01, 0.05]
+        sensitivity = analysis.harm_sensitivity(harms)
+        self.assertEqual(sensitivity['net_benefit'].shape, (3, 99, 2))
+        for i, harm in enumerate(harms):
+            p_nb, p_ia = dca(self.data, 'cancer', self.predictors, harms=[harm, harm])
+            np.testing.assert_allclose(sensitivity['net_benefit'][i],
+                                       p_nb[self.predictors].values, atol=1e-12)
+        np.testing.assert_array_equal(sensitivity['net_benefit_all'], p_nb['all'].values)
+
+    def test_break_even(self):
+        """At the break-even harm a predictor ties with treating all or none
+        """
+        analysis = DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                         predictors=self.predictors)
+        sensitivity = analysis.harm_sensitivity([0.])
+        net_benefit = sensitivity['net_benefit'][0]
+        np.testing.assert_allclose(net_benefit - sensitivity['break_even_none'], 0,
+                                   atol=1e-12)
+        np.testing.assert_allclose(net_benefit - sensitivity['break_even_all']
+                                   - sensitivity['net_benefit_all'][:, np.newaxis], 0,
+                                   atol=1e-12)
+
+
+class DirtyStagesTest(unittest.TestCase):
+    """Test that reruns recompute only the stages a change made dirty
+    """
+
+    data = load_default_data()
+    predictors = ['famhistory', 'marker']
+
+    def setUp(self):
+        self.records = []
+        self.analysis = DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                              predictors=self.predictors,
+                                              probabilities=[True, False],
+                                              profile=self.records.append)
+
+    def phases(self):
+        phases = [record['phase'] for record in self.records]
+        del self.records[:]
+        return phases
+
+    def expected(self, **kwargs):
+        analysis = DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                         predictors=self.predictors,
+                                         probabilities=[True, False], **kwargs)
+        analysis.run()
+        return analysis.result
+
+    def test_rerun(self):
+        self.assertEqual(self.analysis.dirty_stages, STAGES)
+        self.analysis.run()
+        self.assertEqual(self.analysis.dirty_stages, [])
+        first = self.analysis.result
+        self.phases()
+        self.analysis.run()
+        self.assertIs(self.analysis.result, first)
+        self.assertEqual(self.phases(), [])
+        #changing intervention_per only rescales interventions avoided
+        self.analysis.intervention_per = 10
+        self.assertEqual(self.analysis.dirty_stages, ['interventions_avoided', 'smoothing'])
+        self.analysis.run()
+        self.assertEqual(self.phases(), ['interventions_avoided'])
+        np.testing.assert_array_equal(self.analysis.result.net_benefit, first.net_benefit)
+        np.testing.assert_array_equal(self.analysis.result.interventions_avoided,
+                                      self.expected(intervention_per=10).interventions_avoided)
+
+    def test_harms_and_thresholds(self):
+        self.analysis.run()
+        self.phases()
+        self.analysis.harms = [0.01, 0.02]
+        self.analysis.run()
+        self.assertEqual(self.phases(), ['net_benefit', 'interventions_avoided'])
+        np.testing.assert_array_equal(self.analysis.result.net_benefit,
+                                      self.expected(harms=[0.01, 0.02]).net_benefit)
+        self.analysis.set_threshold_bounds(0.05, 0.5)
+        self.analysis.run()
+        self.assertEqual(self.phases(), ['count', 'net_benefit', 'interventions_avoided'])
+        np.testing.assert_array_equal(
+            self.analysis.result.net_benefit,
+            self.expected(harms=[0.01, 0.02], thresh_lo=0.05, thresh_hi=0.5).net_benefit)
+        self.analysis.probabilities = [True, True]
+        with self.assertRaises(ValueError):
+            self.analysis.run()
+        self.analysis.set_probability_for_predictor('marker', False)
+        self.analysis.run()
+        self.assertEqual(self.phases()[0], 'conversion')
+
+    def test_deferred_validation(self):
+        self.analysis.harms = [0.1]
+        self.analysis.set_threshold_bounds(0.6, 0.5)
+        with self.assertRaises(ValueError):
+            self.analysis.run()
+        self.analysis.set_threshold_bounds(0.01, 0.99)
+        with self.assertRaises(DCAError):
+            self.analysis.run()
+        self.analysis.harms = None
+        self.analysis.set_harm_for_predictor('marker', 0.02)
+        self.assertEqual(self.analysis.harms, [0, 0.02])
+        self.analysis.run()
+        self.analysis.smooth_results()
+        self.analysis.predictors = 'famhistory'
+        self.analysis.probabilities = None
+        self.analysis.harms = None
+        self.analysis.run()
+        #the smoothing is redone for the new curves
+        expected = dca_result(self.data, 'cancer', ['famhistory'], smooth_results=True)
+        np.testing.assert_allclose(self.analysis.result.smoothed['net_benefit'],
+                                   expected.smoothed['net_benefit'])
+
+    def test_missing_predictor(self):
+        self.analysis.predictors = ['famhistory', 'markr']
+        with self.assertRaises(ValueError):
+            self.analysis.run()
+
+
+class WeightsTest(unittest.TestCase):
+    """Test that an aggregated table, weighted by its counts, gives the curves
+    of one row per patient
+    """
+
+    data = load_default_data()
+
+    def setUp(self):
+        self.table = self.data.groupby(['famhistory', 'cancer']).size() \
+            .rename('count').reset_index()
+
+    def check(self, weighted, expected):
+        weighted.run(metrics=True)
+        expected.run(metrics=True)
+        for curve in ['net_benefit', 'interventions_avoided', 'net_benefit_all']:
+            np.testing.assert_allclose(getattr(weighted.result, curve),
+                                       getattr(expected.result, curve), atol=1e-10)
+        np.testing.assert_allclose(weighted.result.metrics['npv'],
+                                   expected.result.metrics['npv'], atol=1e-10)
+
+    def test_aggregated(self):
+        self.assertEqual(len(self.table), 4)
+        weighted = DecisionCurveAnalysis('dca', data=self.table, outcome='cancer',
+                                         predictors='famhistory', weights='count')
+        self.check(weighted, DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                                   predictors='famhistory'))
+        #the logistic regressions are weighted too
+        weighted.probabilities = [False]
+        self.assertEqual(weighted.dirty_stages[0], 'conversion')
+        self.check(weighted, DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                                   predictors='famhistory',
+                                                   probabilities=[False]))
+        np.testing.assert_allclose(
+            dca(self.table, 'cancer', ['famhistory'], weights='count')[0]['famhistory'],
+            dca(self.data, 'cancer', ['famhistory'])[0]['famhistory'], atol=1e-10)
+
+    def test_invalid(self):
+        self.table.loc[0, 'count'] = -1
+        analysis = DecisionCurveAnalysis('dca', data=self.table, outcome='cancer',
+                                         predictors='famhistory', weights='count')
+        with self.assertRaises(ValueError):
+            analysis.run()
+        analysis.weights = None
+        analysis.run()
+
 if __name__ == '__main__':
     unittest.main()
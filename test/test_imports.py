@@ -0,0 +1,54 @@
+"""
+Decision Curve Analysis
+
+Tests that heavy dependencies are only imported when they are used
+
+Author: Matthew Black
+"""
+
+import subprocess
+import sys
+import unittest
+from benchmark.import_time import HEAVY_MODULES, measure
+from test import resources_dir
+
+
+class LazyImportTest(unittest.TestCase):
+
+    def test_import(self):
+        timing = measure('from dcapy import DecisionCurveAnalysis', repeat=1)
+        self.assertEqual(timing['heavy'], [])
+
+    def test_analysis(self):
+        """Running an analysis, converting a predictor with logistic regression,
+        doesn't import statsmodels, scipy or matplotlib
+        """
+        code = ("import sys, os, pandas as pd\n"
+                "from dcapy import DecisionCurveAnalysis\n"
+                "data = pd.read_csv(os.path.join({resources!r}, 'dca.csv'))\n"
+                "analysis = DecisionCurveAnalysis('dca', data=data, outcome='cancer',\n"
+                "    predictors=['famhistory', 'marker'], probabilities=[True, False])\n"
+                "analysis.run()\n"
+                "heavy = [name for name in {heavy!r} if name in sys.modules]\n"
+                "assert not heavy, heavy\n").format(resources=resources_dir,
+                                                    heavy=HEAVY_MODULES)
+        subprocess.check_call([sys.executable, '-c', code])
+
+    def test_missing_dependency(self):
+        """A submodule whose dependency is missing raises the import error,
+        while a submodule that doesn't exist is a missing attribute
+        """
+        code = ("import sys, dcapy\n"
+                "sys.modules['pandas'] = None\n"
+                "try:\n"
+                "    dcapy.calc\n"
+                "except ModuleNotFoundError as e:\n"
+                "    assert e.name == 'pandas', e.name\n"
+                "else:\n"
+                "    raise AssertionError('dcapy.calc imported without pandas')\n"
+                "assert not hasattr(dcapy, 'not_a_module')\n")
+        subprocess.check_call([sys.executable, '-c', code])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Decision Curve Analysis
+
+Tests for the logistic regression used to convert predictors to probabilities
+
+Author: Matthew Black
+"""
+
+import unittest
+import numpy as np
+import dcapy.logistic as logistic
+from dcapy import DecisionCurveAnalysis
+from test import load_default_data
+
+
+class FitUnivariateLogisticTest(unittest.TestCase):
+
+    data = load_default_data()
+
+    def test_binary_predictor(self):
+        """For a 0/1 predictor the fitted probabilities are the event rates
+        of each group
+        """
+        y = self.data['cancer'].values
+        x = self.data['famhistory'].values
+        coefs = logistic.fit_univariate_logistic(y, x)
+        fitted = logistic.predict_logistic(coefs[0], x)
+        for group in [0, 1]:
+            self.assertAlmostEqual(fitted[x == group][0], y[x == group].mean(),
+                                   delta=1e-10)
+
+    def test_batch_matches_single(self):
+        """Fitting columns together gives the same coefficients as one at a time
+        """
+        y = self.data['cancer'].values
+        X = self.data[['age', 'marker', 'famhistory']].values
+        batch = logistic.fit_univariate_logistic(y, X)
+        for i in range(X.shape[1]):
+            single = logistic.fit_univariate_logistic(y, X[:, i])
+            np.testing.assert_allclose(batch[i], single[0], rtol=1e-8)
+
+
+    def test_weights(self):
+        """Frequency weights give the fit of the repeated rows
+        """
+        rng = np.random.RandomState(2)
+        x = rng.normal(size=200)
+        y = (rng.uniform(size=200) < logistic.expit(x)).astype(float)
+        weights = rng.randint(1, 5, 200)
+        rows = np.repeat(np.arange(200), weights)
+        np.testing.assert_allclose(logistic.fit_univariate_logistic(y, x, weights=weights),
+                                   logistic.fit_univariate_logistic(y[rows], x[rows]))
+        np.testing.assert_allclose(
+            logistic.fit_multivariable_logistic(y, x, weights=weights),
+            logistic.fit_multivariable_logistic(y[rows], x[rows]))
+
+
+class ConvertToProbabilitiesTest(unittest.TestCase):
+
+    def setUp(self):
+        logistic.clear_cache()
+        self.data = load_default_data()
+
+    def test_cached_fit_reused(self):
+        """Re-creating an analysis on the same data uses the cached coefficients
+        """
+        kwargs = {'data': self.data, 'outcome': 'cancer', 'predictors': ['marker'],
+                  'probabilities': [False]}
+        first = DecisionCurveAnalysis('dca', **kwargs)
+        #the predictors are converted when the analysis is first used
+        self.assertEqual(len(logistic._coefficient_cache), 0)
+        first.coefficients
+        self.assertEqual(len(logistic._coefficient_cache), 1)
+        second = DecisionCurveAnalysis('dca', **kwargs)
+        self.assertIs(first.coefficients['marker'], second.coefficients['marker'])
+        #scoring with the exposed coefficients reproduces the converted column
+        scored = logistic.predict_logistic(first.coefficients['marker'],
+                                           self.data['marker'].values)
+        np.testing.assert_allclose(scored, first.data['marker'].values)
+
+
+class CompositePredictorTest(unittest.TestCase):
+
+    def setUp(self):
+        logistic.clear_cache()
+        self.data = load_default_data()
+
+    def test_matches_statsmodels(self):
+        """The joint fit gives the same coefficients as statsmodels' Logit
+        """
+        import statsmodels.api as sm
+        columns = ['marker', 'age', 'famhistory']
+        coefs = logistic.fit_multivariable_logistic(self.data['cancer'].values,
+                                                    self.data[columns].values)
+        sm_fit = sm.Logit(self.data['cancer'], sm.add_constant(self.data[columns])).fit(disp=0)
+        np.testing.assert_allclose(coefs, sm_fit.params.values, rtol=1e-6)
+
+    def test_formula_and_list_agree(self):
+        """Declaring a composite as a formula or a list of columns is equivalent
+        """
+        from_list = DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                          predictors=['famhistory'],
+                                          composites={'joint' : ['marker', 'age']})
+        from_formula = DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                             predictors=['famhistory'],
+                                             composites={'joint' : 'cancer ~ marker + age'})
+        self.assertEqual(from_formula.predictors, ['famhistory', 'joint'])
+        np.testing.assert_array_equal(from_list.data['joint'].values,
+                                      from_formula.data['joint'].values)
+        self.assertEqual(len(from_list.coefficients['joint']), 3)
+
+    def test_composites_leave_data(self):
+        """Composites are added to a copy, so the same call can be repeated
+        """
+        from dcapy.algo import dca_result
+        results = [dca_result(self.data, 'cancer', ['famhistory'],
+                              composites={'joint' : ['marker', 'age']}) for _ in range(2)]
+        self.assertNotIn('joint', self.data)
+        np.testing.assert_array_equal(results[0].net_benefit, results[1].net_benefit)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Decision Curve Analysis
+
+Tests for the planner's choice of counting engine and parallelism
+
+Author: Matthew Black
+"""
+
+import unittest
+import numpy as np
+import dcapy.core as core
+from dcapy import DecisionCurveAnalysis
+from dcapy.planner import plan_analysis
+from test import load_default_data
+
+
+class PlanAnalysisTest(unittest.TestCase):
+
+    def test_regular_grid_many_rows(self):
+        """A regular grid on many rows is binned arithmetically
+        """
+        plan = plan_analysis(10**7, 1, core.threshold_grid(), num_cores=8)
+        self.assertEqual(plan.engine, 'regular')
+        self.assertAlmostEqual(plan.grid_step, 0.01)
+        self.assertEqual(plan.row_chunk, 10**7)
+
+    def test_dense_exact_grid(self):
+        """A dense grid of arbitrary thresholds on few rows isn't counted a
+        threshold at a time
+        """
+        thresholds = np.sort(np.random.RandomState(0).rand(10**5))
+        plan = plan_analysis(10**4, 1, thresholds, num_cores=1)
+        self.assertIsNone(plan.grid_step)
+        self.assertNotIn('regular', [candidate['engine'] for candidate in plan.candidates])
+        self.assertIn(plan.engine, ['histogram', 'sort'])
+        loop = [candidate for candidate in plan.candidates
+                if candidate['engine'] == 'loop'][0]
+        self.assertGreater(loop['seconds'], 100*plan.estimated_seconds)
+
+    def test_workers(self):
+        plan = plan_analysis(10**6, 8, core.threshold_grid(), num_cores=4)
+        self.assertEqual(plan.workers, 4)
+        self.assertEqual(plan_analysis(10**6, 1, 99, num_cores=4).workers, 1)
+        self.assertEqual(plan_analysis(10**6, 8, 99, workers=1, num_cores=4).workers, 1)
+
+    def test_memory_limit(self):
+        """Each worker's rows are counted in chunks that fit in the budget
+        """
+        plan = plan_analysis(10**8, 4, core.threshold_grid(), '100MB', num_cores=4)
+        self.assertLessEqual(plan.estimated_bytes, 100*10**6)
+        self.assertGreater(plan.num_chunks, 1)
+        for candidate in plan.candidates:
+            self.assertLessEqual(candidate['bytes'], 100*10**6)
+        #the weights of each chunk are held as well
+        weighted = plan_analysis(10**8, 4, core.threshold_grid(), '100MB', num_cores=4,
+                                 engine=plan.engine, workers=plan.workers, weighted=True)
+        self.assertLessEqual(weighted.estimated_bytes, 100*10**6)
+        self.assertLess(weighted.row_chunk, plan.row_chunk)
+
+    def test_overrides(self):
+        plan = plan_analysis(10**6, 2, core.threshold_grid(), engine='sort', workers=2)
+        self.assertEqual((plan.engine, plan.workers), ('sort', 2))
+        with self.assertRaises(ValueError):
+            plan_analysis(10**6, 2, 99, engine='magic')
+
+    def test_explain(self):
+        text = plan_analysis(10**7, 1, core.threshold_grid(), num_cores=8).explain()
+        self.assertIn('regular, step 0.01', text)
+        self.assertEqual(len([line for line in text.splitlines()
+                              if line.startswith('*')]), 1)
+
+
+class ExplainTest(unittest.TestCase):
+
+    data = load_default_data()
+
+    def test_explain_and_run(self):
+        """The analysis runs with the plan it explains, or with an override
+        """
+        analysis = DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                         predictors=['famhistory', 'cancerpredmarker'])
+        plan = analysis.explain()
+        self.assertEqual((plan.num_rows, plan.num_thresholds), (len(self.data), 99))
+        analysis.run()
+        self.assertEqual(analysis.result.plan.engine, plan.engine)
+        expected = analysis.result.net_benefit
+        for engine in core.ENGINES:
+            analysis.run(engine=engine, workers=2)
+            self.assertEqual(analysis.result.plan.engine, engine)
+            np.testing.assert_array_equal(analysis.result.net_benefit, expected)
+
+    def test_survival_not_planned(self):
+        analysis = DecisionCurveAnalysis('stdca', data=self.data, outcome='cancer',
+                                         tt_outcome='ttcancer', time_point=1.5,
+                                         predictors=['famhistory'])
+        with self.assertRaises(ValueError):
+            analysis.explain()
+        with self.assertRaises(ValueError):
+            analysis.run(engine='sort')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Decision Curve Analysis
+
+Tests for per-phase profiling of analyses
+
+Author: Matthew Black
+"""
+
+import unittest
+import numpy as np
+from dcapy import DecisionCurveAnalysis
+from dcapy.algo import dca, dca_result
+from dcapy.profiling import Profile
+from test import load_default_data
+
+
+class ProfileTest(unittest.TestCase):
+
+    data = load_default_data()
+
+    def test_run(self):
+        records = []
+        analysis = DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                         predictors=['famhistory', 'marker'],
+                                         probabilities=[True, False],
+                                         profile=records.append)
+        analysis.run()
+        analysis.smooth_results()
+        profile = analysis.result.profile
+        self.assertEqual([record['phase'] for record in profile],
+                         ['validation', 'conversion', 'count', 'net_benefit',
+                          'interventions_avoided'])
+        self.assertEqual(records, profile.phases)
+        count = profile.phases[2]
+        self.assertEqual((count['rows'], count['engine']),
+                         (len(self.data), analysis.result.plan.engine))
+        for record in profile:
+            self.assertGreaterEqual(record['seconds'], 0)
+            self.assertGreaterEqual(record['bytes'], 0)
+        #a second run records only the stages it recomputes
+        analysis.run()
+        self.assertEqual(len(records), 5)
+        analysis.intervention_per = 10
+        analysis.run()
+        self.assertEqual([record['phase'] for record in analysis.result.profile],
+                         ['interventions_avoided', 'smoothing'])
+        self.assertEqual(len(records), 7)
+
+    def test_dca(self):
+        records = []
+        nb, _ = dca(self.data, 'cancer', ['famhistory'], smooth_results=True,
+                    profile=records.append)
+        self.assertEqual([record['phase'] for record in records],
+                         ['count', 'net_benefit', 'smoothing'])
+        profile = Profile(memory=False)
+        result = dca_result(self.data, 'cancer', ['famhistory'], profile=profile)
+        self.assertIs(result.profile, profile)
+        self.assertIsNone(profile.phases[0]['bytes'])
+        np.testing.assert_array_equal(result.net_benefit[:, 0], nb['famhistory'])
+        self.assertIsNone(dca_result(self.data, 'cancer', ['famhistory']).profile)
+
+
+if __name__ == '__main__':
+    unittest.main()
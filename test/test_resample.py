@@ -0,0 +1,117 @@
+"""
+Decision Curve Analysis
+
+Tests for bootstrap and permutation replicates, and memory-budgeted execution
+
+Author: Matthew Black
+"""
+
+import os
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+import numpy as np
+import dcapy.core as core
+from dcapy import DecisionCurveAnalysis
+from dcapy.columnar import save_columns
+from dcapy.planner import parse_memory_limit, plan_analysis, plan_resampling
+from dcapy.resample import bootstrap, permutation_test, percentile_interval
+from dcapy.synthetic import SyntheticCohort
+
+
+class MemoryLimitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_parse(self):
+        self.assertEqual(parse_memory_limit('512MB'), 512*10**6)
+        self.assertEqual(parse_memory_limit('2 GiB'), 2*2**30)
+        self.assertEqual(parse_memory_limit(1000), 1000)
+        for limit in ['lots', '-1', 0]:
+            with self.assertRaises(ValueError):
+                parse_memory_limit(limit)
+
+    def test_plans(self):
+        plan = plan_analysis(10**8, 10, 99, '100MB')
+        self.assertLessEqual(plan.estimated_bytes, 100*10**6)
+        self.assertGreater(plan.num_chunks, 1)
+        self.assertEqual(plan_analysis(1000, 2, 99).row_chunk, 1000)
+        plan = plan_resampling(10**6, 50, 99, 100, '20MB', bin_bytes=1)
+        self.assertLessEqual(plan.estimated_bytes, 20*10**6)
+        self.assertLess(plan.predictor_chunk, 50)
+        with self.assertRaises(ValueError):
+            plan_analysis(10**6, 1000, 10**4, '1MB')
+
+    def test_run_memory_mapped(self):
+        """A chunked run over memory-mapped columns stays under the limit
+        """
+        cohort = SyntheticCohort({'a' : {}, 'b' : {'slope' : 2.}}, seed=0)
+        path = os.path.join(self.tmp_dir, 'cohort')
+        save_columns(path, cohort.sample(400000))
+        analysis = DecisionCurveAnalysis('dca', data=path, outcome='outcome',
+                                         predictors=['a', 'b'])
+        analysis.run()
+        expected = analysis.result
+        tracemalloc.start()
+        try:
+            analysis.run(memory_limit='1MB')
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 10**6)
+        self.assertGreater(analysis.result.plan.num_chunks, 1)
+        np.testing.assert_array_equal(analysis.result.net_benefit, expected.net_benefit)
+
+
+class ResampleTest(unittest.TestCase):
+
+    cohort = SyntheticCohort({'a' : {}, 'b' : {'slope' : 0.5}, 'c' : {'decimals' : 1}},
+                             seed=3)
+    data = cohort.sample(5000)
+    thresholds = core.threshold_grid(0.05, 0.5, 0.05)
+
+    def P(self):
+        return [self.data[name] for name in ['a', 'b', 'c']]
+
+    def test_bootstrap(self):
+        replicates = bootstrap(self.data['outcome'], self.P(), self.thresholds,
+                               replicates=20, seed=1)
+        self.assertEqual(replicates['net_benefit'].shape, (20, len(self.thresholds), 3))
+        #a replicate is the analysis of the resampled rows
+        rows = np.random.default_rng(np.random.SeedSequence(1).spawn(20)[4]).integers(
+            0, 5000, size=5000)
+        nb, ia, nb_all = core.decision_curves(self.data['outcome'][rows],
+                                              [x[rows] for x in self.P()], self.thresholds)
+        np.testing.assert_allclose(replicates['net_benefit'][4], nb)
+        np.testing.assert_allclose(replicates['interventions_avoided'][4], ia)
+        np.testing.assert_allclose(replicates['net_benefit_all'][4], nb_all)
+        #the same replicates are drawn within a memory limit
+        limited = bootstrap(self.data['outcome'], self.P(), self.thresholds,
+                            replicates=20, seed=1, memory_limit=70000)
+        self.assertLess(limited['plan'].predictor_chunk, 3)
+        self.assertLess(limited['plan'].row_chunk, 5000)
+        np.testing.assert_array_equal(limited['net_benefit'], replicates['net_benefit'])
+        lower, upper = percentile_interval(replicates['net_benefit'])
+        self.assertTrue(np.all(lower <= upper))
+
+    def test_permutation(self):
+        y = self.data['outcome']
+        result = permutation_test(y, self.data['a'], self.data['b'], self.thresholds,
+                                  replicates=99, seed=2)
+        nb = core.net_benefit(y, [self.data['a'], self.data['b']], self.thresholds)
+        np.testing.assert_allclose(result['difference'], nb[:, 0] - nb[:, 1])
+        self.assertEqual(result['null'].shape, (99, len(self.thresholds)))
+        self.assertTrue(np.all((result['p_value'] > 0) & (result['p_value'] <= 1)))
+        #a predictor doesn't differ from itself
+        same = permutation_test(y, self.data['a'], self.data['a'], self.thresholds,
+                                replicates=9, seed=2, memory_limit=60000)
+        np.testing.assert_array_equal(same['p_value'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
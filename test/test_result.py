@@ -0,0 +1,155 @@
+"""
+Decision Curve Analysis
+
+Tests for the DCAResult class
+
+Author: Matthew Black
+"""
+
+import unittest
+import numpy as np
+from dcapy import DecisionCurveAnalysis
+from dcapy.algo import dca
+from dcapy.result import DCAResult, MultiOutcomeResult
+from test import load_default_data
+
+
+class DCAResultTest(unittest.TestCase):
+
+    data = load_default_data()
+    predictors = ['famhistory', 'cancerpredmarker']
+
+    def setUp(self):
+        self.nb, self.ia = dca(self.data, 'cancer', self.predictors, harms=[0, 0])
+        self.result = DCAResult.from_frames(self.nb, self.ia)
+
+    def test_frames_round_trip(self):
+        """The dataframe views match the dataframes the result was made from
+        """
+        self.assertEqual(self.result.predictors, self.predictors)
+        self.assertEqual(list(self.result.net_benefit_frame().columns),
+                         list(self.nb.columns))
+        for name in self.nb.columns:
+            np.testing.assert_array_equal(self.result.results['net benefit'][name].values,
+                                          self.nb[name].values)
+        for name in self.ia.columns:
+            np.testing.assert_array_equal(self.result.interventions_avoided_frame()[name].values,
+                                          self.ia[name].values)
+
+    def test_compact_storage(self):
+        self.assertFalse(hasattr(self.result, '__dict__'))
+        self.assertTrue(self.result.net_benefit.flags['C_CONTIGUOUS'])
+        single = DCAResult.from_frames(self.nb, self.ia, dtype=np.float32)
+        self.assertEqual(single.net_benefit.dtype, np.float32)
+        self.assertEqual(single.thresholds.dtype, np.float64)
+        self.assertLess(single.nbytes, self.result.nbytes)
+
+    def test_frames_are_copies(self):
+        """Editing a returned frame doesn't change what later callers get
+        """
+        frame = self.result.results['net benefit']
+        frame['famhistory'] = 0.
+        frame['extra'] = 1.
+        fresh = self.result.net_benefit_frame()
+        self.assertIsNot(fresh, frame)
+        self.assertNotIn('extra', fresh.columns)
+        np.testing.assert_array_equal(fresh['famhistory'].values, self.nb['famhistory'].values)
+        np.testing.assert_array_equal(self.result.net_benefit[:, 0],
+                                      self.nb['famhistory'].values)
+
+    def test_smooth_invalidates_frames(self):
+        frame = self.result.net_benefit_frame()
+        self.result.smooth('pspline', penalty=10.)
+        smoothed = self.result.net_benefit_frame()
+        self.assertIn('famhistory_sm', smoothed.columns)
+        self.assertNotIn('famhistory_sm', frame.columns)
+
+    def test_class_results(self):
+        """The analysis class stores a DCAResult and still provides `results`
+        """
+        analysis = DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                         predictors=self.predictors)
+        analysis.run()
+        self.assertIsInstance(analysis.result, DCAResult)
+        np.testing.assert_array_equal(analysis.results['net benefit']['famhistory'].values,
+                                      self.nb['famhistory'].values)
+        analysis.smooth_results(0.10)
+        self.assertIn('cancerpredmarker_sm', analysis.results['interventions avoided'].columns)
+
+    def test_metrics(self):
+        """Only the metrics asked for are stored, and can be viewed as dataframes
+        """
+        analysis = DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                         predictors=self.predictors)
+        analysis.run(metrics=['sensitivity', 'net_benefit'])
+        result = analysis.result
+        self.assertEqual(list(result.metrics), ['sensitivity', 'net_benefit'])
+        np.testing.assert_array_equal(result.metrics['net_benefit'], result.net_benefit)
+        frame = result.metric_frame('sensitivity')
+        self.assertEqual(list(frame.columns), ['threshold'] + self.predictors)
+        self.assertTrue((frame['famhistory'].between(0, 1)).all())
+        with self.assertRaises(KeyError):
+            result.metric_frame('npv')
+        analysis.run()
+        self.assertEqual(analysis.result.metrics, {})
+
+
+class MultiOutcomeResultTest(unittest.TestCase):
+
+    data = load_default_data()
+    predictors = ['famhistory', 'cancerpredmarker']
+
+    def test_matches_single_outcomes(self):
+        """Each outcome of a multi-outcome analysis matches analyzing it alone
+        """
+        analysis = DecisionCurveAnalysis('dca', data=self.data, outcome=['cancer', 'dead'],
+                                         predictors=self.predictors, harms=[0.01, 0.])
+        analysis.run()
+        result = analysis.result
+        self.assertIsInstance(result, MultiOutcomeResult)
+        self.assertEqual(result.net_benefit.shape, (2, 99, 2))
+        self.assertEqual(result.net_benefit_all.shape, (2, 99))
+        for k, outcome in enumerate(['cancer', 'dead']):
+            nb, ia = dca(self.data, outcome, self.predictors, harms=[0.01, 0.])
+            np.testing.assert_array_equal(result[outcome].net_benefit,
+                                          nb[self.predictors].values)
+            np.testing.assert_array_equal(result.interventions_avoided[k],
+                                          ia[self.predictors].values)
+            np.testing.assert_array_equal(result.net_benefit_all[k], nb['all'].values)
+        self.assertFalse(np.array_equal(result.net_benefit_all[0], result.net_benefit_all[1]))
+
+    def test_frames(self):
+        nb, ia = dca(self.data, ['cancer', 'dead'], self.predictors)
+        self.assertEqual(list(nb.columns[:3]), ['outcome', 'threshold', 'all'])
+        self.assertEqual(list(nb['outcome'].unique()), ['cancer', 'dead'])
+        dead = nb[nb['outcome'] == 'dead']
+        alone, _ = dca(self.data, 'dead', self.predictors)
+        np.testing.assert_array_equal(dead['cancerpredmarker'].values,
+                                      alone['cancerpredmarker'].values)
+        self.assertEqual(len(ia), 2*99)
+
+    def test_frames_cached(self):
+        """Each table is built once, and rebuilt when an outcome is smoothed
+        """
+        analysis = DecisionCurveAnalysis('dca', data=self.data, outcome=['cancer', 'dead'],
+                                         predictors=self.predictors)
+        analysis.run()
+        result = analysis.result
+        frame = result._cached_frame('net benefit')
+        self.assertIs(result._cached_frame('net benefit'), frame)
+        result.results['net benefit']['all'] = 0.
+        self.assertFalse((result.net_benefit_frame()['all'] == 0).all())
+        result['dead'].smooth('pspline', penalty=10.)
+        self.assertIn('famhistory_sm', result.net_benefit_frame().columns)
+
+    def test_needs_probabilities(self):
+        """Converting predictors to probabilities needs a single outcome
+        """
+        analysis = DecisionCurveAnalysis('dca', data=self.data, outcome=['cancer', 'dead'],
+                                         predictors=['marker'], probabilities=[False])
+        with self.assertRaises(ValueError):
+            analysis.run()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Decision Curve Analysis
+
+Tests for screening many predictors by summaries of their curves
+
+Author: Matthew Black
+"""
+
+import unittest
+import numpy as np
+from dcapy.algo import dca
+from dcapy.screening import screen, summarize_curves
+from dcapy.synthetic import SyntheticCohort
+
+
+class ScreenTest(unittest.TestCase):
+
+    names = ['p{0}'.format(i) for i in range(12)]
+    data = SyntheticCohort({name : {'slope' : 0.25 + i/4, 'decimals' : 2}
+                            for i, name in enumerate(names)}, seed=3).sample(2000)
+
+    def test_matches_dca(self):
+        """The summaries are of the curves `dca` gives
+        """
+        screened = screen(self.data, 'outcome', self.names, harms=0.01,
+                          area_range=(0.05, 0.5), predictor_chunk=5)
+        self.assertEqual(screened['num_screened'], 12)
+        self.assertEqual(sorted(screened['predictors']), sorted(self.names))
+        nb, ia = dca(self.data, 'outcome', self.names, harms=[0.01]*12)
+        in_range = (nb['threshold'] >= 0.05) & (nb['threshold'] <= 0.5)
+        for i, name in enumerate(screened['predictors']):
+            curve = nb[name].values
+            self.assertAlmostEqual(screened['max_net_benefit'][i], curve.max())
+            area = np.sum((curve[in_range][1:] + curve[in_range][:-1])/2
+                          * np.diff(nb['threshold'][in_range]))
+            self.assertAlmostEqual(screened['area'][i], area)
+            beats = curve > np.maximum(nb['all'].values, 0)
+            self.assertAlmostEqual(screened['beats_fraction'][i], beats.mean())
+            if beats.any():
+                self.assertAlmostEqual(screened['beats_from'][i],
+                                       nb['threshold'][beats].min())
+                self.assertAlmostEqual(screened['beats_to'][i],
+                                       nb['threshold'][beats].max())
+        self.assertTrue(np.all(np.diff(screened['area']) <= 0))
+
+    def test_top_k(self):
+        """The top predictors don't depend on the chunk size
+        """
+        everything = screen(self.data, 'outcome', self.names, criterion='max_net_benefit')
+        for chunk in [1, 4, 100]:
+            top = screen(self.data, 'outcome', self.names, criterion='max_net_benefit',
+                         top_k=3, predictor_chunk=chunk)
+            self.assertEqual(top['predictors'], everything['predictors'][:3])
+            np.testing.assert_array_equal(top['max_net_benefit'],
+                                          everything['max_net_benefit'][:3])
+
+    def test_bad_arguments(self):
+        with self.assertRaises(ValueError):
+            screen(self.data, 'outcome', self.names, criterion='auc')
+        with self.assertRaises(ValueError):
+            screen(self.data, 'outcome', self.names, harms=[0., 0.1])
+        with self.assertRaises(ValueError):
+            summarize_curves(np.zeros((3, 1)), np.zeros(3), [0.1, 0.2, 0.3], (0.5, 0.6))
+
+
+if __name__ == '__main__':
+    unittest.main()
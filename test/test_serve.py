@@ -0,0 +1,189 @@
+"""
+Decision Curve Analysis
+
+Tests for the local service that answers queries against cohorts in memory
+
+Author: Matthew Black
+"""
+
+import threading
+import unittest
+import numpy as np
+from dcapy.algo import dca_result
+from dcapy.columnar import ColumnStore
+from dcapy.serve import Client, CohortService, make_server
+from test import load_default_data
+
+
+class CohortServiceTest(unittest.TestCase):
+
+    data = load_default_data()
+
+    def setUp(self):
+        self.service = CohortService(batch_window=0.2)
+        self.service.load('default', self.data)
+
+    def expected(self, predictors, outcome='cancer', data=None, **kwargs):
+        data = ColumnStore({column : np.asarray(self.data[column])
+                            for column in ['cancer', 'dead', 'famhistory',
+                                           'cancerpredmarker']}) if data is None else data
+        return dca_result(data, outcome, predictors, **kwargs)
+
+    def test_answer(self):
+        answer = self.service.net_benefit({'cohort' : 'default', 'outcome' : 'cancer',
+                                           'predictors' : 'cancerpredmarker',
+                                           'harms' : [0.01]})
+        expected = self.expected(['cancerpredmarker'], harms=[0.01])
+        np.testing.assert_allclose(answer['net_benefit'], expected.net_benefit)
+        np.testing.assert_allclose(answer['interventions_avoided'],
+                                   expected.interventions_avoided)
+        np.testing.assert_allclose(answer['net_benefit_all'], expected.net_benefit_all)
+        np.testing.assert_allclose(answer['thresholds'], expected.thresholds)
+        self.assertEqual(answer['predictors'], ['cancerpredmarker'])
+
+    def test_batching(self):
+        queries = [{'cohort' : 'default', 'outcome' : 'cancer',
+                    'predictors' : ['famhistory'], 'harms' : [0.05]},
+                   {'cohort' : 'default', 'outcome' : 'dead',
+                    'predictors' : ['cancerpredmarker', 'famhistory']},
+                   {'cohort' : 'default', 'outcome' : 'cancer',
+                    'predictors' : ['cancerpredmarker'], 'thresh_step' : 0.02}]
+        futures = [self.service.submit(query) for query in queries]
+        answers = [future.result(5) for future in futures]
+        #the first two share a grid, so they are counted in one pass
+        self.assertEqual(len(self.service.batches), 2)
+        self.assertEqual(answers[0]['batch']['queries'], 2)
+        self.assertEqual(answers[0]['batch']['outcomes'], 2)
+        self.assertEqual(answers[0]['batch']['predictors'], 2)
+        self.assertEqual(answers[2]['batch']['queries'], 1)
+        np.testing.assert_allclose(answers[0]['net_benefit'],
+                                   self.expected(['famhistory'], harms=[0.05]).net_benefit)
+        np.testing.assert_allclose(answers[1]['net_benefit'], self.expected(
+            ['cancerpredmarker', 'famhistory'], 'dead').net_benefit)
+        np.testing.assert_allclose(answers[2]['net_benefit'], self.expected(
+            ['cancerpredmarker'], thresh_step=0.02).net_benefit)
+
+    def test_failed_query(self):
+        """A query that fails in its batch fails alone
+        """
+        queries = [{'cohort' : 'default', 'outcome' : 'cancer', 'predictors' : 'famhistory'},
+                   {'cohort' : 'default', 'outcome' : 'cancer', 'predictors' : 'famhistory',
+                    'harms' : [0.01]}]
+        futures = [self.service.submit(query) for query in queries]
+        #break the second query after it was checked, while it waits for its batch
+        with self.service._lock:
+            for _, batch in self.service._pending.values():
+                batch[1][0]['harms'] = np.array([0.01, 0.02])
+        self.assertEqual(futures[0].result(5)['batch']['queries'], 2)
+        with self.assertRaises(ValueError):
+            futures[1].result(5)
+
+    def test_history(self):
+        service = CohortService(batch_window=0, history=2)
+        service.load('default', self.data)
+        for predictor in ['famhistory', 'cancerpredmarker', 'famhistory']:
+            service.net_benefit({'cohort' : 'default', 'outcome' : 'cancer',
+                                 'predictors' : predictor})
+        self.assertEqual(len(service.batches), 2)
+
+    def test_several_outcomes(self):
+        answer = self.service.net_benefit({'cohort' : 'default',
+                                           'outcome' : ['cancer', 'dead'],
+                                           'predictors' : ['famhistory']})
+        self.assertEqual(answer['outcomes'], ['cancer', 'dead'])
+        expected = self.expected(['famhistory'], ['cancer', 'dead'])
+        np.testing.assert_allclose(answer['net_benefit'], expected.net_benefit)
+        np.testing.assert_allclose(answer['net_benefit_all'], expected.net_benefit_all)
+
+    def test_missing_values(self):
+        with_missing = np.asarray(self.data['cancerpredmarker']).copy()
+        with_missing[::7] = np.nan
+        columns = {'cancer' : np.asarray(self.data['cancer']),
+                   'famhistory' : np.asarray(self.data['famhistory']),
+                   'partial' : with_missing}
+        self.service.load('partial', columns)
+        complete, partial = [self.service.submit({'cohort' : 'partial', 'outcome' : 'cancer',
+                                                  'predictors' : predictors})
+                             for predictors in [['famhistory'], ['partial']]]
+        #only the query using the incomplete column drops rows
+        np.testing.assert_allclose(complete.result(5)['net_benefit'], self.expected(
+            ['famhistory'], data=ColumnStore(columns)).net_benefit)
+        np.testing.assert_allclose(partial.result(5)['net_benefit'], self.expected(
+            ['partial'], data=ColumnStore(columns).dropna(['cancer', 'partial'])).net_benefit)
+        self.assertEqual(partial.result()['batch']['queries'], 1)
+
+    def test_invalid_queries(self):
+        with self.assertRaises(KeyError):
+            self.service.net_benefit({'cohort' : 'other', 'outcome' : 'cancer',
+                                      'predictors' : 'famhistory'})
+        with self.assertRaises(KeyError):
+            self.service.net_benefit({'cohort' : 'default', 'outcome' : 'cancer',
+                                      'predictors' : 'unknown'})
+        with self.assertRaises(ValueError):
+            self.service.net_benefit({'cohort' : 'default', 'outcome' : 'cancer',
+                                      'predictors' : 'marker'})
+        with self.assertRaises(ValueError):
+            self.service.net_benefit({'cohort' : 'default', 'outcome' : 'cancer',
+                                      'predictors' : 'famhistory', 'harms' : [0, 1]})
+        for intervention_per in ['x', 0, True]:
+            with self.assertRaises(ValueError):
+                self.service.net_benefit({'cohort' : 'default', 'outcome' : 'cancer',
+                                          'predictors' : 'famhistory',
+                                          'intervention_per' : intervention_per})
+        for step in [0, 0.5]:
+            with self.assertRaises(ValueError):
+                self.service.net_benefit({'cohort' : 'default', 'outcome' : 'cancer',
+                                          'predictors' : 'famhistory', 'thresh_step' : step})
+
+
+class ServerTest(unittest.TestCase):
+
+    data = load_default_data()
+
+    def setUp(self):
+        self.server = make_server(port=0, service=CohortService(batch_window=0.1))
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.client = Client('http://{0}:{1}'.format(*self.server.server_address[:2]),
+                             timeout=10)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_queries(self):
+        columns = {column : self.data[column] for column in
+                   ['cancer', 'famhistory', 'cancerpredmarker']}
+        self.assertEqual(self.client.load('default', columns=columns),
+                         {'rows' : 750, 'columns' : list(columns)})
+        self.assertEqual(list(self.client.cohorts()), ['default'])
+
+        answers = [None, None]
+
+        def query(i, predictor):
+            answers[i] = self.client.net_benefit('default', 'cancer', predictor)
+        threads = [threading.Thread(target=query, args=(i, predictor))
+                   for i, predictor in enumerate(['famhistory', 'cancerpredmarker'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([answer['batch']['queries'] for answer in answers], [2, 2])
+        expected = dca_result(ColumnStore(dict(columns)), 'cancer',
+                              ['famhistory', 'cancerpredmarker'])
+        net_benefit = np.column_stack([answer['net_benefit'] for answer in answers])
+        np.testing.assert_allclose(net_benefit, expected.net_benefit)
+
+        with self.assertRaises(ValueError):
+            self.client.net_benefit('default', 'cancer', 'famhistory', harms=[0, 1])
+        with self.assertRaises(ValueError):
+            self.client.net_benefit('default', 'cancer', 'famhistory', thresh_step=0)
+        self.client.unload('default')
+        with self.assertRaises(KeyError):
+            self.client.net_benefit('default', 'cancer', 'famhistory')
+        with self.assertRaises(KeyError):
+            self.client.unload('default')
+
+
+if __name__ == '__main__':
+    unittest.main()
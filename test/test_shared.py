@@ -0,0 +1,136 @@
+"""
+Decision Curve Analysis
+
+Tests for sharing cohort columns with worker processes
+
+Author: Matthew Black
+"""
+
+import asyncio
+import pickle
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from dcapy import DecisionCurveAnalysis
+from dcapy.aio import AnalysisRunner
+from dcapy.algo import dca_result
+from dcapy.resample import bootstrap
+from dcapy.shared import SharedColumns, SharedColumnStore, attach, share
+from test import load_default_data
+
+
+def net_benefit(store, predictor):
+    return dca_result(store, 'cancer', [predictor]).net_benefit
+
+
+def fail(store, item):
+    raise RuntimeError(item)
+
+
+def bootstrap_replicates(store, seed):
+    return bootstrap(store['cancer'], [store['cancerpredmarker']],
+                     np.linspace(0.01, 0.99, 99), 10, seed=seed)['net_benefit']
+
+
+class SharedColumnsTest(unittest.TestCase):
+
+    data = load_default_data()
+    columns = ['cancer', 'famhistory', 'cancerpredmarker']
+
+    def test_store(self):
+        with share(self.data, self.columns) as shared:
+            self.assertEqual(shared.store.columns, self.columns)
+            for column in self.columns:
+                np.testing.assert_array_equal(shared.store[column], self.data[column])
+            with self.assertRaises(ValueError):
+                shared.store['cancer'][0] = 1
+            #only the handle is pickled
+            pickled = pickle.dumps(shared.store)
+            self.assertLess(len(pickled), 1000)
+            restored = pickle.loads(pickled)
+            self.assertIsInstance(restored, SharedColumnStore)
+            np.testing.assert_array_equal(restored['cancerpredmarker'],
+                                          self.data['cancerpredmarker'])
+            #assigned columns are pickled with it
+            store = attach(shared.handle)
+            store['risk'] = np.asarray(self.data['marker'])
+            np.testing.assert_array_equal(pickle.loads(pickle.dumps(store))['risk'],
+                                          self.data['marker'])
+
+    def test_missing_values(self):
+        columns = {'y' : np.array([0, 1, 1, 0]), 'x' : np.array([0.1, np.nan, 0.5, 0.7])}
+        with SharedColumns(columns) as shared:
+            self.assertEqual(len(shared.store), 3)
+            np.testing.assert_array_equal(shared.store['x'], [0.1, 0.5, 0.7])
+        with self.assertRaises(ValueError):
+            SharedColumns(self.data, ['risk_group'])
+
+    def test_analysis(self):
+        expected = dca_result(self.data, 'cancer', ['famhistory', 'cancerpredmarker'])
+        with share(self.data, self.columns) as shared:
+            analysis = DecisionCurveAnalysis('dca', data=shared.store, outcome='cancer',
+                                             predictors=['famhistory', 'cancerpredmarker'])
+            self.assertIs(analysis.data, shared.store)
+            analysis.run()
+            np.testing.assert_array_equal(analysis.result.net_benefit, expected.net_benefit)
+
+    def test_map(self):
+        predictors = ['famhistory', 'cancerpredmarker']
+        with share(self.data, self.columns) as shared:
+            results = shared.map(net_benefit, predictors, workers=2)
+            with ProcessPoolExecutor(2) as executor:
+                self.assertEqual(len(shared.map(net_benefit, predictors,
+                                                executor=executor)), 2)
+            with self.assertRaises(RuntimeError):
+                shared.map(fail, [1, 2], workers=2)
+        for predictor, result in zip(predictors, results):
+            np.testing.assert_array_equal(
+                result, dca_result(self.data, 'cancer', [predictor]).net_benefit)
+
+    def test_resample(self):
+        expected = [bootstrap_replicates(self.data, seed) for seed in [1, 2]]
+        with share(self.data, self.columns) as shared:
+            #in the calling process, on the shared columns
+            np.testing.assert_array_equal(bootstrap_replicates(shared.store, 1),
+                                          expected[0])
+            #or spread over processes, a seed each
+            replicates = shared.map(bootstrap_replicates, [1, 2], workers=2)
+        for result, expected_result in zip(replicates, expected):
+            np.testing.assert_array_equal(result, expected_result)
+
+    def test_process_runner(self):
+        with share(self.data, self.columns) as shared:
+            analyses = [DecisionCurveAnalysis('dca', data=shared.store, outcome='cancer',
+                                              predictors=predictor)
+                        for predictor in ['famhistory', 'cancerpredmarker']]
+            with ProcessPoolExecutor(2) as executor:
+                results = asyncio.run(AnalysisRunner(executor).run_many(analyses))
+        np.testing.assert_array_equal(
+            results[1].net_benefit,
+            dca_result(self.data, 'cancer', ['cancerpredmarker']).net_benefit)
+
+    def test_release(self):
+        shared = share(self.data, self.columns)
+        handle = shared.handle
+        shared.close()
+        shared.close()
+        self.assertTrue(shared.closed)
+        with self.assertRaises(ValueError):
+            attach(handle)
+        with self.assertRaises(ValueError):
+            shared.map(net_benefit, ['famhistory'])
+        #released when leaving a with block on an error
+        with self.assertRaises(KeyError):
+            with share(self.data, self.columns) as shared:
+                handle = shared.handle
+                raise KeyError
+        with self.assertRaises(ValueError):
+            attach(handle)
+        #and when collected
+        handle = share(self.data, self.columns).handle
+        with self.assertRaises(ValueError):
+            attach(handle)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Decision Curve Analysis
+
+Tests for saving and loading results in the binary results format
+
+Author: Matthew Black
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from dcapy import DecisionCurveAnalysis
+from dcapy.result import DCAResult
+import dcapy.storage as storage
+from test import load_default_data
+
+
+class SaveLoadTest(unittest.TestCase):
+
+    data = load_default_data()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'results.npz')
+        self.analysis = DecisionCurveAnalysis('dca', data=self.data, outcome='cancer',
+                                              predictors=['famhistory', 'cancerpredmarker'])
+        self.analysis.run()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        self.analysis.result.smooth('lowess', 0.10)
+        name = self.analysis.save_results(self.path, 'univ')
+        loaded = DCAResult.load(self.path)
+        self.assertEqual(name, 'univ')
+        for metric in ['thresholds', 'net_benefit', 'interventions_avoided',
+                       'net_benefit_all']:
+            np.testing.assert_array_equal(getattr(loaded, metric),
+                                          getattr(self.analysis.result, metric))
+        np.testing.assert_array_equal(loaded.smoothed['net_benefit'],
+                                      self.analysis.result.smoothed['net_benefit'])
+        self.assertEqual(loaded.metadata['harms'], [0.0, 0.0])
+        self.assertEqual(loaded.metadata['thresholds'], [0.01, 0.99, 0.01])
+
+    def test_metrics(self):
+        self.analysis.run(metrics=['sensitivity', 'specificity'])
+        self.analysis.save_results(self.path, 'metrics')
+        loaded = storage.load_result(self.path, predictors=['cancerpredmarker'])
+        self.assertEqual(sorted(loaded.metrics), ['sensitivity', 'specificity'])
+        np.testing.assert_array_equal(loaded.metrics['sensitivity'][:, 0],
+                                      self.analysis.result.metrics['sensitivity'][:, 1])
+
+    def test_append_and_select(self):
+        """Several analyses share a file, and single predictors can be loaded
+        """
+        self.analysis.result.save(self.path)
+        self.analysis.harms = [0.01, 0.02]
+        self.analysis.run(dtype='float32')
+        self.analysis.save_results(self.path, 'harmed')
+        self.assertEqual(storage.list_results(self.path), ['analysis_0', 'harmed'])
+        self.assertTrue(np.load(self.path)['harmed/thresholds'].size > 0)
+        with self.assertRaises(ValueError):
+            self.analysis.save_results(self.path, 'harmed')
+
+        loaded = storage.load_result(self.path, 'harmed', predictors=['cancerpredmarker'])
+        self.assertEqual(loaded.predictors, ['cancerpredmarker'])
+        self.assertEqual(loaded.dtype, np.float32)
+        np.testing.assert_array_equal(loaded.net_benefit[:, 0],
+                                      self.analysis.result.net_benefit[:, 1])
+        fingerprint = storage.read_metadata(self.path, 'harmed')['metadata']['data_fingerprint']
+        self.assertEqual(fingerprint, storage.data_fingerprint(
+            self.analysis.data, ['cancer', 'famhistory', 'cancerpredmarker']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Decision Curve Analysis
+
+Tests for the synthetic cohort generator and its expected decision curves
+
+Author: Matthew Black
+"""
+
+import unittest
+import numpy as np
+import dcapy.core as core
+from dcapy import DecisionCurveAnalysis
+from dcapy.synthetic import SyntheticCohort, streamed_decision_curves
+
+
+class SyntheticCohortTest(unittest.TestCase):
+
+    predictors = {'calibrated' : {},
+                  'miscalibrated' : {'intercept' : -0.5, 'slope' : 2.},
+                  'tied' : {'decimals' : 1},
+                  'tied_miscalibrated' : {'decimals' : 2, 'slope' : 0.5}}
+    thresholds = core.threshold_grid()
+
+    def test_streamed_curves(self):
+        cohort = SyntheticCohort(self.predictors, seed=1)
+        observed = streamed_decision_curves(cohort, 2000000, self.thresholds,
+                                            harms=[0, 0.01, 0, 0], chunk_size=300000)
+        expected = cohort.expected_curves(self.thresholds, harms=[0, 0.01, 0, 0])
+        np.testing.assert_allclose(observed[0], expected[0], atol=2e-3)
+        np.testing.assert_allclose(observed[2][:50], expected[2][:50], atol=2e-3)
+
+    def test_chunks(self):
+        cohort = SyntheticCohort(self.predictors, seed=4)
+        sizes = [len(chunk['outcome']) for chunk in cohort.chunks(2500, 1000)]
+        self.assertEqual(sizes, [1000, 1000, 500])
+        first = next(cohort.chunks(10))
+        np.testing.assert_array_equal(first['tied'], next(cohort.chunks(10))['tied'])
+        self.assertLessEqual(len(np.unique(first['tied'])), 11)
+
+    def test_survival(self):
+        cohort = SyntheticCohort({'calibrated' : {}, 'tied' : {'decimals' : 1}},
+                                 survival=True, time_point=2., censoring_rate=0.2,
+                                 seed=2)
+        data = cohort.sample(100000)
+        self.assertTrue(0 < np.mean(data['outcome']) < 1)
+        analysis = DecisionCurveAnalysis('stdca', data=data, outcome='outcome',
+                                         predictors=['calibrated', 'tied'],
+                                         tt_outcome='time', time_point=2.)
+        analysis.run()
+        expected, _, expected_all = cohort.expected_curves(analysis.result.thresholds)
+        np.testing.assert_allclose(analysis.result.net_benefit, expected, atol=5e-3)
+        np.testing.assert_allclose(analysis.result.net_benefit_all[:50],
+                                   expected_all[:50], atol=5e-3)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            SyntheticCohort({'x' : {}}, risk_shape=(2.5, 5))
+        with self.assertRaises(ValueError):
+            SyntheticCohort({'x' : {'slope' : -1}})
+
+
+if __name__ == '__main__':
+    unittest.main()